@@ -0,0 +1,313 @@
+import os
+import re
+import time
+import uuid
+import fcntl
+import shutil
+import datetime
+
+# Choice answers copied into their own columns, keyed by column name
+CHOICE_FIELDS = {
+    'occupation': 'answer_occupation',
+    'job_role': 'answer_job_role',
+    'job_type': 'answer_job_type',
+    'job_mode': 'answer_job_mode',
+}
+
+# Free-text answers: general questions and the follow-ups of a choice step.
+# The same messages are also stored under answer_{step}_{n}, which are skipped
+# so no answer is counted twice
+ANSWER_KEY_RE = re.compile(r'^answer_(general_\d+|\w+_q\d+)$')
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_arrow = None
+
+
+def load_arrow():
+    """Import pyarrow on first use; returns None when it is not installed"""
+    global _arrow
+    if _arrow is None:
+        try:
+            import pyarrow
+            import pyarrow.dataset
+            import pyarrow.parquet
+            _arrow = pyarrow
+        except ImportError:
+            _arrow = False
+    return _arrow or None
+
+
+def _parse_time(value):
+    try:
+        return datetime.datetime.strptime(str(value), TIME_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_record(record):
+    """Reduce one wide interview record to the narrow analytics row"""
+    started = _parse_time(record.get('interview_start_time'))
+    submitted = _parse_time(record.get('submission_time'))
+    answers = [str(value) for key, value in record.items() if ANSWER_KEY_RE.match(key) and value is not None]
+    row = {
+        'interview_id': int(record['interview_id']),
+        'interview_start_time': started,
+        'submission_time': submitted,
+        'completion_seconds': (submitted - started).total_seconds() if started and submitted else None,
+        'answers': len(answers),
+        'answer_chars': sum(len(answer) for answer in answers),
+        'resume_uploaded': record.get('resume_filename', 'Not uploaded') != 'Not uploaded',
+    }
+    for column, key in CHOICE_FIELDS.items():
+        value = record.get(key)
+        row[column] = str(value) if value is not None else None
+    return row
+
+
+def _schema(pa):
+    return pa.schema([
+        ('interview_id', pa.int64()),
+        ('interview_start_time', pa.timestamp('s')),
+        ('submission_time', pa.timestamp('s')),
+        ('completion_seconds', pa.float64()),
+        ('occupation', pa.string()),
+        ('job_role', pa.string()),
+        ('job_type', pa.string()),
+        ('job_mode', pa.string()),
+        ('answers', pa.int32()),
+        ('answer_chars', pa.int64()),
+        ('resume_uploaded', pa.bool_()),
+    ])
+
+
+def _write_time(name):
+    # part-<ns>-<uuid>.parquet; files named before the prefix existed count as oldest
+    try:
+        return int(name.split('-')[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _percentiles(values, points=(50, 90, 99)):
+    import numpy as np
+
+    if len(values) == 0:
+        return {f"p{point}": None for point in points}
+    return {f"p{point}": round(float(value), 2) for point, value in zip(points, np.percentile(values, points))}
+
+
+def _label(value):
+    # Interviews saved without a choice group under an empty label
+    return '' if value != value or value is None else str(value)
+
+
+def role_mode_counts(df):
+    """Interviews per job_role x job_mode"""
+    counts = df.groupby(['job_role', 'job_mode'], dropna=False, observed=True).size()
+    return [
+        {'job_role': _label(role), 'job_mode': _label(mode), 'interviews': int(count)}
+        for (role, mode), count in counts.items()
+    ]
+
+
+def completion_times(df):
+    """Distribution of interview_start_time -> submission_time in seconds"""
+    timed = df[df['completion_seconds'].notna()]
+    seconds = timed['completion_seconds'].to_numpy()
+    by_role = timed.groupby('job_role', dropna=False, observed=True)['completion_seconds'].mean()
+    return {
+        'interviews': int(len(seconds)),
+        'mean_seconds': round(float(seconds.mean()), 2) if len(seconds) else None,
+        **_percentiles(seconds),
+        'mean_seconds_by_role': {_label(role): round(float(value), 2) for role, value in by_role.items()},
+    }
+
+
+def answer_lengths(df):
+    """Characters per free-text answer, overall and per job role"""
+    answers = df['answers'].to_numpy()
+    chars = df['answer_chars'].to_numpy()
+    answered = answers > 0
+    per_interview = chars[answered] / answers[answered]
+    totals = df[answered].groupby('job_role', dropna=False, observed=True)[['answers', 'answer_chars']].sum()
+    return {
+        'answers': int(answers.sum()),
+        'mean_chars': round(float(chars.sum() / answers.sum()), 2) if answers.sum() else None,
+        'per_interview_mean_chars': _percentiles(per_interview),
+        'mean_chars_by_role': {
+            _label(role): round(float(row.answer_chars / row.answers), 2) for role, row in totals.iterrows()
+        },
+    }
+
+
+# Each metric lists the only columns it reads from the partitions
+METRICS = {
+    'role_mode': (('job_role', 'job_mode'), role_mode_counts),
+    'completion': (('job_role', 'completion_seconds'), completion_times),
+    'answer_length': (('job_role', 'answers', 'answer_chars'), answer_lengths),
+}
+
+
+class ColumnarResults:
+    """Narrow per-interview rows in Parquet files partitioned by submission date
+
+    Each ``append`` writes one file under ``{root}/date=YYYY-MM-DD/``, so
+    worker processes never share a file. Files are written under a hidden
+    name and renamed into place, and readers skip hidden files. Queries read
+    only the columns and date partitions they need. Everything is a no-op
+    when pyarrow is not installed.
+
+    A replayed or retried save writes the interview again, so reads keep
+    only the newest row per interview_id. File names start with their write
+    time in nanoseconds, which orders the rows. Once a partition holds more
+    than ``compact_after`` files, the appending process merges them into one.
+    """
+
+    def __init__(self, root, compact_after=64):
+        self.root = root
+        self.compact_after = compact_after
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def available(self):
+        return load_arrow() is not None
+
+    def _write(self, root, rows):
+        """Write rows as one file per submission date and return the dates"""
+        pa = load_arrow()
+        by_date = {}
+        for row in rows:
+            day = (row['submission_time'] or datetime.datetime.now()).strftime('%Y-%m-%d')
+            by_date.setdefault(day, []).append(row)
+        for day, day_rows in by_date.items():
+            folder = os.path.join(root, f"date={day}")
+            os.makedirs(folder, exist_ok=True)
+            self._write_file(folder, pa.Table.from_pylist(day_rows, schema=_schema(pa)))
+        return list(by_date)
+
+    def _write_file(self, folder, table, written=None):
+        pa = load_arrow()
+        written = time.time_ns() if written is None else written
+        name = f"part-{written:020d}-{uuid.uuid4().hex}.parquet"
+        tmp_path = os.path.join(folder, f".{name}")
+        pa.parquet.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(folder, name))
+
+    def append(self, records):
+        """Write a batch of saved interviews as one file per submission date"""
+        if not self.available:
+            return
+        days = self._write(self.root, [summarize_record(record) for record in records if record.get('interview_id') is not None])
+        for day in days:
+            if len(self._parts(day)) > self.compact_after:
+                self.compact(day)
+
+    def _parts(self, day):
+        folder = os.path.join(self.root, f"date={day}")
+        try:
+            return sorted(name for name in os.listdir(folder) if name.startswith('part-'))
+        except FileNotFoundError:
+            return []
+
+    def compact(self, day):
+        """Merge one date partition into a single file, newest row per interview
+
+        Returns the number of files merged, or 0 when another process is
+        already compacting. Files appended meanwhile are left for next time.
+        """
+        pa = load_arrow()
+        with open(os.path.join(self.root, '.compact.lock'), 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            names = self._parts(day)
+            if len(names) < 2:
+                return 0
+            folder = os.path.join(self.root, f"date={day}")
+            table = pa.concat_tables(
+                pa.parquet.read_table(os.path.join(folder, name), schema=_schema(pa)) for name in names
+            )
+            rows = table.to_pandas().drop_duplicates('interview_id', keep='last')
+            # The merged file takes the newest input's time, so rows appended
+            # after it was read still sort after it
+            self._write_file(
+                folder,
+                pa.Table.from_pandas(rows, schema=_schema(pa), preserve_index=False),
+                written=max(_write_time(name) for name in names),
+            )
+            for name in names:
+                os.remove(os.path.join(folder, name))
+        return len(names)
+
+    def rebuild(self, records, batch_size=50000):
+        """Rewrite every partition from ``records``, one file per date per batch
+
+        Also compacts the small files written by ``append``. The new tree is
+        built next to the old one and swapped in by renaming.
+        """
+        if not self.available:
+            raise RuntimeError("pyarrow is not installed")
+        new_root = f"{self.root}.rebuild"
+        shutil.rmtree(new_root, ignore_errors=True)
+        os.makedirs(new_root)
+        rows = []
+        count = 0
+        for record in records:
+            if record.get('interview_id') is None:
+                continue
+            rows.append(summarize_record(record))
+            if len(rows) >= batch_size:
+                self._write(new_root, rows)
+                count += len(rows)
+                rows = []
+        if rows:
+            self._write(new_root, rows)
+            count += len(rows)
+        old_root = f"{self.root}.old"
+        shutil.rmtree(old_root, ignore_errors=True)
+        os.replace(self.root, old_root)
+        os.replace(new_root, self.root)
+        shutil.rmtree(old_root, ignore_errors=True)
+        return count
+
+    def read(self, columns, start=None, end=None):
+        """Load ``columns`` for interviews submitted between two ISO dates, inclusive
+
+        Only the newest row of each interview is kept.
+        """
+        try:
+            return self._read(columns, start, end)
+        except FileNotFoundError:
+            # A compaction removed files after they were listed; list again
+            return self._read(columns, start, end)
+
+    def _read(self, columns, start, end):
+        pa = load_arrow()
+        partitioning = pa.dataset.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+        dataset = pa.dataset.dataset(self.root, format='parquet', partitioning=partitioning, schema=_schema(pa).append(pa.field('date', pa.string())))
+        condition = None
+        if start:
+            condition = pa.dataset.field('date') >= start
+        if end:
+            upper = pa.dataset.field('date') <= end
+            condition = upper if condition is None else condition & upper
+        # Files are listed in name order, oldest write first
+        table = dataset.to_table(columns=list(dict.fromkeys(['interview_id', *columns])), filter=condition)
+        # Choice columns hold a handful of distinct values, so group them as categoricals
+        df = table.to_pandas(strings_to_categorical=True).drop_duplicates('interview_id', keep='last')
+        return df[list(columns)]
+
+    def query(self, metrics, start=None, end=None):
+        """Compute the named metrics over one read of their combined columns"""
+        columns = []
+        for name in metrics:
+            for column in METRICS[name][0]:
+                if column not in columns:
+                    columns.append(column)
+        df = self.read(columns, start, end)
+        result = {'interviews': int(len(df))}
+        for name in metrics:
+            result[name] = METRICS[name][1](df)
+        return result
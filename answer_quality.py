@@ -0,0 +1,231 @@
+import re
+
+from analytics import ANSWER_KEY_RE
+from batch_scoring import sentiment_key
+from text_analysis import init_text_analysis, regex_tokenize, sentiment_compound
+
+# Job role -> questions.csv column its keywords come from
+ROLE_COLUMNS = {'UI/UX': 'UI/UX', 'Java': ' Java', 'AI/ML': 'AI/ML'}
+
+# Words that carry no topic, on top of those shared by every role column
+STOPWORDS = frozenset('''
+    a about an and any are as at be been can could did do does for from had has have how i if in is it
+    its me my of on or our over should so such than that the their them then there these they this those
+    through to was we were what when where which while who why will with would you your
+'''.split())
+# Tokens that can be topic keywords: a letter and at least two more characters
+KEYWORD_RE = re.compile(r'^[a-z][a-z0-9]{2,}$')
+
+# Per-answer feature targets: an answer of TARGET_WORDS words scores full
+# length, and one naming KEYWORDS_PER_ANSWER role keywords is fully on topic
+TARGET_WORDS = 40
+KEYWORDS_PER_ANSWER = 3
+
+# Weights of the candidate features in the 0-100 quality score
+WEIGHTS = {'length': 0.3, 'keywords': 0.35, 'sentiment': 0.15, 'diversity': 0.2}
+FEATURES = tuple(WEIGHTS)
+
+SCORE_FIELD = 'quality_score'
+RANK_FIELD = 'quality_rank'
+ROLE_TOTAL_FIELD = 'quality_role_total'
+
+
+def keyword_tokens(text):
+    """Yield the tokens of a text that can be topic keywords, skipping stopwords"""
+    return (t for t in regex_tokenize(text) if KEYWORD_RE.match(t) and t not in STOPWORDS)
+
+
+def derive_role_keywords(columns, role_columns=ROLE_COLUMNS):
+    """Keywords per role from the words of its questions
+
+    Words used by every role's questions ("describe", "project", ...) say
+    nothing about the role and are dropped.
+    """
+    vocab = {}
+    for role, column in role_columns.items():
+        words = set()
+        for question in columns.get(column, ()):
+            words.update(keyword_tokens(question))
+        vocab[role] = words
+    shared = set.intersection(*vocab.values()) if vocab else set()
+    return {role: tuple(sorted(words - shared)) for role, words in vocab.items()}
+
+
+class AnswerQualityScorer:
+    """Scores the free-text answers of completed interviews in batches
+
+    Each answer is tokenized once; every other step is a NumPy operation
+    over all answers of the batch at once. Candidate features are:
+
+    - ``length``: mean of words / TARGET_WORDS, capped at 1 per answer
+    - ``keywords``: mean share of KEYWORDS_PER_ANSWER role keywords named
+    - ``sentiment``: mean VADER compound, mapped from [-1, 1] to [0, 1]
+    - ``diversity``: unique / total words, weighted by answer length
+
+    and ``quality_score`` is their weighted sum on a 0-100 scale. Stored
+    ``sentiment_*`` scores from ``flask score-answers`` are reused.
+    Keywords are re-derived whenever the question bank reloads.
+    """
+
+    def __init__(self, question_bank):
+        self.question_bank = question_bank
+        self._signature = None
+        self._keywords = {}
+
+    def keywords(self):
+        snapshot = self.question_bank.snapshot()
+        if snapshot is not None and snapshot.signature != self._signature:
+            self._keywords = derive_role_keywords(snapshot.columns)
+            self._signature = snapshot.signature
+        return self._keywords
+
+    def features(self, records):
+        """Return ``(scores, features)`` arrays, one row per record"""
+        import numpy as np
+
+        keywords = self.keywords()
+        roles = list(keywords)
+        vocab = {}
+        for words in keywords.values():
+            for word in words:
+                vocab.setdefault(word, len(vocab))
+        # Role x vocabulary membership, with an all-zero last row for unknown roles
+        membership = np.zeros((len(roles) + 1, max(len(vocab), 1)))
+        for r, role in enumerate(roles):
+            membership[r, [vocab[word] for word in keywords[role]]] = 1.0
+        role_index = {role: r for r, role in enumerate(roles)}
+
+        owners, n_words, n_unique, sentiments = [], [], [], []
+        hit_answers, hit_words = [], []
+        needs_vader = False
+        for i, record in enumerate(records):
+            for key, value in record.items():
+                if not ANSWER_KEY_RE.match(key) or not isinstance(value, str) or not value.strip():
+                    continue
+                answer = len(owners)
+                tokens = regex_tokenize(value)
+                unique = set(tokens)
+                owners.append(i)
+                n_words.append(len(tokens))
+                n_unique.append(len(unique))
+                for token in unique:
+                    index = vocab.get(token)
+                    if index is not None:
+                        hit_answers.append(answer)
+                        hit_words.append(index)
+                stored = record.get(sentiment_key(key))
+                if isinstance(stored, (int, float)):
+                    sentiments.append(float(stored))
+                else:
+                    if not needs_vader:
+                        init_text_analysis()
+                        needs_vader = True
+                    sentiments.append(sentiment_compound(value))
+
+        n_records = len(records)
+        features = np.zeros((n_records, len(FEATURES)))
+        if not owners:
+            return np.zeros(n_records), features
+
+        owners = np.asarray(owners)
+        n_words = np.asarray(n_words, dtype=float)
+        n_unique = np.asarray(n_unique, dtype=float)
+        answer_roles = np.array([
+            role_index.get(str(record.get('answer_job_role')), len(roles)) for record in records
+        ])[owners]
+
+        # Count, per answer, the distinct words that are keywords of the candidate's role
+        hit_answers = np.asarray(hit_answers, dtype=np.int64)
+        hit_words = np.asarray(hit_words, dtype=np.int64)
+        on_role = membership[answer_roles[hit_answers], hit_words] if len(hit_answers) else np.zeros(0)
+        hits = np.bincount(hit_answers, weights=on_role, minlength=len(owners))
+
+        per_answer = np.column_stack((
+            np.minimum(n_words / TARGET_WORDS, 1.0),
+            np.minimum(hits / KEYWORDS_PER_ANSWER, 1.0),
+            (np.asarray(sentiments) + 1.0) / 2.0,
+            np.divide(n_unique, n_words, out=np.zeros_like(n_words), where=n_words > 0),
+        ))
+        answers = np.bincount(owners, minlength=n_records)
+        words = np.bincount(owners, weights=n_words, minlength=n_records)
+        for f, name in enumerate(FEATURES):
+            if name == 'diversity':
+                total = np.bincount(owners, weights=per_answer[:, f] * n_words, minlength=n_records)
+                features[:, f] = np.divide(total, words, out=np.zeros(n_records), where=words > 0)
+            else:
+                total = np.bincount(owners, weights=per_answer[:, f], minlength=n_records)
+                features[:, f] = np.divide(total, answers, out=np.zeros(n_records), where=answers > 0)
+        scores = features @ np.array([WEIGHTS[name] for name in FEATURES]) * 100.0
+        return scores, features
+
+    def score(self, records):
+        """Return ``(interview_id, fields)`` updates carrying each record's scores"""
+        scores, features = self.features(records)
+        updates = []
+        for i, record in enumerate(records):
+            fields = {SCORE_FIELD: round(float(scores[i]), 2)}
+            for f, name in enumerate(FEATURES):
+                fields[f"quality_{name}"] = round(float(features[i, f]), 3)
+            updates.append((record.get('interview_id'), fields))
+        return updates
+
+
+def rank_by_role(roles, scores):
+    """1-based rank of each score within its role (1 = best) and the role's size"""
+    import numpy as np
+
+    roles = np.asarray(roles, dtype=object).astype(str)
+    scores = np.asarray(scores, dtype=float)
+    names, role_ids = np.unique(roles, return_inverse=True)
+    order = np.lexsort((-scores, role_ids))
+    sizes = np.bincount(role_ids, minlength=len(names))
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(len(scores)) - starts[role_ids[order]] + 1
+    return ranks, sizes[role_ids]
+
+
+def score_results(store, scorer, batch_size=5000):
+    """Score every stored interview and rank candidates within their job role
+
+    Records are streamed and scored ``batch_size`` at a time; ranks need
+    every score, so they are computed at the end and written back together
+    with the features. Returns {role: [(score, interview_id), ...]} sorted
+    best first.
+    """
+    ids, roles, score_list, pending = [], [], [], []
+    batch = []
+
+    def flush():
+        for (interview_id, fields), record in zip(scorer.score(batch), batch):
+            ids.append(interview_id)
+            roles.append(str(record.get('answer_job_role') or ''))
+            score_list.append(fields[SCORE_FIELD])
+            pending.append(fields)
+        batch.clear()
+
+    for record in store.iter_records():
+        if record.get('interview_id') is None:
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    if not ids:
+        return {}
+
+    ranks, totals = rank_by_role(roles, score_list)
+    for fields, rank, total in zip(pending, ranks, totals):
+        fields[RANK_FIELD] = int(rank)
+        fields[ROLE_TOTAL_FIELD] = int(total)
+    updates = list(zip(ids, pending))
+    for start in range(0, len(updates), batch_size):
+        store.update_records(updates[start:start + batch_size])
+
+    ranking = {}
+    for interview_id, role, score in zip(ids, roles, score_list):
+        ranking.setdefault(role, []).append((score, interview_id))
+    for entries in ranking.values():
+        entries.sort(key=lambda entry: -entry[0])
+    return ranking
@@ -0,0 +1,229 @@
+"""ASGI entry point: ``uvicorn asgi:app``
+
+The chat routes run as coroutines, so reading a request body never holds a
+worker while a slow client trickles it in. Session loads and saves, resume
+writes and file reads run in a thread pool. Every other route is served by
+the Flask app through a WSGI bridge, and both share the same session store,
+results store and JSON encoding, so clients see the same HTTP contract in
+either mode.
+"""
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_etags
+from werkzeug.wrappers import Response as WerkzeugResponse
+
+import main
+from main import app as flask_app, REQUEST_SECONDS, REQUESTS_TOTAL
+
+# Cookie and Vary headers written by the Flask session interface
+SESSION_HEADERS = ('Set-Cookie', 'Vary')
+
+
+def json_response(payload, session_headers=(), status_code=200):
+    # Encode with the Flask JSON provider so bodies match the WSGI routes byte for byte
+    encoded = flask_app.json.response(payload)
+    response = Response(encoded.get_data(), status_code=status_code, media_type=encoded.mimetype)
+    for name, value in session_headers:
+        response.headers.append(name, value)
+    return response
+
+
+def with_session(request, work):
+    """Run ``work(session)`` with the Flask session of this request
+
+    Blocking; call it from the thread pool. Returns the result of ``work``
+    and the headers the session interface set on its response.
+    """
+    interface = flask_app.session_interface
+    session = interface.open_session(flask_app, request)
+    if session is None:
+        session = interface.make_null_session(flask_app)
+    result = work(session)
+    carrier = WerkzeugResponse()
+    if not interface.is_null_session(session):
+        interface.save_session(flask_app, session, carrier)
+    headers = [(name, value) for name, value in carrier.headers.items() if name in SESSION_HEADERS]
+    return result, headers
+
+
+def instrumented(endpoint):
+    """Record the same request metrics as the Flask before/after hooks"""
+    def decorator(handler):
+        async def wrapper(request):
+            started = time.perf_counter()
+            response = await handler(request)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method)
+            REQUESTS_TOTAL.inc(endpoint, str(response.status_code))
+            return response
+        return wrapper
+    return decorator
+
+
+@instrumented('get_message')
+async def get_message(request):
+    try:
+        form = await request.form()
+        user_message = str(form.get('user_message', '')).strip()
+    except Exception as e:
+        print(f"Error in get_message: {e}")
+        return json_response(main.ERROR_TURN)
+    turn, headers = await run_in_threadpool(
+        with_session, request, lambda session: main.process_message(session, user_message)
+    )
+    return json_response(turn, headers)
+
+
+class TurnEventStream(StreamingResponse):
+    """Event stream of a chat turn whose deferred writes always run
+
+    Starlette skips background tasks when the client disconnects, so the
+    writes the stream did not reach run once the response has finished.
+    """
+
+    def __init__(self, content, deferred, **kwargs):
+        super().__init__(content, **kwargs)
+        self.deferred = deferred
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await run_in_threadpool(main.run_deferred, self.deferred)
+
+
+@instrumented('stream_message')
+async def stream_message(request):
+    deferred = []
+    try:
+        form = await request.form()
+        user_message = str(form.get('user_message', '')).strip()
+        turn, headers = await run_in_threadpool(
+            with_session, request, lambda session: main.process_message(session, user_message, deferred)
+        )
+    except Exception as e:
+        print(f"Error in get_message: {e}")
+        turn, headers = dict(main.ERROR_TURN), []
+
+    async def stream():
+        for event in main.turn_events(turn):
+            yield event
+        # The saves of the turn run only after its events have gone out
+        await run_in_threadpool(main.run_deferred, deferred)
+        yield main.sse_event('done', {})
+
+    response = TurnEventStream(stream(), deferred, media_type='text/event-stream', headers=main.STREAM_HEADERS)
+    for name, value in headers:
+        response.headers.append(name, value)
+    return response
+
+
+@instrumented('upload_resume')
+async def upload_resume(request):
+    try:
+        # Reject declared oversized uploads before reading the body
+        content_length = request.headers.get('content-length')
+        if main.resume_declared_too_large(int(content_length) if content_length else None):
+            return json_response(main.resume_too_large())
+
+        # The body is read on the event loop and spooled to a temporary file
+        form = await request.form()
+        upload = form.get('resume')
+        if upload is None or isinstance(upload, str):
+            return json_response({"success": False, "message": "No file part"})
+
+        try:
+            payload, headers = await run_in_threadpool(
+                with_session, request, lambda session: main.store_resume(session, upload.filename or '', upload.file)
+            )
+        finally:
+            await upload.close()
+        return json_response(payload, headers)
+    except Exception as e:
+        print(f"Error in upload_resume: {e}")
+        return json_response(main.UPLOAD_ERROR)
+
+
+@instrumented('get_history')
+async def get_history(request):
+    try:
+        since, limit = main.history_args(request.query_params)
+    except ValueError:
+        return json_response({"error": "since and limit must be non-negative integers"}, status_code=400)
+    if_none_match = parse_etags(request.headers.get('if-none-match'))
+    (payload, etag), headers = await run_in_threadpool(
+        with_session, request, lambda session: main.history_page(session, since, limit, if_none_match)
+    )
+    headers = headers + main.history_headers(etag)
+    if payload is None:
+        response = Response(status_code=304)
+        for name, value in headers:
+            response.headers.append(name, value)
+        return response
+    return json_response(payload, headers)
+
+
+def wsgi_environ(request):
+    """Minimal WSGI environ carrying the headers send_file looks at"""
+    server = request.scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': request.url.path,
+        'QUERY_STRING': request.url.query,
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{request.scope.get('http_version', '1.1')}",
+        'wsgi.url_scheme': request.url.scheme,
+    }
+    for name, value in request.headers.items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    return environ
+
+
+def iter_upload(upload):
+    # Close the file once the client has consumed it or gone away
+    try:
+        yield from upload.response
+    finally:
+        upload.close()
+
+
+async def send_download(request, send, name):
+    # Same conditional, range and caching headers as the Flask routes
+    try:
+        upload = await run_in_threadpool(send, name, wsgi_environ(request))
+    except HTTPException as e:
+        upload = e.get_response()
+    headers = dict(upload.headers.items())
+    if upload.direct_passthrough:
+        # File chunks are read in the thread pool as the client consumes them
+        return StreamingResponse(iterate_in_threadpool(iter_upload(upload)), status_code=upload.status_code, headers=headers)
+    return Response(upload.get_data(), status_code=upload.status_code, headers=headers)
+
+
+@instrumented('download_file')
+async def download_file(request):
+    return await send_download(request, main.send_upload, request.path_params['filename'])
+
+
+@instrumented('download_blob')
+async def download_blob(request):
+    return await send_download(request, main.send_blob, request.path_params['name'])
+
+
+app = Starlette(routes=[
+    Route('/get_message', get_message, methods=['POST']),
+    Route('/get_message/stream', stream_message, methods=['POST']),
+    Route('/upload_resume', upload_resume, methods=['POST']),
+    Route('/get_history', get_history),
+    Route('/download/blob/{name}', download_blob),
+    Route('/download/{filename}', download_file),
+    # Everything else (the page, /metrics, /search, status polls) stays on Flask
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
@@ -0,0 +1,67 @@
+import os
+from multiprocessing import Pool
+
+from text_analysis import init_text_analysis, sentiment_compound
+
+ANSWER_PREFIX = 'answer_'
+SENTIMENT_PREFIX = 'sentiment_'
+
+
+def sentiment_key(answer_key):
+    """Column that holds the score of an ``answer_*`` column"""
+    return SENTIMENT_PREFIX + answer_key[len(ANSWER_PREFIX):]
+
+
+def _iter_chunks(records, chunk_size):
+    """Group the answers of streamed records into chunks of about chunk_size"""
+    chunk = []
+    answers_in_chunk = 0
+    for record in records:
+        answers = [
+            (key, value) for key, value in record.items()
+            if key.startswith(ANSWER_PREFIX) and isinstance(value, str) and value.strip()
+        ]
+        if not answers:
+            continue
+        chunk.append((record.get('interview_id'), answers))
+        answers_in_chunk += len(answers)
+        if answers_in_chunk >= chunk_size:
+            yield chunk
+            chunk = []
+            answers_in_chunk = 0
+    if chunk:
+        yield chunk
+
+
+def score_chunk(chunk):
+    """Score every answer of a chunk; runs inside a pool worker"""
+    updates = []
+    for interview_id, answers in chunk:
+        fields = {}
+        for key, text in answers:
+            fields[sentiment_key(key)] = sentiment_compound(text)
+        fields['sentiment_min'] = min(fields.values())
+        updates.append((interview_id, fields))
+    return updates
+
+
+def rescore_results(store, workers=None, chunk_size=2000, negative_threshold=-0.3):
+    """Re-score every stored answer and write the scores back as new columns
+
+    Records are streamed from the store and scored in chunks across a process
+    pool; each worker builds its own VADER analyzer once. Returns a summary
+    with the number of answers scored and candidates whose most negative
+    answer is below ``negative_threshold``.
+    """
+    workers = workers or os.cpu_count() or 1
+    summary = {'interviews': 0, 'answers': 0, 'negative_candidates': []}
+
+    with Pool(processes=workers, initializer=init_text_analysis) as pool:
+        for updates in pool.imap(score_chunk, _iter_chunks(store.iter_records(), chunk_size)):
+            store.update_records(updates)
+            for interview_id, fields in updates:
+                summary['interviews'] += 1
+                summary['answers'] += len(fields) - 1
+                if fields['sentiment_min'] < negative_threshold:
+                    summary['negative_candidates'].append(interview_id)
+    return summary
@@ -0,0 +1 @@
+"""Benchmarks that drive the chatbot through Flask's test client or over HTTP"""
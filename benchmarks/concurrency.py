@@ -0,0 +1,209 @@
+"""Concurrent-interview capacity of the sync (gunicorn) and async (uvicorn) modes
+
+Starts the app as a real server in a scratch working directory and runs
+many simulated candidates against it at once. Each candidate goes through
+the full interview from benchmarks.load_test. Resume uploads are sent
+slowly, at ``--upload-kbps``, the way a candidate on a mobile connection
+would send them. A sync worker is held for the whole upload, while the
+async mode keeps serving other candidates' chat turns in the meantime.
+
+    python -m benchmarks.concurrency --mode both --clients 16 --duration 30
+    python -m benchmarks.concurrency --mode sync --workers 3
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import argparse
+import itertools
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlencode
+
+from benchmarks.load_test import (
+    REPO_DIR, OCCUPATIONS, ROLES, JOB_TYPES, JOB_MODES,
+    run_interview, sample_resumes, summarize, print_report,
+)
+
+
+class HttpResponse:
+    def __init__(self, status, body):
+        self.status_code = status
+        self.data = body
+
+    def get_json(self):
+        return json.loads(self.data)
+
+
+class HttpClient:
+    """Just enough of Flask's test client API to drive run_interview over HTTP"""
+
+    def __init__(self, port, upload_kbps):
+        self.port = port
+        self.upload_kbps = upload_kbps
+        self.cookie = None
+
+    def _request(self, method, path, body=b'', headers=None, trickle=False):
+        headers = dict(headers or {})
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+        try:
+            conn.putrequest(method, path)
+            headers['Content-Length'] = str(len(body))
+            for name, value in headers.items():
+                conn.putheader(name, value)
+            conn.endheaders()
+            if trickle and self.upload_kbps:
+                # Send 4KB at a time at the configured line rate
+                chunk = 4096
+                delay = chunk / (self.upload_kbps * 1024)
+                for offset in range(0, len(body), chunk):
+                    conn.send(body[offset:offset + chunk])
+                    time.sleep(delay)
+            elif body:
+                conn.send(body)
+            response = conn.getresponse()
+            data = response.read()
+            set_cookie = response.getheader('Set-Cookie')
+            if set_cookie:
+                self.cookie = set_cookie.split(';', 1)[0]
+            return HttpResponse(response.status, data)
+        finally:
+            conn.close()
+
+    def get(self, path):
+        return self._request('GET', path)
+
+    def post(self, path, data, content_type=None):
+        if content_type == 'multipart/form-data':
+            boundary = uuid.uuid4().hex
+            parts = []
+            for field, value in data.items():
+                if isinstance(value, tuple):
+                    stream, filename = value
+                    parts.append(
+                        f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                        'Content-Type: application/octet-stream\r\n\r\n'.encode() + stream.read() + b'\r\n'
+                    )
+                else:
+                    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"\r\n\r\n{value}\r\n'.encode())
+            body = b''.join(parts) + f'--{boundary}--\r\n'.encode()
+            headers = {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+            return self._request('POST', path, body, headers, trickle=True)
+        body = urlencode(data).encode()
+        return self._request('POST', path, body, {'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, workers, port, workdir):
+    """Launch gunicorn (sync) or uvicorn (async) and wait until it answers"""
+    if mode == 'sync':
+        command = [sys.executable, '-m', 'gunicorn', '--pythonpath', REPO_DIR,
+                   '-w', str(workers), '-b', f'127.0.0.1:{port}', 'main:app']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', '--app-dir', REPO_DIR, '--no-access-log',
+                   '--workers', str(workers), '--port', str(port), 'asgi:app']
+    # Workers must share the session signing key, or a cookie set by one is
+    # rejected by the next
+    env = dict(os.environ, SECRET_KEY=os.environ.get('SECRET_KEY', uuid.uuid4().hex))
+    with open(os.path.join(workdir, 'server.log'), 'w') as log:
+        server = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=log)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if HttpClient(port, 0).get('/').status_code == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+def run(mode, workers, clients, duration, upload_kbps, seed):
+    """Run ``clients`` candidates against one server for ``duration`` seconds"""
+    workdir = tempfile.mkdtemp(prefix=f'chatbot-{mode}-')
+    with open(os.path.join(REPO_DIR, 'questions.csv'), 'rb') as src, \
+            open(os.path.join(workdir, 'questions.csv'), 'wb') as dst:
+        dst.write(src.read())
+    port = free_port()
+    server = start_server(mode, workers, port, workdir)
+
+    resumes = sample_resumes()
+    branches = list(itertools.product(OCCUPATIONS, ROLES, JOB_TYPES, JOB_MODES, (False, True)))
+    timings = {}
+    completed = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def candidate(index):
+        rng = random.Random(seed + index)
+        local = {}
+        done = 0
+        while time.monotonic() < deadline:
+            client = HttpClient(port, upload_kbps)
+            try:
+                run_interview(client, local, rng.choice(branches), rng.choice(resumes), rng)
+                done += 1
+            except Exception as e:
+                errors.append(str(e))
+        with lock:
+            for step, values in local.items():
+                timings.setdefault(step, []).extend(values)
+            completed.append(done)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=candidate, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    server.terminate()
+    server.wait(30)
+    summary = summarize(timings, sum(completed), elapsed)
+    summary.update(mode=mode, workers=workers, clients=clients, upload_kbps=upload_kbps, errors=len(errors))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=('sync', 'async', 'both'), default='both')
+    parser.add_argument('--workers', type=int, default=1, help='server worker processes')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent candidates')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to keep starting interviews')
+    parser.add_argument('--upload-kbps', type=float, default=64.0, help='resume upload rate per candidate')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--json', help='write the summaries to this file')
+    args = parser.parse_args(argv)
+
+    modes = ('sync', 'async') if args.mode == 'both' else (args.mode,)
+    summaries = []
+    for mode in modes:
+        summary = run(mode, args.workers, args.clients, args.duration, args.upload_kbps, args.seed)
+        print(f"== {mode}: {args.workers} worker(s), {args.clients} candidates, "
+              f"uploads at {args.upload_kbps:g} KB/s, {summary['errors']} errors")
+        print_report(summary)
+        print()
+        summaries.append(summary)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summaries, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
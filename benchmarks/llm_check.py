@@ -0,0 +1,151 @@
+"""Model-written replies checked against the completion stub
+
+Runs ModelGenerator with its real HTTP client against benchmarks.llm_stub
+and checks that:
+
+- answers shorter than min_words keep the template reply without a request
+- a repeated answer, in any case or punctuation, is served from the cache
+- concurrent prompts are sent together, over at most pool_size connections
+- a turn that outwaits the timeout gets the template reply, and the late
+  model reply still fills the cache
+- after a failed request the model is skipped until the cooldown ends
+
+    python -m benchmarks.llm_check
+"""
+import sys
+import time
+import argparse
+import threading
+
+from benchmarks import llm_stub
+from benchmarks.concurrency import free_port
+from response_generation import CompletionClient, ModelGenerator, ResponseCache
+
+STEP = 'general_questions'
+FALLBACK = 'template reply'
+
+
+class Recorder:
+    """Observer that keeps the source of every reply"""
+
+    def __init__(self):
+        self.sources = []
+        self._lock = threading.Lock()
+
+    def __call__(self, source):
+        with self._lock:
+            self.sources.append(source)
+
+
+def stub_counts():
+    stats = llm_stub.StubHandler.stats
+    with llm_stub.StubHandler.lock:
+        return stats['requests'], stats['prompts'], set(stats['connections'])
+
+
+def make_generator(port, **options):
+    recorder = Recorder()
+    client = CompletionClient(f"http://127.0.0.1:{port}/v1", 'stub', timeout=5.0)
+    generator = ModelGenerator(client, ResponseCache(), observer=recorder, **options)
+    return generator, recorder
+
+
+def run(batch_prompts, batch_size, pool_size):
+    port = free_port()
+    server = llm_stub.serve(port)
+    failures = []
+
+    def check(ok, message):
+        print(f"{'OK' if ok else 'FAIL'}: {message}")
+        if not ok:
+            failures.append(message)
+
+    try:
+        generator, recorder = make_generator(port)
+        requests, _, _ = stub_counts()
+        reply = generator.generate('Yes', STEP, FALLBACK)
+        check(reply == FALLBACK and recorder.sources == ['short'] and stub_counts()[0] == requests,
+              "a one-word answer keeps the template reply without calling the model")
+
+        answer = 'I have built REST services in Java for three years.'
+        first = generator.generate(answer, STEP, FALLBACK)
+        check(first in llm_stub.REPLIES and recorder.sources[-1] == 'model',
+              f"a longer answer gets a model reply ({first!r})")
+        requests, _, _ = stub_counts()
+        again = generator.generate('i have built rest services in java, for three years', STEP, FALLBACK)
+        check(again == first and recorder.sources[-1] == 'cache' and stub_counts()[0] == requests,
+              "the same answer in other case and punctuation is served from the cache")
+        generator.close()
+
+        generator, recorder = make_generator(port, batch_size=batch_size, pool_size=pool_size, batch_window=0.05)
+        requests, prompts, connections = stub_counts()
+        barrier = threading.Barrier(batch_prompts)
+
+        def candidate(index):
+            barrier.wait()
+            generator.generate(f"My answer number {index} is about distributed systems.", STEP, FALLBACK)
+
+        threads = [threading.Thread(target=candidate, args=(i,)) for i in range(batch_prompts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sent_requests = stub_counts()[0] - requests
+        sent_prompts = stub_counts()[1] - prompts
+        used = len(stub_counts()[2] - connections)
+        check(recorder.sources.count('model') == batch_prompts,
+              f"{recorder.sources.count('model')} of {batch_prompts} concurrent answers got model replies")
+        check(sent_prompts == batch_prompts and sent_requests <= batch_prompts // 2,
+              f"{sent_prompts} prompts were sent in {sent_requests} requests (batch size {batch_size})")
+        check(used <= pool_size, f"requests used {used} connections (pool size {pool_size})")
+        generator.close()
+
+        llm_stub.StubHandler.delay = 0.5
+        generator, recorder = make_generator(port, timeout=0.1)
+        answer = 'I enjoy mentoring junior engineers on code reviews.'
+        started = time.monotonic()
+        reply = generator.generate(answer, STEP, FALLBACK)
+        waited = time.monotonic() - started
+        check(reply == FALLBACK and recorder.sources == ['timeout'] and waited < 0.3,
+              f"a slow model falls back to the template after {waited:.2f}s")
+        time.sleep(0.6)
+        llm_stub.StubHandler.delay = 0.0
+        reply = generator.generate(answer, STEP, FALLBACK)
+        check(reply != FALLBACK and recorder.sources[-1] == 'cache',
+              "the late model reply was cached for the next identical answer")
+        generator.close()
+
+        llm_stub.StubHandler.fail = True
+        generator, recorder = make_generator(port, cooldown=0.5)
+        requests, _, _ = stub_counts()
+        reply = generator.generate('I led the migration to Kubernetes last year.', STEP, FALLBACK)
+        check(reply == FALLBACK and recorder.sources == ['error'],
+              "a failed request falls back to the template")
+        reply = generator.generate('I also wrote most of the deployment scripts.', STEP, FALLBACK)
+        check(reply == FALLBACK and recorder.sources[-1] == 'unavailable' and stub_counts()[0] == requests + 1,
+              "the next answer skips the model during the cooldown")
+        llm_stub.StubHandler.fail = False
+        time.sleep(0.6)
+        reply = generator.generate('I also wrote most of the deployment scripts.', STEP, FALLBACK)
+        check(reply != FALLBACK and recorder.sources[-1] == 'model',
+              "the model is called again once the cooldown has passed")
+        generator.close()
+    finally:
+        server.shutdown()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prompts', type=int, default=40, help='concurrent answers in the batching check')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    failures = run(args.prompts, args.batch_size, args.pool_size)
+    print(f"{len(failures)} checks failed" if failures else "All checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Stand-in for an OpenAI-compatible completion server
+
+Answers ``POST /v1/completions`` with a canned acknowledgement per prompt
+after an optional delay, so RESPONSE_GENERATOR=openai can be tried and
+load-tested without a model. Connections are kept alive, and every request
+logs its batch size and the connection it arrived on.
+
+    python -m benchmarks.llm_stub --port 8080 --delay 0.2
+    RESPONSE_GENERATOR=openai LLM_BASE_URL=http://127.0.0.1:8080/v1 flask run
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLIES = (
+    "Thanks, that gives me a clear picture of your experience.",
+    "That's a thoughtful answer, I appreciate the detail.",
+    "Great, it's helpful to hear how you approach that.",
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0.0
+    fail = False
+    stats = {'requests': 0, 'prompts': 0, 'connections': set()}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.path.endswith('/completions'):
+            self.send_error(404)
+            return
+        prompts = json.loads(body).get('prompt', [])
+        if isinstance(prompts, str):
+            prompts = [prompts]
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['prompts'] += len(prompts)
+            self.stats['connections'].add(self.client_address)
+        time.sleep(self.delay)
+        if self.fail:
+            self.send_error(503)
+            return
+        payload = json.dumps({
+            'object': 'text_completion',
+            'choices': [
+                {'index': i, 'text': ' ' + REPLIES[len(prompt) % len(REPLIES)], 'finish_reason': 'stop'}
+                for i, prompt in enumerate(prompts)
+            ],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, delay=0.0, fail=False):
+    """Start the stub in a background thread and return the server"""
+    StubHandler.delay = delay
+    StubHandler.fail = fail
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to wait before answering')
+    parser.add_argument('--fail', action='store_true', help='answer every request with HTTP 503')
+    args = parser.parse_args(argv)
+
+    serve(args.port, args.delay, args.fail)
+    print(f"Completion stub on http://127.0.0.1:{args.port}/v1 (delay {args.delay}s)")
+    try:
+        while True:
+            time.sleep(10)
+            stats = StubHandler.stats
+            if stats['requests']:
+                print(f"{stats['requests']} requests, {stats['prompts']} prompts, "
+                      f"{len(stats['connections'])} connections")
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Scripted full-interview load test for the chatbot
+
+Runs every occupation/role/job type/job mode branch of /get_message,
+including invalid answers and resume uploads of the sample files in
+uploads/, through Flask's test client in a scratch working directory.
+Reports per-step latency percentiles and interviews per second, and can
+compare throughput against a stored baseline and profile the hot path.
+Throughput depends on the machine, so save the baseline on the host that
+runs the check.
+
+    python -m benchmarks.load_test --rounds 2
+    python -m benchmarks.load_test --save-baseline
+    python -m benchmarks.load_test --check-baseline --tolerance 0.25
+    python -m benchmarks.load_test --profile 25
+    python -m benchmarks.load_test --transcript run1.json
+
+Question sampling and phrase choice are seeded from the interview ID, and a
+fresh working directory numbers interviews from 1, so two runs with the same
+``--seed`` write identical transcripts.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import itertools
+import tempfile
+import cProfile
+import pstats
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(REPO_DIR, 'benchmarks', 'baseline.json')
+
+OCCUPATIONS = ["Student", "Fresher", "Experienced Professional"]
+ROLES = ["UI/UX", "Java", "AI/ML"]
+JOB_TYPES = ["Full-time", "Part-time", "Freelancing"]
+JOB_MODES = ["Remote", "Onsite", "Hybrid"]
+
+ANSWERS = [
+    "I worked on a project building a recommendation system at university.",
+    "Mostly Python and Java, and I study machine learning in my free time.",
+    "I led a small team and learned a lot about stakeholder communication.",
+    "Honestly it was a difficult experience, but I improved my testing habits.",
+]
+
+
+def load_app(workdir):
+    """Import the app with its data and upload folders inside ``workdir``"""
+    shutil.copy(os.path.join(REPO_DIR, 'questions.csv'), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import main
+    return main
+
+
+def sample_resumes():
+    """Sample uploads shipped with the repo, as (name, bytes) pairs"""
+    folder = os.path.join(REPO_DIR, 'uploads')
+    resumes = []
+    for name in sorted(os.listdir(folder)):
+        if name.rsplit('.', 1)[-1].lower() in ('pdf', 'doc', 'docx'):
+            with open(os.path.join(folder, name), 'rb') as f:
+                resumes.append((name.split('_', 1)[-1], f.read()))
+    return resumes
+
+
+def pick(options, value, use_number):
+    """Answer a choice step by label or by its 1-based position"""
+    return str(options.index(value) + 1) if use_number else value
+
+
+def run_interview(client, timings, branch, resume, rng, transcript=None):
+    """Drive one complete interview, timing every request by step name
+
+    Each turn's bot response and next question are appended to
+    ``transcript`` when a list is given.
+    """
+    occupation, role, job_type, job_mode, use_numbers = branch
+
+    def send(step, message):
+        started = time.perf_counter()
+        response = client.post('/get_message', data={'user_message': message})
+        timings.setdefault(step, []).append(time.perf_counter() - started)
+        turn = response.get_json()
+        if transcript is not None:
+            transcript.append([turn['bot_response'], turn['next_question']])
+        return turn
+
+    started = time.perf_counter()
+    client.get('/')
+    timings.setdefault('index', []).append(time.perf_counter() - started)
+
+    turn = send('general', '')
+    while not turn['is_options']:
+        turn = send('general', rng.choice(ANSWERS))
+
+    send('occupation_invalid', 'not sure')
+    turn = send('occupation_select', pick(OCCUPATIONS, occupation, use_numbers))
+    while not turn['is_options']:
+        turn = send('occupation_answer', rng.choice(ANSWERS))
+
+    send('job_role_invalid', 'something else')
+    turn = send('job_role_select', pick(ROLES, role, use_numbers))
+    while not turn['is_options']:
+        turn = send('job_role_answer', rng.choice(ANSWERS))
+
+    send('job_type_invalid', '?')
+    send('job_type_select', pick(JOB_TYPES, job_type, use_numbers))
+    send('job_mode_invalid', '?')
+    send('job_mode_select', pick(JOB_MODES, job_mode, use_numbers))
+    send('resume_waiting', 'later')
+
+    name, content = resume
+    started = time.perf_counter()
+    client.post(
+        '/upload_resume',
+        data={'resume': (io.BytesIO(content), name)},
+        content_type='multipart/form-data',
+    )
+    timings.setdefault('upload_resume', []).append(time.perf_counter() - started)
+
+    send('complete', 'file_uploaded')
+    send('finish', 'No')
+
+    started = time.perf_counter()
+    client.get('/get_history')
+    timings.setdefault('get_history', []).append(time.perf_counter() - started)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(timings, interviews, elapsed):
+    steps = {}
+    for step, values in timings.items():
+        values = sorted(values)
+        steps[step] = {
+            'count': len(values),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+        }
+    return {
+        'interviews': interviews,
+        'elapsed_seconds': round(elapsed, 3),
+        'interviews_per_second': round(interviews / elapsed, 2) if elapsed else 0.0,
+        'steps': steps,
+    }
+
+
+def run(rounds, seed, transcripts=None):
+    """Run every branch ``rounds`` times and return the summary
+
+    Pass a list as ``transcripts`` to collect one transcript per interview.
+    """
+    main = load_app(tempfile.mkdtemp(prefix='chatbot-bench-'))
+    resumes = sample_resumes()
+    rng = random.Random(seed)
+    branches = list(itertools.product(OCCUPATIONS, ROLES, JOB_TYPES, JOB_MODES, (False, True)))
+
+    timings = {}
+    interviews = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for i, branch in enumerate(branches):
+            client = main.app.test_client()
+            transcript = [] if transcripts is not None else None
+            run_interview(client, timings, branch, resumes[i % len(resumes)], rng, transcript)
+            if transcript is not None:
+                transcripts.append(transcript)
+            interviews += 1
+    elapsed = time.perf_counter() - started
+    return summarize(timings, interviews, elapsed)
+
+
+def print_report(summary):
+    print(f"{'step':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step, stats in summary['steps'].items():
+        print(f"{step:<22}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    print(f"\n{summary['interviews']} interviews in {summary['elapsed_seconds']}s "
+          f"= {summary['interviews_per_second']} interviews/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=1, help='passes over all branches')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--json', help='write the summary to this file')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--check-baseline', action='store_true', help='fail if throughput regressed')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed throughput drop (fraction)')
+    parser.add_argument('--profile', type=int, metavar='N', help='print the top N functions by cumulative time')
+    parser.add_argument('--transcript', help='write every interview\'s bot turns to this file')
+    args = parser.parse_args(argv)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    transcripts = [] if args.transcript else None
+    summary = run(args.rounds, args.seed, transcripts)
+    if profiler:
+        profiler.disable()
+
+    print_report(summary)
+    if profiler:
+        print()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(args.profile)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    if args.transcript:
+        with open(args.transcript, 'w') as f:
+            json.dump(transcripts, f, indent=1)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'interviews_per_second': summary['interviews_per_second']}, f, indent=2)
+            f.write('\n')
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.check_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['interviews_per_second']
+        floor = baseline * (1 - args.tolerance)
+        if summary['interviews_per_second'] < floor:
+            print(f"FAIL: {summary['interviews_per_second']} interviews/s is below {floor:.2f} "
+                  f"(baseline {baseline}, tolerance {args.tolerance:.0%})")
+            return 1
+        print(f"OK: throughput within {args.tolerance:.0%} of baseline {baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Two app nodes sharing one Redis, driven by candidates that alternate nodes
+
+Starts two gunicorn nodes, each in its own scratch directory with its own
+data/ and uploads/, and points both at one Redis server. Every request of
+a simulated candidate goes to the other node from the one before, so
+sessions, transcripts, resume jobs and uploads must all be shared. Then
+checks that:
+
+- every interview was stored once, under its own ID
+- each resume job can be polled and each upload downloaded on the node
+  that did not receive it
+- each extracted resume reaches a search index
+- gc-uploads keeps every blob in Redis that an upload still points to
+
+Without --redis-url an in-process fakeredis server is started, which needs
+the fakeredis package (a development dependency only).
+
+    python -m benchmarks.multi_node --candidates 4 --interviews 2
+    python -m benchmarks.multi_node --redis-url redis://127.0.0.1:6379/15
+"""
+import os
+import re
+import sys
+import time
+import uuid
+import random
+import argparse
+import itertools
+import tempfile
+import threading
+import subprocess
+from urllib.parse import quote
+
+from benchmarks.concurrency import HttpClient, free_port, start_server
+from benchmarks.load_test import (
+    REPO_DIR, OCCUPATIONS, ROLES, JOB_TYPES, JOB_MODES, run_interview, sample_resumes,
+)
+
+_WORD_RE = re.compile(r'[A-Za-z]{7,}')
+
+
+class AlternatingClient(HttpClient):
+    """HttpClient that sends each request to the next node in turn
+
+    Upload responses are kept with the node that received them.
+    """
+
+    def __init__(self, ports):
+        super().__init__(ports[0], 0)
+        self._ports = itertools.cycle(ports)
+        self.uploads = []
+
+    def _request(self, method, path, body=b'', headers=None, trickle=False):
+        self.port = next(self._ports)
+        return super()._request(method, path, body, headers, trickle)
+
+    def post(self, path, data, content_type=None):
+        response = super().post(path, data, content_type)
+        if path == '/upload_resume':
+            self.uploads.append((self.port, response.get_json()))
+        return response
+
+
+def start_fake_redis():
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        raise SystemExit("Install fakeredis or pass --redis-url to run the multi-node check")
+    port = free_port()
+    server = TcpFakeServer(('127.0.0.1', port), server_type='redis')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"redis://127.0.0.1:{port}/0"
+
+
+def node_workdir(name):
+    workdir = tempfile.mkdtemp(prefix=f'chatbot-{name}-')
+    with open(os.path.join(REPO_DIR, 'questions.csv'), 'rb') as src, \
+            open(os.path.join(workdir, 'questions.csv'), 'wb') as dst:
+        dst.write(src.read())
+    return workdir
+
+
+def wait_for_job(port, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = HttpClient(port, 0).get(f'/resume_status/{job_id}')
+        if response.status_code != 200:
+            return None
+        status = response.get_json()
+        if status['status'] not in ('queued', 'running') or time.monotonic() > deadline:
+            return status
+        time.sleep(0.2)
+
+
+def run(redis_url, candidates, interviews, seed):
+    import redis
+
+    client = redis.Redis.from_url(redis_url)
+    if client.dbsize():
+        raise SystemExit(f"{redis_url} is not empty; point --redis-url at an unused database")
+    os.environ['REDIS_URL'] = redis_url
+    os.environ.setdefault('SECRET_KEY', uuid.uuid4().hex)
+    workdirs = [node_workdir('node-a'), node_workdir('node-b')]
+    ports = [free_port(), free_port()]
+    servers = [start_server('sync', 1, port, workdir) for port, workdir in zip(ports, workdirs)]
+
+    failures = []
+
+    def check(ok, message):
+        print(f"{'OK' if ok else 'FAIL'}: {message}")
+        if not ok:
+            failures.append(message)
+
+    try:
+        resumes = sample_resumes()
+        branches = list(itertools.product(OCCUPATIONS, ROLES, JOB_TYPES, JOB_MODES, (False, True)))
+        uploads = []
+        errors = []
+        lock = threading.Lock()
+
+        def candidate(index):
+            rng = random.Random(seed + index)
+            # Candidates start on different nodes so both allocate IDs at once
+            order = ports if index % 2 == 0 else ports[::-1]
+            for _ in range(interviews):
+                alternating = AlternatingClient(order)
+                try:
+                    run_interview(alternating, {}, rng.choice(branches), rng.choice(resumes), rng)
+                except Exception as e:
+                    errors.append(str(e))
+                with lock:
+                    uploads.extend(alternating.uploads)
+
+        threads = [threading.Thread(target=candidate, args=(i,)) for i in range(candidates)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        expected = candidates * interviews
+        check(not errors, f"{expected} interviews ran across both nodes ({len(errors)} errors)")
+        # The write-behind queue flushes about once a second
+        deadline = time.monotonic() + 30
+        while client.zcard('chatbot:results:ids') < expected and time.monotonic() < deadline:
+            time.sleep(0.2)
+        check(client.zcard('chatbot:results:ids') == expected,
+              f"{client.zcard('chatbot:results:ids')} of {expected} interviews stored, one per ID")
+
+        texts = {}
+        for port, upload in uploads:
+            other = ports[1 - ports.index(port)]
+            status = wait_for_job(other, upload['job_id'])
+            check(status is not None and status['status'] == 'done',
+                  f"job {upload['job_id'][:8]} from :{port} is {status and status['status']} on :{other}")
+            download = HttpClient(other, 0).get('/download/' + quote(upload['filename']))
+            check(download.status_code == 200 and len(download.data) > 0,
+                  f"{upload['filename']} uploaded to :{port} downloads from :{other}")
+            if status is not None:
+                text = client.get(f"chatbot:resume:text:{status['interview_id']}")
+                texts[status['interview_id']] = text.decode('utf-8') if text else ''
+
+        # The text reaches the index of the node that saved the interview, or
+        # of the node that extracted it when that finished later
+        time.sleep(1)
+        for interview_id, text in texts.items():
+            words = _WORD_RE.findall(text)
+            if not words:
+                continue
+            query = f'"{words[len(words) // 2]}"'
+            found = any(
+                interview_id in [hit['interview_id'] for hit in
+                                 HttpClient(port, 0).get(f'/search?limit=100&q={quote(query)}').get_json()['results']]
+                for port in ports
+            )
+            check(found, f"resume text of interview {interview_id} is searchable ({query})")
+
+        result = subprocess.run(
+            [sys.executable, '-m', 'flask', '--app', 'main', 'gc-uploads', '--min-age', '0'],
+            cwd=workdirs[0], env=dict(os.environ, PYTHONPATH=REPO_DIR), capture_output=True, text=True,
+        )
+        print(result.stdout.strip())
+        check(result.returncode == 0 and 'Removed 0 orphaned blobs from Redis' in result.stdout,
+              "gc-uploads kept every blob an upload points to")
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait(30)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--redis-url', help='empty Redis database to share; default starts fakeredis')
+    parser.add_argument('--candidates', type=int, default=4, help='concurrent candidates')
+    parser.add_argument('--interviews', type=int, default=2, help='interviews per candidate')
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    redis_url = args.redis_url
+    if redis_url is None:
+        _, redis_url = start_fake_redis()
+    failures = run(redis_url, args.candidates, args.interviews, args.seed)
+    print(f"{len(failures)} checks failed" if failures else "All checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
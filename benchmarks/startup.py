@@ -0,0 +1,118 @@
+"""Cold-start cost of a chatbot worker process
+
+Starts fresh interpreters the way a process manager starts workers and
+reports, per worker, how long ``import main`` took and the latency of its
+first requests: the page, the opening turn and the first answered turn,
+which is the first to need the sentiment analyzer. Modes:
+
+    eager    every worker imports the app and loads NLTK (NLP_EAGER_INIT=1)
+    lazy     every worker imports the app; NLTK loads on the first answer
+    preload  the app is imported once and workers are forked from it, as
+             gunicorn does with ``preload_app`` (see gunicorn.conf.py)
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --mode preload --workers 4 --json startup.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('eager', 'lazy', 'preload')
+
+
+def first_requests(main):
+    """Time the first requests a new worker answers, in milliseconds"""
+    client = main.app.test_client()
+    timings = {}
+    for name, send in (
+        ('index', lambda: client.get('/')),
+        ('first_turn', lambda: client.post('/get_message', data={'user_message': ''})),
+        ('first_answer', lambda: client.post('/get_message', data={'user_message': 'I worked on a project at university.'})),
+    ):
+        started = time.perf_counter()
+        send()
+        timings[f"{name}_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return timings
+
+
+def child(mode, workers):
+    """Run inside the fresh interpreter; prints one JSON line per worker"""
+    sys.path.insert(0, REPO_DIR)
+    started = time.perf_counter()
+    import main
+    import_seconds = round(time.perf_counter() - started, 3)
+
+    if mode != 'preload':
+        print(json.dumps({'import_s': import_seconds, **first_requests(main)}), flush=True)
+        return
+
+    sys.stdout.flush()
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            # Forked workers inherit the imported app and pay no import time
+            print(json.dumps({'import_s': 0.0, 'master_import_s': import_seconds, **first_requests(main)}), flush=True)
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+
+def run(mode, workers):
+    """Start ``workers`` cold workers in ``mode`` and return one result per worker"""
+    workdir = tempfile.mkdtemp(prefix=f'chatbot-startup-{mode}-')
+    shutil.copy(os.path.join(REPO_DIR, 'questions.csv'), workdir)
+    env = dict(os.environ, NLP_EAGER_INIT='0' if mode == 'lazy' else '1')
+    command = [sys.executable, '-m', 'benchmarks.startup', '--child', mode, '--workers', str(workers)]
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_DIR, env.get('PYTHONPATH')]))
+    # Without preload each worker is its own interpreter
+    launches = 1 if mode == 'preload' else workers
+    results = []
+    for _ in range(launches):
+        output = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True, check=True).stdout
+        results.extend(json.loads(line) for line in output.splitlines() if line.startswith('{'))
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_report(mode, results):
+    print(f"== {mode}")
+    print(f"{'worker':<8}{'import s':>10}{'index ms':>10}{'turn ms':>10}{'answer ms':>11}")
+    for i, result in enumerate(results, 1):
+        print(f"{i:<8}{result['import_s']:>10.3f}{result['index_ms']:>10.2f}"
+              f"{result['first_turn_ms']:>10.2f}{result['first_answer_ms']:>11.2f}")
+    if results and 'master_import_s' in results[0]:
+        print(f"master import: {results[0]['master_import_s']:.3f}s, once for all workers")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=MODES + ('all',), default='all')
+    parser.add_argument('--workers', type=int, default=3, help='workers to start per mode')
+    parser.add_argument('--json', help='write the per-worker results to this file')
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child, args.workers)
+        return 0
+
+    modes = MODES if args.mode == 'all' else (args.mode,)
+    report = {}
+    for mode in modes:
+        report[mode] = run(mode, args.workers)
+        print_report(mode, report[mode])
+        print()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
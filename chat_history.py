@@ -0,0 +1,124 @@
+import json
+import time
+
+from sqlite_utils import LocalConnection, ThrottledEviction
+
+
+class ChatHistoryStore:
+    """Chat transcripts stored one row per message in a WAL-mode SQLite database
+
+    A chat turn inserts its new messages instead of rewriting the whole
+    transcript, and /get_history reads a page by position. The session only
+    keeps the message count, which doubles as the history cursor.
+    Messages are dropped ``ttl`` seconds after they were written, the same
+    lifetime as an idle session.
+    """
+
+    def __init__(self, path, ttl, evict_interval=60.0):
+        self.path = path
+        self.ttl = ttl
+        self._maybe_evict = ThrottledEviction(self.evict_expired, evict_interval, 'chat history')
+        self._connection = LocalConnection(path)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_history ("
+            " interview_id INTEGER NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " sender TEXT NOT NULL,"
+            " message TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " PRIMARY KEY (interview_id, seq))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_created ON chat_history (created)")
+
+    def append(self, interview_id, start, messages):
+        """Store ``messages`` as positions ``start``, ``start + 1``, ...
+
+        A retried turn overwrites the positions it already wrote.
+        """
+        if not messages:
+            return
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chat_history (interview_id, seq, sender, message, created)"
+                " VALUES (?, ?, ?, ?, ?)",
+                ((interview_id, start + i, m['sender'], m['message'], now) for i, m in enumerate(messages)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._maybe_evict(now)
+
+    def read(self, interview_id, since=0, limit=None, end=None):
+        """Return messages ``since`` <= position < ``end``, at most ``limit`` of them"""
+        query = "SELECT sender, message FROM chat_history WHERE interview_id = ? AND seq >= ?"
+        params = [interview_id, since]
+        if end is not None:
+            # Rows past the session's count belong to an abandoned retry
+            query += " AND seq < ?"
+            params.append(end)
+        query += " ORDER BY seq"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = self._connection().execute(query, params).fetchall()
+        return [{"sender": sender, "message": message} for sender, message in rows]
+
+    def evict_expired(self, now=None):
+        """Remove messages older than the TTL and return how many were dropped"""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        removed = conn.execute("DELETE FROM chat_history WHERE created < ?", (now - self.ttl,)).rowcount
+        conn.execute("COMMIT")
+        return removed
+
+
+class RedisChatHistory:
+    """Chat transcripts in one Redis hash per interview, shared by every node
+
+    Fields are message positions, so a turn writes only its new messages
+    and a retried turn overwrites the positions it already wrote, as in
+    ChatHistoryStore. The hash expires ``ttl`` seconds after its last write.
+    """
+
+    def __init__(self, client, ttl, prefix='chatbot:history:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def append(self, interview_id, start, messages):
+        if not messages:
+            return
+        key = f"{self.prefix}{interview_id}"
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(key, mapping={
+            start + i: json.dumps([m['sender'], m['message']]) for i, m in enumerate(messages)
+        })
+        pipe.expire(key, int(self.ttl))
+        pipe.execute()
+
+    def read(self, interview_id, since=0, limit=None, end=None):
+        """Return messages ``since`` <= position < ``end``, at most ``limit`` of them"""
+        key = f"{self.prefix}{interview_id}"
+        if end is None:
+            end = self.client.hlen(key)
+        if limit is not None:
+            end = min(end, since + limit)
+        if end <= since:
+            return []
+        messages = []
+        for value in self.client.hmget(key, list(range(since, end))):
+            if value is None:
+                # Expired or never written; later positions would leave a gap
+                break
+            sender, message = json.loads(value)
+            messages.append({"sender": sender, "message": message})
+        return messages
+
+    def evict_expired(self, now=None):
+        return 0
@@ -0,0 +1,22 @@
+"""Gunicorn settings: ``gunicorn main:app`` picks this file up from the working directory
+
+The app, including the NLTK models (NLP_EAGER_INIT=1), is imported once in
+the master and every worker is forked from it. Workers start without
+importing anything, answer their first chat turn at full speed, and share
+the loaded modules' memory pages copy-on-write. Connections, process pools
+and the write-behind queue are created per worker process after the fork.
+Each worker starts its write-behind writer as soon as it boots, so a worker
+that replaces a killed one replays the killed worker's spill file.
+"""
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 3))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def post_worker_init(worker):
+    import main
+
+    if main.persistence_queue is not None:
+        main.persistence_queue.start()
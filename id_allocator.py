@@ -0,0 +1,89 @@
+import os
+import fcntl
+
+
+class FileIdAllocator:
+    """Sequential interview IDs from a counter file guarded by ``fcntl``
+
+    Each call locks the counter file, reads the last issued ID, writes the
+    next one and releases the lock, so the cost is constant and concurrent
+    workers can never hand out the same ID. ``seed`` is called once, under
+    the lock, when the counter file is first created so numbering carries on
+    from interviews that are already stored.
+    """
+
+    def __init__(self, path, seed=None):
+        self.path = path
+        self.seed = seed
+
+    def _update(self, update):
+        # Call update(last issued ID) under the lock and store what it returns
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 64, 0).strip()
+            if raw:
+                last_id = int(raw)
+            else:
+                last_id = int(self.seed()) if self.seed else 0
+            new_id = update(last_id)
+            encoded = str(new_id).encode('ascii')
+            os.pwrite(fd, encoded, 0)
+            os.ftruncate(fd, len(encoded))
+            return new_id
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def next_id(self):
+        return self._update(lambda last_id: last_id + 1)
+
+    def advance_to(self, min_id):
+        """Make sure every later ID is above ``min_id``, e.g. after an import"""
+        return self._update(lambda last_id: max(last_id, int(min_id)))
+
+
+class RedisIdAllocator:
+    """Sequential interview IDs from an ``INCR`` counter shared by every node
+
+    The first process to start seeds the counter with ``SET NX`` from
+    ``seed``, so numbering carries on from stored interviews, and ``INCR``
+    is atomic on the server, so no two nodes hand out the same ID.
+    ``advance_to`` only ever raises the counter, under ``WATCH``.
+    """
+
+    def __init__(self, client, key='chatbot:interview_id', seed=None):
+        self.client = client
+        self.key = key
+        self.seed = seed
+        self._seeded = seed is None
+
+    def next_id(self):
+        if not self._seeded:
+            self.client.set(self.key, int(self.seed()), nx=True)
+            self._seeded = True
+        return int(self.client.incr(self.key))
+
+    def advance_to(self, min_id):
+        """Make sure every later ID is above ``min_id``, e.g. after an import"""
+        import redis
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.key)
+                    current = pipe.get(self.key)
+                    if current is not None:
+                        if int(current) >= min_id:
+                            return int(current)
+                        last_id = int(current)
+                    else:
+                        last_id = int(self.seed()) if self.seed else 0
+                    new_id = max(last_id, int(min_id))
+                    pipe.multi()
+                    pipe.set(self.key, new_id)
+                    pipe.execute()
+                    self._seeded = True
+                    return new_id
+                except redis.WatchError:
+                    continue
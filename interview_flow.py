@@ -0,0 +1,279 @@
+import json
+from types import MappingProxyType
+
+
+def make_turn(bot_response="", next_question="", options=(), is_file_upload=False):
+    """Build the /get_message JSON payload for one chat turn"""
+    return {
+        "bot_response": bot_response,
+        "next_question": next_question,
+        "is_options": bool(options),
+        "options": list(options),
+        "is_file_upload": is_file_upload
+    }
+
+
+def _require(spec, name, key):
+    if key not in spec:
+        raise ValueError(f"Flow step '{name}' is missing '{key}'")
+    return spec[key]
+
+
+class QuestionsStep:
+    """Asks a fixed list of questions, then moves to the next step"""
+
+    __slots__ = ('name', 'source', 'welcome', 'transition', 'next')
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.source = _require(spec, name, 'source')
+        self.welcome = spec.get('welcome', "")
+        self.transition = spec.get('transition', "")
+        self.next = _require(spec, name, 'next')
+
+    def enter(self, flow, session, bot_response):
+        questions = flow.load_questions(self.source, None, session)
+        session['current_step'] = self.name
+        session['current_question'] = questions[0]
+        session['question_index'] = 1
+        return make_turn(bot_response, questions[0])
+
+    def handle(self, flow, session, message, question_index):
+        questions = flow.load_questions(self.source, None, session)
+
+        if question_index < len(questions):
+            # Generate creative response based on user's previous message
+            if message:
+                bot_response = flow.respond(message, session, self.name)
+            else:
+                bot_response = self.welcome
+            next_question = questions[question_index]
+            session['current_question'] = next_question
+            session['question_index'] = question_index + 1
+            return make_turn(bot_response, next_question)
+
+        bot_response = flow.respond(message, session, self.name) + self.transition
+        return flow.enter(self.next, session, bot_response)
+
+
+class Followup:
+    """Questions sampled for the option picked in a choice step"""
+
+    __slots__ = ('source', 'session_key', 'answer_prefix', 'skip_reply', 'transition')
+
+    def __init__(self, name, spec):
+        self.source = _require(spec, name, 'source')
+        self.session_key = _require(spec, name, 'session_key')
+        self.answer_prefix = _require(spec, name, 'answer_prefix')
+        self.skip_reply = spec.get('skip_reply', "{reply}")
+        self.transition = spec.get('transition', "")
+
+
+class ChoiceStep:
+    """Offers options, records the pick and optionally asks follow-ups"""
+
+    __slots__ = ('name', 'prompt', 'options', 'choices', 'invalid', 'selection_key',
+                 'response_key', 'replies', 'reply', 'followup', 'next')
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.prompt = _require(spec, name, 'prompt')
+        self.options = tuple(_require(spec, name, 'options'))
+        # Options can be picked by label or by their 1-based position
+        choices = {str(i): option for i, option in enumerate(self.options, 1)}
+        choices.update((option, option) for option in self.options)
+        self.choices = MappingProxyType(choices)
+        self.invalid = _require(spec, name, 'invalid')
+        self.selection_key = spec.get('selection_key')
+        self.response_key = spec.get('response_key', name)
+        self.replies = MappingProxyType(dict(spec.get('replies', {})))
+        self.reply = spec.get('reply', "{reply}")
+        self.followup = Followup(name, spec['followup']) if 'followup' in spec else None
+        self.next = _require(spec, name, 'next')
+
+    def enter(self, flow, session, bot_response):
+        session['current_step'] = self.name
+        session['current_question'] = self.prompt
+        session['question_index'] = 0
+        return make_turn(bot_response, self.prompt, self.options)
+
+    def handle(self, flow, session, message, question_index):
+        if self.followup is not None and question_index > 0:
+            return self._handle_followup(flow, session, message, question_index)
+
+        selection = self.choices.get(message)
+        if selection is None:
+            session['current_question'] = self.prompt
+            return make_turn(self.invalid, self.prompt, self.options)
+
+        if self.selection_key:
+            session[self.selection_key] = selection
+        session['responses'][self.response_key] = selection
+        session['questions'][self.response_key] = self.prompt
+        reply = self.replies.get(selection, f"You selected: {selection}")
+
+        if self.followup is None:
+            return flow.enter(self.next, session, self.reply.format(reply=reply, selection=selection))
+
+        questions = flow.load_questions(self.followup.source, selection, session)
+        session[self.followup.session_key] = questions
+        if questions:
+            session['current_question'] = questions[0]
+            session['question_index'] = 1
+            return make_turn(reply, questions[0])
+
+        bot_response = self.followup.skip_reply.format(reply=reply, selection=selection)
+        return flow.enter(self.next, session, bot_response)
+
+    def _handle_followup(self, flow, session, message, question_index):
+        questions = session.get(self.followup.session_key, [])
+        if question_index > len(questions):
+            return make_turn()
+
+        question_key = f"{self.followup.answer_prefix}{question_index}"
+        session['responses'][question_key] = message
+        session['questions'][question_key] = session['current_question']
+
+        if question_index < len(questions):
+            bot_response = flow.respond(message, session, self.name)
+            next_question = questions[question_index]
+            session['current_question'] = next_question
+            session['question_index'] = question_index + 1
+            return make_turn(bot_response, next_question)
+
+        bot_response = flow.respond(message, session, self.name) + self.followup.transition
+        return flow.enter(self.next, session, bot_response)
+
+
+class UploadStep:
+    """Waits for the resume upload, then completes the interview"""
+
+    __slots__ = ('name', 'prompt', 'waiting', 'done', 'next')
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.prompt = _require(spec, name, 'prompt')
+        self.waiting = _require(spec, name, 'waiting')
+        self.done = _require(spec, name, 'done')
+        self.next = _require(spec, name, 'next')
+
+    def enter(self, flow, session, bot_response):
+        session['current_step'] = self.name
+        session['current_question'] = self.prompt
+        session['question_index'] = 0
+        return make_turn(bot_response, self.prompt, is_file_upload=True)
+
+    def handle(self, flow, session, message, question_index):
+        if not session.get('resume_uploaded', False):
+            return make_turn(self.waiting, self.prompt, is_file_upload=True)
+
+        turn = flow.enter(self.next, session, self.done)
+        flow.on_complete(session)
+        return turn
+
+
+class RestartStep:
+    """Final step: start a new interview or say goodbye"""
+
+    __slots__ = ('name', 'prompt', 'options', 'restart', 'unavailable', 'goodbye')
+
+    # Answers are not recorded once the interview is complete
+    records_answers = False
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.prompt = _require(spec, name, 'prompt')
+        self.options = tuple(_require(spec, name, 'options'))
+        self.restart = _require(spec, name, 'restart')
+        self.unavailable = _require(spec, name, 'unavailable')
+        self.goodbye = _require(spec, name, 'goodbye')
+
+    def enter(self, flow, session, bot_response):
+        session['current_step'] = self.name
+        return make_turn(bot_response, self.prompt, self.options)
+
+    def handle(self, flow, session, message, question_index):
+        # The first option restarts, picked by label (any case) or as "1"
+        if message.lower() != self.options[0].lower() and message != '1':
+            return make_turn(self.goodbye, "")
+
+        flow.on_restart(session)
+        start = flow.steps[flow.start]
+        if not flow.load_questions(start.source, None, session):
+            return make_turn(self.unavailable)
+        return flow.enter(flow.start, session, self.restart)
+
+
+STEP_TYPES = {
+    'questions': QuestionsStep,
+    'choice': ChoiceStep,
+    'upload': UploadStep,
+    'restart': RestartStep,
+}
+
+
+class InterviewFlow:
+    """Interview state machine compiled once from a declarative flow config
+
+    Each step of the config becomes an immutable step object in a read-only
+    transition table, so a chat turn is a single lookup on
+    ``session['current_step']`` followed by that step's handler. The host
+    app supplies question sources, called with the selected option and the
+    session, and hooks for response generation, completion and restart.
+    """
+
+    def __init__(self, config, question_sources, respond, on_complete, on_restart):
+        steps = config.get('steps') or {}
+        compiled = {}
+        for name, spec in steps.items():
+            step_type = STEP_TYPES.get(spec.get('type'))
+            if step_type is None:
+                raise ValueError(f"Flow step '{name}' has unknown type '{spec.get('type')}'")
+            compiled[name] = step_type(name, spec)
+
+        for step in compiled.values():
+            target = getattr(step, 'next', None)
+            if target is not None and target not in compiled:
+                raise ValueError(f"Flow step '{step.name}' points to unknown step '{target}'")
+            source = getattr(step, 'source', None) or getattr(getattr(step, 'followup', None), 'source', None)
+            if source is not None and source not in question_sources:
+                raise ValueError(f"Flow step '{step.name}' uses unknown question source '{source}'")
+
+        self.start = config.get('start')
+        if not isinstance(compiled.get(self.start), QuestionsStep):
+            raise ValueError("Flow 'start' must name a questions step")
+
+        self.steps = MappingProxyType(compiled)
+        self.question_sources = MappingProxyType(dict(question_sources))
+        self.respond = respond
+        self.on_complete = on_complete
+        self.on_restart = on_restart
+
+    def load_questions(self, source, selection, session):
+        return self.question_sources[source](selection, session)
+
+    def enter(self, name, session, bot_response):
+        return self.steps[name].enter(self, session, bot_response)
+
+    def handle(self, session, message):
+        """Advance the interview by one user message and return the turn"""
+        current_step = session.get('current_step', self.start)
+        question_index = session.get('question_index', 0)
+        step = self.steps.get(current_step)
+
+        # Store user's response to the previous question
+        if getattr(step, 'records_answers', True) and 'current_question' in session:
+            question_key = f"{current_step}_{question_index-1}" if question_index > 0 else "start"
+            session['responses'][question_key] = message
+            session['questions'][question_key] = session['current_question']
+
+        if step is None:
+            return make_turn()
+        return step.handle(self, session, message, question_index)
+
+
+def load_flow(path, **hooks):
+    """Compile the flow config at ``path`` into an InterviewFlow"""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    return InterviewFlow(config, **hooks)
@@ -1,14 +1,36 @@
 import os
+import sys
 import random
 import datetime
-import json
-import re
 import secrets
-import pandas as pd
-import numpy as np
-from flask import Flask, jsonify, request, render_template, session, send_from_directory
-from werkzeug.utils import secure_filename
+import time
+import contextvars
+import click
+from flask import Flask, Response, abort, g, jsonify, request, render_template, session
+from werkzeug.exceptions import NotFound
+from werkzeug.http import quote_etag
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename, send_file
 from werkzeug.middleware.proxy_fix import ProxyFix
+from question_bank import QuestionBank
+from results_store import create_results_store, copy_records, export_xlsx, import_xlsx
+from id_allocator import FileIdAllocator, RedisIdAllocator
+from redis_utils import connect_redis
+from text_analysis import init_text_analysis, analyze_message, download_resources, text_analysis_stats
+from batch_scoring import rescore_results
+from answer_quality import AnswerQualityScorer, score_results
+from session_store import SQLiteSessionStore, RedisSessionStore, ServerSideSessionInterface
+from chat_history import ChatHistoryStore, RedisChatHistory
+from interview_flow import load_flow
+from response_phrases import compose_response, interview_rng
+from response_generation import create_response_generator
+from resume_processing import ResumeProcessor, ResumeJobStore, RedisResumeJobStore, UploadTooLarge
+from upload_store import ContentAddressedStore, RedisBlobMirror
+from search_index import SearchIndex, FILTER_FIELDS
+from resume_matching import ResumeMatcher
+from metrics import MetricsRegistry, SIZE_BUCKETS, timed
+from persistence_queue import WriteBehindQueue, exit_on_sigterm
+from analytics import ColumnarResults, METRICS
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -16,6 +38,43 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(16))
 app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+app.config['MAX_RESUME_BYTES'] = int(os.environ.get('MAX_RESUME_BYTES', 10 * 1024 * 1024))  # 10MB per resume
+app.config['RESUME_WORKERS'] = int(os.environ.get('RESUME_WORKERS', 2))  # background text extraction processes
+app.config['REDIS_URL'] = os.environ.get('REDIS_URL')  # state shared by several app nodes; unset keeps it on local disk
+app.config['RESULTS_BACKEND'] = os.environ.get(
+    'RESULTS_BACKEND', 'redis' if app.config['REDIS_URL'] else 'normalized'
+)  # 'normalized', 'sqlite', 'jsonl' or 'redis'
+app.config['SESSION_BACKEND'] = os.environ.get(
+    'SESSION_BACKEND', 'redis' if app.config['REDIS_URL'] else 'sqlite'
+)  # 'sqlite', 'redis' or 'cookie'
+app.config['SESSION_TTL_SECONDS'] = int(os.environ.get('SESSION_TTL_SECONDS', 24 * 60 * 60))
+app.config['HISTORY_PAGE_SIZE'] = int(os.environ.get('HISTORY_PAGE_SIZE', 200))  # default and largest /get_history page
+app.config['INTERVIEW_FLOW_FILE'] = os.environ.get(
+    'INTERVIEW_FLOW_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flows', 'default.json')
+)
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'  # serve /metrics and record timings
+app.config['NLP_EAGER_INIT'] = os.environ.get('NLP_EAGER_INIT', '1') == '1'  # load NLTK at import; '0' defers it to the first chat turn
+app.config['WRITE_BEHIND'] = os.environ.get('WRITE_BEHIND', '1') == '1'  # persist interviews off the request path
+app.config['WRITE_BEHIND_QUEUE_SIZE'] = int(os.environ.get('WRITE_BEHIND_QUEUE_SIZE', 1000))
+app.config['WRITE_BEHIND_BATCH_SIZE'] = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 50))
+app.config['WRITE_BEHIND_FLUSH_SECONDS'] = float(os.environ.get('WRITE_BEHIND_FLUSH_SECONDS', 1.0))
+app.config['WRITE_BEHIND_RECOVER_SECONDS'] = float(os.environ.get('WRITE_BEHIND_RECOVER_SECONDS', 30.0))  # replay spill files of dead workers
+app.config['ANALYTICS_COMPACT_FILES'] = int(os.environ.get('ANALYTICS_COMPACT_FILES', 64))  # merge a date partition once it has more files
+app.config['UPLOAD_MIRROR_TTL_SECONDS'] = int(os.environ.get('UPLOAD_MIRROR_TTL_SECONDS', 0))  # expire resumes published to Redis; 0 keeps them
+app.config['DOWNLOAD_MAX_AGE'] = int(os.environ.get('DOWNLOAD_MAX_AGE', 0))  # browser cache for /download/<filename>; revalidated by ETag
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '0') == '1'  # let Apache/lighttpd send downloads
+app.config['RESPONSE_GENERATOR'] = os.environ.get('RESPONSE_GENERATOR', 'template')  # 'template' or 'openai' (any OpenAI-compatible server)
+app.config['LLM_BASE_URL'] = os.environ.get('LLM_BASE_URL', 'http://127.0.0.1:8080/v1')
+app.config['LLM_MODEL'] = os.environ.get('LLM_MODEL', 'local-model')
+app.config['LLM_API_KEY'] = os.environ.get('LLM_API_KEY')
+app.config['LLM_TIMEOUT_SECONDS'] = float(os.environ.get('LLM_TIMEOUT_SECONDS', 1.5))  # longest a chat turn waits before using the templates
+app.config['LLM_REQUEST_TIMEOUT_SECONDS'] = float(os.environ.get('LLM_REQUEST_TIMEOUT_SECONDS', 10.0))  # late replies still fill the cache
+app.config['LLM_BATCH_SIZE'] = int(os.environ.get('LLM_BATCH_SIZE', 8))  # prompts per completion request
+app.config['LLM_BATCH_WINDOW_SECONDS'] = float(os.environ.get('LLM_BATCH_WINDOW_SECONDS', 0.02))
+app.config['LLM_POOL_SIZE'] = int(os.environ.get('LLM_POOL_SIZE', 4))  # concurrent requests / keep-alive connections
+app.config['LLM_MIN_WORDS'] = int(os.environ.get('LLM_MIN_WORDS', 3))  # shorter answers keep the template reply
+app.config['LLM_CACHE_SIZE'] = int(os.environ.get('LLM_CACHE_SIZE', 1024))
+app.config['LLM_CACHE_TTL_SECONDS'] = float(os.environ.get('LLM_CACHE_TTL_SECONDS', 3600))
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 
 # Ensure required directories exist
@@ -24,12 +83,159 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # Global variables to track session state
 QUESTIONS_FILE = os.path.join(os.getcwd(), 'questions.csv')
-RESULTS_FILE = os.path.join(os.getcwd(), 'data', 'interview_results.xlsx')
+DATA_DIR = os.path.join(os.getcwd(), 'data')
+# Excel workbook for recruiters, built on demand with `flask export-xlsx`
+RESULTS_FILE = os.path.join(DATA_DIR, 'interview_results.xlsx')
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx'}
+# Allowance for multipart boundaries and headers around the resume itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+# Blob URLs name their content, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Request and hot-path timings, exported at /metrics
+metrics = MetricsRegistry(enabled=app.config['METRICS_ENABLED'])
+REQUEST_SECONDS = metrics.histogram('chatbot_request_seconds', 'Request latency by endpoint.', labels=('endpoint', 'method'))
+REQUESTS_TOTAL = metrics.counter('chatbot_requests_total', 'Requests by endpoint and status.', labels=('endpoint', 'status'))
+SENTIMENT_SECONDS = metrics.histogram('chatbot_sentiment_seconds', 'Sentiment scoring and tokenization time.')
+GENERATED_REPLIES = metrics.counter('chatbot_generated_replies_total', 'Chat replies of the model generator by source.', labels=('source',))
+GENERATION_SECONDS = metrics.histogram('chatbot_generation_seconds', 'Time a chat turn spent getting its reply.')
+PERSIST_SECONDS = metrics.histogram('chatbot_results_persist_seconds', 'Time to append a batch of interviews to the results store.')
+QUALITY_SECONDS = metrics.histogram('chatbot_quality_scoring_seconds', 'Time to score the answers of a batch of interviews.')
+MATCH_SECONDS = metrics.histogram('chatbot_resume_match_seconds', 'Time to rank resumes against a job role.')
+PERSIST_FAILURES = metrics.counter('chatbot_results_persist_failures_total', 'Interviews that failed to save.')
+FILE_SAVE_SECONDS = metrics.histogram('chatbot_resume_save_seconds', 'Time to stream a resume upload to disk.')
+DUPLICATE_UPLOADS = metrics.counter('chatbot_resume_duplicates_total', 'Resume uploads whose content was already stored.')
+SESSION_BYTES = metrics.histogram('chatbot_session_bytes', 'Serialized session size per request.', buckets=SIZE_BUCKETS)
+SESSION_WRITE_BYTES = metrics.histogram('chatbot_session_write_bytes', 'Session bytes written per request.', buckets=SIZE_BUCKETS)
+
+# Questions are parsed once and reloaded only when the CSV changes on disk
+question_bank = QuestionBank(QUESTIONS_FILE)
+metrics.gauge('chatbot_question_bank_reloads', 'Times questions.csv has been parsed.', lambda: question_bank.reload_count)
+metrics.gauge('chatbot_question_bank_load_seconds', 'Duration of the last questions.csv parse.', lambda: question_bank.last_load_seconds)
+
+# With REDIS_URL set, interview IDs, results, sessions, transcripts and uploads
+# are shared through Redis so any node can serve any request
+shared_state = connect_redis(app.config['REDIS_URL']) if app.config['REDIS_URL'] else None
+if shared_state is not None and not os.environ.get('SECRET_KEY'):
+    # Every node must sign session cookies with the same key; the first to start picks it
+    shared_state.set('chatbot:secret_key', secrets.token_hex(16), nx=True)
+    app.config['SECRET_KEY'] = shared_state.get('chatbot:secret_key').decode('ascii')
+
+# Completed interviews are stored one row per answer instead of rewriting the workbook
+results_store = create_results_store(app.config['RESULTS_BACKEND'], DATA_DIR, app.config['REDIS_URL'])
+
+# Answer-quality features and a 0-100 score are stored with each interview
+quality_scorer = AnswerQualityScorer(question_bank)
+
+# Interview IDs come from a locked counter file, or a Redis counter shared by
+# every node, seeded once from stored results
+if shared_state is not None:
+    id_allocator = RedisIdAllocator(shared_state, seed=results_store.max_interview_id)
+else:
+    id_allocator = FileIdAllocator(os.path.join(DATA_DIR, 'interview_id.counter'), seed=results_store.max_interview_id)
+
+# Resume text is extracted in the background. Job state and text stay on this
+# node, or go to Redis so a job can be polled and its text read on any node
+if shared_state is not None:
+    resume_jobs = RedisResumeJobStore(shared_state, job_ttl=app.config['SESSION_TTL_SECONDS'])
+else:
+    resume_jobs = ResumeJobStore(os.path.join(DATA_DIR, 'resume_jobs.db'), os.path.join(DATA_DIR, 'resume_text'))
+resume_processor = ResumeProcessor(resume_jobs, workers=app.config['RESUME_WORKERS'])
+
+# Uploaded resumes are stored once per unique content and hard-linked per interview
+upload_store = ContentAddressedStore(
+    app.config['UPLOAD_FOLDER'],
+    mirror=RedisBlobMirror(shared_state, ttl=app.config['UPLOAD_MIRROR_TTL_SECONDS']) if shared_state is not None else None,
+)
+
+# Full-text index over answers and resume text, updated as interviews are saved
+search_index = SearchIndex(os.path.join(DATA_DIR, 'search_index.db'))
+
+def index_resume_text(interview_id, text):
+    """Attach extracted resume text to the interview's search document
+
+    With shared state the interview may have been saved on another node
+    before the text was ready; this node then indexes it from the results.
+    """
+    if search_index.update_resume(interview_id, text) or shared_state is None:
+        return
+    record = results_store.get(interview_id)
+    if record is not None:
+        search_index.index_interview(record, text)
+
+resume_processor.add_listener(index_resume_text)
+
+# TF-IDF resume vectors, added as text is extracted, ranked against role profiles
+resume_matcher = ResumeMatcher(os.path.join(DATA_DIR, 'resume_matches.db'), question_bank)
+resume_processor.add_listener(resume_matcher.add)
+
+# Narrow per-interview rows in date-partitioned Parquet files for /analytics
+columnar_results = ColumnarResults(
+    os.path.join(DATA_DIR, 'analytics'), compact_after=app.config['ANALYTICS_COMPACT_FILES']
+)
+
+# Completed interviews are queued and written in batches by a background
+# thread; a per-process spill file lets a restart replay anything unwritten
+persistence_queue = None
+if app.config['WRITE_BEHIND']:
+    persistence_queue = WriteBehindQueue(
+        lambda records: save_interview_batch(records),
+        os.path.join(DATA_DIR, 'write_behind'),
+        max_size=app.config['WRITE_BEHIND_QUEUE_SIZE'],
+        batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+        flush_interval=app.config['WRITE_BEHIND_FLUSH_SECONDS'],
+        recover_interval=app.config['WRITE_BEHIND_RECOVER_SECONDS'],
+    )
+    metrics.gauge('chatbot_results_pending', 'Interviews queued but not yet persisted.', persistence_queue.pending)
+    exit_on_sigterm()
+
+# Keep interview state on the server; the cookie only carries a signed session ID
+if app.config['SESSION_BACKEND'] in ('sqlite', 'redis'):
+    if app.config['SESSION_BACKEND'] == 'redis':
+        session_backend = RedisSessionStore(connect_redis(app.config['REDIS_URL']), ttl=app.config['SESSION_TTL_SECONDS'])
+    else:
+        session_backend = SQLiteSessionStore(os.path.join(DATA_DIR, 'sessions.db'), ttl=app.config['SESSION_TTL_SECONDS'])
+    app.session_interface = ServerSideSessionInterface(
+        session_backend,
+        size_observer=lambda total, written: (SESSION_BYTES.observe(total), SESSION_WRITE_BYTES.observe(written)),
+    )
+
+# Transcripts are appended one row per message; the session only keeps their length
+if shared_state is not None:
+    chat_history = RedisChatHistory(shared_state, ttl=app.config['SESSION_TTL_SECONDS'])
+else:
+    chat_history = ChatHistoryStore(os.path.join(DATA_DIR, 'chat_history.db'), ttl=app.config['SESSION_TTL_SECONDS'])
+
+# Chat replies come from the template phrases, or from a language model that
+# falls back to them when it is slow or unavailable
+response_generator = create_response_generator(
+    app.config['RESPONSE_GENERATOR'],
+    base_url=app.config['LLM_BASE_URL'],
+    model=app.config['LLM_MODEL'],
+    api_key=app.config['LLM_API_KEY'],
+    request_timeout=app.config['LLM_REQUEST_TIMEOUT_SECONDS'],
+    cache_size=app.config['LLM_CACHE_SIZE'],
+    cache_ttl=app.config['LLM_CACHE_TTL_SECONDS'],
+    timeout=app.config['LLM_TIMEOUT_SECONDS'],
+    batch_size=app.config['LLM_BATCH_SIZE'],
+    batch_window=app.config['LLM_BATCH_WINDOW_SECONDS'],
+    pool_size=app.config['LLM_POOL_SIZE'],
+    min_words=app.config['LLM_MIN_WORDS'],
+    observer=GENERATED_REPLIES.inc,
+)
+
+# Load the sentiment analyzer before the first chat turn instead of during it
+if app.config['NLP_EAGER_INIT']:
+    init_text_analysis()
 
 # Helper function to convert numpy types to Python native types
 def convert_numpy_types(obj):
     """Recursively convert numpy types to Python native types"""
+    # numpy is not imported for this: until another module has loaded it,
+    # no value can be a numpy type
+    np = sys.modules.get('numpy')
+    if np is None:
+        return obj
     if isinstance(obj, (np.integer, np.int64)):
         return int(obj)
     elif isinstance(obj, np.floating):
@@ -45,141 +251,26 @@ def convert_numpy_types(obj):
 # Function to generate creative responses based on user input and context
 def generate_creative_response(user_message, context, step):
     """Generate a creative response based on user message, context, and current step"""
-    # Default responses if NLTK fails
-    thank_you_phrases = [
-        "Thank you for sharing that! I appreciate your insights.",
-        "That's really valuable information, thank you!",
-        "I appreciate your thoughtful response.",
-        "Thanks for letting me know about that!",
-        "That's great to hear, thank you for sharing."
-    ]
-    
-    follow_up_phrases = {
-        'general': [
-            "Let's dive a bit deeper into your background.",
-            "I'd like to understand more about your experiences.",
-            "Now, I'd like to explore another aspect of your profile.",
-            "That's interesting! Let's move on to another important question."
-        ],
-        'occupation': [
-            f"As a {context.get('selected_occupation', 'professional')}, I'd like to ask you something specific.",
-            "Based on your professional background, I'm curious about something.",
-            "Your experience is quite interesting! Here's something I'd like to know:",
-            "Given your career path, I'm particularly interested in learning about:"
-        ],
-        'job_role': [
-            f"With your interest in {context.get('selected_role', 'this field')}, I'd like to know:",
-            "Your expertise in this area brings up an important question:",
-            "Considering your specialization, I'm curious about:",
-            "For someone with your skills, this next question is particularly relevant:"
-        ],
-        'job_type': [
-            "Let's talk about your work preferences in more detail.",
-            "I'd like to understand your ideal work arrangement better.",
-            "Your work style preferences are important. Let me ask you about:",
-            "Now, let's explore what work structure suits you best."
-        ],
-        'job_mode': [
-            "Work environment matters a lot. Let's discuss that next.",
-            "Your preference for how you work is important to understand.",
-            "Let's explore your ideal working environment further.",
-            "Now, I'd like to know about where you prefer to work."
-        ],
-        'resume_upload': [
-            "Your resume will help me understand your full professional story.",
-            "I'd love to see your resume to learn more about your journey.",
-            "Your resume will provide valuable context to your answers.",
-            "To complete your profile, I'll need your resume."
-        ],
-        'complete': [
-            "Thank you for taking the time to complete this interview!",
-            "You've provided some fantastic insights throughout our conversation.",
-            "I've really enjoyed learning about your background and aspirations.",
-            "This has been a productive conversation! I appreciate your detailed responses."
-        ]
-    }
-    
-    # Try to analyze sentiment with NLTK if available, otherwise assign neutral sentiment
-    sentiment_compound = 0
-    try:
-        import nltk
-        from nltk.sentiment import SentimentIntensityAnalyzer
-        try:
-            nltk.data.find('vader_lexicon')
-        except LookupError:
-            nltk.download('vader_lexicon', quiet=True)
-        sia = SentimentIntensityAnalyzer()
-        sentiment = sia.polarity_scores(user_message)
-        sentiment_compound = sentiment['compound']
-    except:
-        # If NLTK fails, just use a neutral sentiment
-        pass
-    
-    # Select appropriate response templates based on sentiment
-    if sentiment_compound > 0.3:
-        thank_you = "Excellent! " + random.choice(thank_you_phrases)
-    elif sentiment_compound > 0:
-        thank_you = random.choice(thank_you_phrases)
-    elif sentiment_compound > -0.3:
-        thank_you = "I understand. Thanks for sharing your perspective."
-    else:
-        thank_you = "I appreciate you sharing that with me, even though it might be challenging."
+    # Sentiment and tokens come from the per-process NLTK service, which falls
+    # back to neutral sentiment and a regex tokenizer if NLTK data is missing
+    with timed(SENTIMENT_SECONDS):
+        sentiment_compound, tokens = analyze_message(user_message)
     
-    # Generate appropriate follow-up based on current step
-    if step in follow_up_phrases:
-        follow_up = random.choice(follow_up_phrases[step])
-    else:
-        follow_up = random.choice(follow_up_phrases['general'])
-    
-    # Special handling for specific context keywords
-    experience_words = ['experience', 'worked', 'job', 'project']
-    education_words = ['learn', 'education', 'study', 'university', 'college']
-    
-    # Tokenize if NLTK is available
-    try:
-        from nltk.tokenize import word_tokenize
-        try:
-            nltk.data.find('punkt')
-        except LookupError:
-            nltk.download('punkt', quiet=True)
-        tokens = word_tokenize(user_message.lower())
-        tokens = [token for token in tokens if token.isalnum()]
-        
-        if any(word in tokens for word in experience_words):
-            follow_up = "Your experience is valuable! " + follow_up
-        
-        if any(word in tokens for word in education_words):
-            follow_up = "Your educational background provides great context. " + follow_up
-    except:
-        # If NLTK fails, just check if words are in the message
-        if any(word in user_message.lower() for word in experience_words):
-            follow_up = "Your experience is valuable! " + follow_up
-        
-        if any(word in user_message.lower() for word in education_words):
-            follow_up = "Your educational background provides great context. " + follow_up
-    
-    # Combine phrases for final response
-    response = f"{thank_you} {follow_up}"
-    
-    return response
+    # Phrases are compiled once; the choice is seeded from the interview ID.
+    # The template reply is always drawn, so the seeded draws do not depend
+    # on whether a model answered
+    fallback = compose_response(sentiment_compound, tokens, step, context, interview_rng(context))
+    with timed(GENERATION_SECONDS):
+        return response_generator.generate(user_message, step, fallback)
 
 def allowed_file(filename):
     """Check if the file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def generate_unique_id():
-    """Generate a sequential numeric ID based on existing data"""
+    """Generate a sequential numeric ID that is unique across workers"""
     try:
-        if os.path.exists(RESULTS_FILE):
-            df = pd.read_excel(RESULTS_FILE)
-            if not df.empty and 'interview_id' in df.columns:
-                # Get the highest ID and increment by 1
-                max_id = df['interview_id'].max()
-                # Convert numpy int64 to native Python int
-                if isinstance(max_id, (np.integer, np.int64)):
-                    max_id = int(max_id)
-                return max_id + 1
-        return 1
+        return id_allocator.next_id()
     except Exception as e:
         print(f"Error generating ID: {e}")
         return int(datetime.datetime.now().timestamp())
@@ -194,21 +285,13 @@ def get_general_questions():
     ]
     
     try:
-        if os.path.exists(QUESTIONS_FILE):
-            df = pd.read_csv(QUESTIONS_FILE, encoding='ISO-8859-1')
-            questions = []
-            for i in range(len(df)):
-                question = df.iloc[i, 0]
-                if pd.isna(question) or question.strip() == '':
-                    break
-                questions.append(question)
-            return questions if questions else default_questions
-        return default_questions
+        questions = question_bank.general_questions()
+        return list(questions) if questions else default_questions
     except Exception as e:
         print(f"Error loading general questions: {e}")
         return default_questions
 
-def get_occupation_questions(occupation):
+def get_occupation_questions(occupation, rng=random):
     """Get occupation-specific questions"""
     default_questions = {
         'Student': [
@@ -235,25 +318,22 @@ def get_occupation_questions(occupation):
     }
     
     try:
-        if os.path.exists(QUESTIONS_FILE):
-            df = pd.read_csv(QUESTIONS_FILE, encoding='ISO-8859-1')
-            occupation_columns = {
-                'Student': 'Student', 
-                'Fresher': 'Fresher', 
-                'Experienced Professional': 'Experienced'
-            }
-            
-            if occupation in occupation_columns:
-                column = occupation_columns[occupation]
-                if column in df.columns:
-                    questions = df[column].dropna().tolist()
-                    return random.sample(questions, min(5, len(questions))) if questions else default_questions[occupation]
+        occupation_columns = {
+            'Student': 'Student', 
+            'Fresher': 'Fresher', 
+            'Experienced Professional': 'Experienced'
+        }
+        
+        if occupation in occupation_columns:
+            questions = question_bank.column(occupation_columns[occupation])
+            if questions is not None:
+                return rng.sample(questions, min(5, len(questions))) if questions else default_questions[occupation]
         return default_questions.get(occupation, [])
     except Exception as e:
         print(f"Error loading occupation questions: {e}")
         return default_questions.get(occupation, [])
 
-def get_job_role_questions(role):
+def get_job_role_questions(role, rng=random):
     """Get job role specific questions"""
     default_questions = {
         "UI/UX": [
@@ -280,470 +360,616 @@ def get_job_role_questions(role):
     }
     
     try:
-        if os.path.exists(QUESTIONS_FILE):
-            df = pd.read_csv(QUESTIONS_FILE, encoding='ISO-8859-1')
-            job_roles = {"UI/UX": "UI/UX", "Java": "Java", "AI/ML": "AI/ML"}
-            
-            if role in job_roles:
-                column = job_roles[role]
-                if column in df.columns:
-                    questions = df[column].dropna().tolist()
-                    return random.sample(questions, min(5, len(questions))) if questions else default_questions[role]
+        job_roles = {"UI/UX": "UI/UX", "Java": "Java", "AI/ML": "AI/ML"}
+        
+        if role in job_roles:
+            questions = question_bank.column(job_roles[role])
+            if questions is not None:
+                return rng.sample(questions, min(5, len(questions))) if questions else default_questions[role]
         return default_questions.get(role, [])
     except Exception as e:
         print(f"Error loading job role questions: {e}")
         return default_questions.get(role, [])
 
+def save_interview_batch(records):
+    """Score, append and index a batch of interview records"""
+    # Scores are added to the records so they are stored in the same write
+    try:
+        with timed(QUALITY_SECONDS):
+            for record, (_, fields) in zip(records, quality_scorer.score(records)):
+                record.update(fields)
+    except Exception as e:
+        print(f"Error scoring answers: {e}")
+    
+    try:
+        with timed(PERSIST_SECONDS):
+            results_store.append_many(records)
+    except Exception:
+        PERSIST_FAILURES.inc(amount=len(records))
+        raise
+    
+    # Index the interviews for /search; the stored records are already safe
+    for data in records:
+        try:
+            search_index.index_interview(data, resume_processor.read_text(data['interview_id']))
+        except Exception as index_error:
+            print(f"Error indexing interview: {index_error}")
+    
+    try:
+        columnar_results.append(records)
+    except Exception as e:
+        print(f"Error writing analytics partition: {e}")
+
 def save_interview_data(data):
-    """Save interview data to Excel file"""
+    """Hand interview data to the write-behind queue, or save it directly"""
     try:
         # Convert any numpy types to Python native types
         data = convert_numpy_types(data)
-                
-        # Create DataFrame from the data
-        df = pd.DataFrame([data])
-        
-        # Check if file exists to append or create new
-        if os.path.exists(RESULTS_FILE):
-            try:
-                existing_df = pd.read_excel(RESULTS_FILE)
-                combined_df = pd.concat([existing_df, df], ignore_index=True)
-                combined_df.to_excel(RESULTS_FILE, index=False)
-            except Exception as excel_error:
-                print(f"Error reading existing Excel file: {excel_error}")
-                df.to_excel(RESULTS_FILE, index=False)
+        if persistence_queue is not None:
+            persistence_queue.put(data)
         else:
-            df.to_excel(RESULTS_FILE, index=False)
-            
+            save_interview_batch([data])
         return True
     except Exception as e:
         print(f"Error saving data: {e}")
         return False
 
-@app.route('/')
-def index():
-    # Initialize a new session
+# Replay interviews a crashed or killed worker accepted but never wrote; with
+# the app preloaded this only runs in the gunicorn master, and each worker's
+# writer thread keeps checking while the server runs
+if persistence_queue is not None:
+    try:
+        recovered = persistence_queue.recover()
+        if recovered:
+            print(f"Recovered {recovered} unsaved interviews from the write-behind spill")
+    except Exception as e:
+        print(f"Error recovering write-behind spill: {e}")
+
+# Work a streamed chat turn runs after its events are sent, such as saving
+# the finished interview; None while a turn is answered in one response
+deferred_work = contextvars.ContextVar('deferred_work', default=None)
+
+def run_or_defer(work):
+    """Run ``work`` now, or queue it until the current streamed turn has been sent"""
+    pending = deferred_work.get()
+    if pending is None:
+        work()
+    else:
+        pending.append(work)
+
+def run_deferred(pending):
+    """Run queued work, removing each item first so nothing runs twice"""
+    while pending:
+        work = pending.pop(0)
+        try:
+            work()
+        except Exception as e:
+            print(f"Error in deferred work: {e}")
+
+def start_new_interview(session):
+    """Reset the session for a fresh interview"""
     session.clear()
-    session['chat_history'] = []
-    session['current_step'] = 'general'
+    session['history_length'] = 0
+    session['current_step'] = interview_flow.start
     session['question_index'] = 0
     session['responses'] = {}
     session['questions'] = {}  # Store questions along with answers
     session['interview_start_time'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     session['interview_id'] = int(generate_unique_id())  # Convert to Python int explicitly
     session['resume_uploaded'] = False
+
+def complete_interview(session):
+    """Persist the answers of a finished interview"""
+    # Record submission time
+    submission_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Prepare data for saving
+    data = {
+        'interview_id': session['interview_id'],
+        'interview_start_time': session['interview_start_time'],
+        'submission_time': submission_time,
+        'resume_filename': session.get('resume_filename', 'Not uploaded')
+    }
+    
+    # Add all responses and questions
+    for key, value in session.get('responses', {}).items():
+        data[f"answer_{key}"] = value
+    
+    for key, value in session.get('questions', {}).items():
+        data[f"question_{key}"] = value
+    
+    run_or_defer(lambda: save_interview_data(data))
+
+# Steps, options and transitions are compiled once from the flow config
+interview_flow = load_flow(
+    app.config['INTERVIEW_FLOW_FILE'],
+    question_sources={
+        'general': lambda selection, session: get_general_questions(),
+        # Follow-ups are sampled with the interview's seeded random source
+        'occupation': lambda selection, session: get_occupation_questions(selection, interview_rng(session)),
+        'job_role': lambda selection, session: get_job_role_questions(selection, interview_rng(session)),
+    },
+    respond=generate_creative_response,
+    on_complete=complete_interview,
+    on_restart=start_new_interview,
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method)
+        REQUESTS_TOTAL.inc(endpoint, str(response.status_code))
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/')
+def index():
+    # Initialize a new session
+    start_new_interview(session)
     
     return render_template('index.html')
 
-@app.route('/get_message', methods=['POST'])
-def get_message():
+# Reply sent when a chat turn fails unexpectedly
+ERROR_TURN = {
+    "bot_response": "I'm sorry, I encountered an issue processing your request. Let's try again.",
+    "next_question": "Could you please repeat your last message?",
+    "is_options": False,
+    "options": [],
+    "is_file_upload": False
+}
+UPLOAD_ERROR = {"success": False, "message": "An error occurred while uploading your resume. Please try again."}
+
+def process_message(session, user_message, deferred=None):
+    """Advance the interview by one user message and return the turn JSON
+
+    With a ``deferred`` list, transcript and result writes are appended to
+    it instead of run, for the caller to run once the turn has been sent.
+    """
+    token = deferred_work.set(deferred)
     try:
-        user_message = request.form.get('user_message', '').strip()
-        
-        # Initialize response variables
-        bot_response = ""
-        next_question = ""
-        is_options = False
-        options = []
-        is_file_upload = False
-        
-        # Get current state
-        current_step = session.get('current_step', 'general')
-        question_index = session.get('question_index', 0)
-        
-        # Store user's response to the previous question
-        if current_step != 'complete' and 'current_question' in session:
-            question_key = f"{current_step}_{question_index-1}" if question_index > 0 else "start"
-            session['responses'][question_key] = user_message
-            # Store the question text as well
-            if 'current_question' in session:
-                session['questions'][question_key] = session['current_question']
-        
-        # Process based on current step
-        if current_step == 'general':
-            general_questions = get_general_questions()
-            
-            if question_index < len(general_questions):
-                # Generate creative response based on user's previous message
-                if user_message:
-                    bot_response = generate_creative_response(user_message, session, current_step)
-                else:
-                    bot_response = "Welcome to our interview chatbot! Let's get to know you better."
-                
-                next_question = general_questions[question_index]
-                session['current_question'] = next_question
-                session['question_index'] = question_index + 1
-            else:
-                # Move to occupation questions with a creative transition
-                bot_response = generate_creative_response(user_message, session, current_step) + "\n\nNow, I'd like to understand more about your career path."
-                next_question = "What is your current occupation status?"
-                is_options = True
-                options = ["Student", "Fresher", "Experienced Professional"]
-                session['current_step'] = 'occupation'
-                session['current_question'] = next_question
-                session['question_index'] = 0
-        
-        elif current_step == 'occupation':
-            if question_index == 0:
-                # Process occupation selection
-                if user_message in ["1", "2", "3"] or user_message in ["Student", "Fresher", "Experienced Professional"]:
-                    occupation_dict = {'1': 'Student', '2': 'Fresher', '3': 'Experienced Professional'}
-                    selected_occupation = user_message if user_message in occupation_dict.values() else occupation_dict[user_message]
-                    
-                    session['selected_occupation'] = selected_occupation
-                    session['responses']['occupation'] = selected_occupation
-                    session['questions']['occupation'] = "What is your current occupation status?"
-                    
-                    # Get occupation-specific questions
-                    session['occupation_questions'] = get_occupation_questions(selected_occupation)
-                    
-                    if session['occupation_questions']:
-                        # Generate personalized response based on occupation
-                        occupation_responses = {
-                            'Student': f"Great to meet a fellow student! Your academic perspective is valuable.",
-                            'Fresher': "Being a fresher brings a fresh perspective to the industry. I'm excited to learn more about your aspirations.",
-                            'Experienced Professional': "Your professional experience is impressive! I'd love to dive deeper into your expertise."
-                        }
-                        bot_response = occupation_responses.get(selected_occupation, f"You selected: {selected_occupation}")
-                        next_question = session['occupation_questions'][0]
-                        session['current_question'] = next_question
-                        session['question_index'] = 1
-                    else:
-                        # No occupation questions, move to job roles
-                        bot_response = f"Thanks for letting me know you're a {selected_occupation}! Let's talk about your area of interest."
-                        next_question = "Select a job role:"
-                        is_options = True
-                        options = ["UI/UX", "Java", "AI/ML"]
-                        session['current_step'] = 'job_role'
-                        session['current_question'] = next_question
-                        session['question_index'] = 0
-                else:
-                    # Invalid input
-                    bot_response = "I didn't quite catch that. Could you please select one of the options below?"
-                    next_question = "What is your current occupation status?"
-                    is_options = True
-                    options = ["Student", "Fresher", "Experienced Professional"]
-                    session['current_question'] = next_question
-            
-            else:
-                # Process occupation question responses
-                occupation_questions = session.get('occupation_questions', [])
-                
-                if question_index <= len(occupation_questions):
-                    question_key = f"occupation_q{question_index}"
-                    session['responses'][question_key] = user_message
-                    session['questions'][question_key] = session['current_question']
-                    
-                    if question_index < len(occupation_questions):
-                        # More occupation questions
-                        bot_response = generate_creative_response(user_message, session, current_step)
-                        next_question = occupation_questions[question_index]
-                        session['current_question'] = next_question
-                        session['question_index'] = question_index + 1
-                    else:
-                        # Move to job roles
-                        bot_response = generate_creative_response(user_message, session, current_step) + "\n\nNow, let's focus on your specific area of interest."
-                        next_question = "Select a job role:"
-                        is_options = True
-                        options = ["UI/UX", "Java", "AI/ML"]
-                        session['current_step'] = 'job_role'
-                        session['current_question'] = next_question
-                        session['question_index'] = 0
-        
-        elif current_step == 'job_role':
-            if question_index == 0:
-                # Process job role selection
-                job_roles = {
-                    "1": "UI/UX", 
-                    "2": "Java", 
-                    "3": "AI/ML",
-                    "UI/UX": "UI/UX", 
-                    "Java": "Java", 
-                    "AI/ML": "AI/ML"
-                }
-                
-                if user_message in job_roles:
-                    selected_role = job_roles[user_message]
-                    session['selected_role'] = selected_role
-                    session['responses']['job_role'] = selected_role
-                    session['questions']['job_role'] = "Select a job role:"
-                    
-                    # Get job role questions
-                    session['job_role_questions'] = get_job_role_questions(selected_role)
-                    
-                    # Personalized responses based on job role
-                    role_responses = {
-                        "UI/UX": "UI/UX is such a creative field! The intersection of design and user experience is fascinating.",
-                        "Java": "Java development is a powerful skill set. The demand for solid Java expertise continues to grow!",
-                        "AI/ML": "AI/ML is at the cutting edge of technology today. Your interest in this field shows forward thinking!"
-                    }
-                    
-                    if session['job_role_questions']:
-                        bot_response = role_responses.get(selected_role, f"You selected: {selected_role}")
-                        next_question = session['job_role_questions'][0]
-                        session['current_question'] = next_question
-                        session['question_index'] = 1
-                    else:
-                        # No job role questions, move to job type
-                        bot_response = role_responses.get(selected_role, f"You selected: {selected_role}") + "\n\nLet's talk about your employment preferences."
-                        next_question = "Select the type of job role:"
-                        is_options = True
-                        options = ["Full-time", "Part-time", "Freelancing"]
-                        session['current_step'] = 'job_type'
-                        session['current_question'] = next_question
-                        session['question_index'] = 0
-                else:
-                    # Invalid input
-                    bot_response = "I didn't quite catch that. Could you please select one of the job roles below?"
-                    next_question = "Select a job role:"
-                    is_options = True
-                    options = ["UI/UX", "Java", "AI/ML"]
-                    session['current_question'] = next_question
-                    
-            else:
-                # Process job role question responses
-                job_role_questions = session.get('job_role_questions', [])
-                
-                if question_index <= len(job_role_questions):
-                    question_key = f"job_role_q{question_index}"
-                    session['responses'][question_key] = user_message
-                    session['questions'][question_key] = session['current_question']
-                    
-                    if question_index < len(job_role_questions):
-                        # More job role questions
-                        bot_response = generate_creative_response(user_message, session, current_step)
-                        next_question = job_role_questions[question_index]
-                        session['current_question'] = next_question
-                        session['question_index'] = question_index + 1
-                    else:
-                        # Move to job type
-                        bot_response = generate_creative_response(user_message, session, current_step) + "\n\nNow, let's discuss what kind of employment arrangement you're looking for."
-                        next_question = "Select the type of job role:"
-                        is_options = True
-                        options = ["Full-time", "Part-time", "Freelancing"]
-                        session['current_step'] = 'job_type'
-                        session['current_question'] = next_question
-                        session['question_index'] = 0
-        
-        elif current_step == 'job_type':
-            # Process job type selection
-            job_type_dict = {
-                '1': 'Full-time', 
-                '2': 'Part-time', 
-                '3': 'Freelancing',
-                'Full-time': 'Full-time', 
-                'Part-time': 'Part-time', 
-                'Freelancing': 'Freelancing'
-            }
-            
-            if user_message in job_type_dict:
-                selected_job_type = job_type_dict[user_message]
-                session['responses']['job_type'] = selected_job_type
-                session['questions']['job_type'] = "Select the type of job role:"
-                
-                # Personalized responses based on job type
-                type_responses = {
-                    "Full-time": "A full-time position offers stability and deep engagement with your team and projects.",
-                    "Part-time": "Part-time work provides excellent flexibility while still maintaining professional growth.",
-                    "Freelancing": "Freelancing gives you the freedom to choose diverse projects and manage your own schedule."
-                }
-                
-                # Move to job mode
-                bot_response = type_responses.get(selected_job_type, f"You selected: {selected_job_type}") + "\n\nAnd where would you prefer to work?"
-                next_question = "Select your preferred job mode:"
-                is_options = True
-                options = ["Remote", "Onsite", "Hybrid"]
-                session['current_step'] = 'job_mode'
-                session['current_question'] = next_question
-            else:
-                # Invalid input
-                bot_response = "I'm not sure I understood that choice. Please select one of the options below."
-                next_question = "Select the type of job role:"
-                is_options = True
-                options = ["Full-time", "Part-time", "Freelancing"]
-                session['current_question'] = next_question
-        
-        elif current_step == 'job_mode':
-            # Process job mode selection
-            job_mode_dict = {
-                '1': 'Remote', 
-                '2': 'Onsite', 
-                '3': 'Hybrid',
-                'Remote': 'Remote', 
-                'Onsite': 'Onsite', 
-                'Hybrid': 'Hybrid'
-            }
-            
-            if user_message in job_mode_dict:
-                selected_job_mode = job_mode_dict[user_message]
-                session['responses']['job_mode'] = selected_job_mode
-                session['questions']['job_mode'] = "Select your preferred job mode:"
-                
-                # Personalized responses based on job mode
-                mode_responses = {
-                    "Remote": "Remote work offers flexibility and comfort in your own environment. Many find it boosts productivity!",
-                    "Onsite": "Working onsite provides great collaboration opportunities and a clear separation between work and home.",
-                    "Hybrid": "The hybrid model gives you the best of both worlds - flexibility and in-person collaboration when needed."
-                }
-                
-                # Move to resume upload
-                bot_response = mode_responses.get(selected_job_mode, f"You selected: {selected_job_mode}") + "\n\nWe're almost done! To complete your profile, I'll need your resume."
-                next_question = "Please upload your resume (PDF, DOC, or DOCX format)."
-                session['current_step'] = 'resume_upload'
-                session['current_question'] = next_question
-                is_file_upload = True
-            else:
-                # Invalid input
-                bot_response = "I didn't quite catch that. Please select one of the work modes below."
-                next_question = "Select your preferred job mode:"
-                is_options = True
-                options = ["Remote", "Onsite", "Hybrid"]
-                session['current_question'] = next_question
-        
-        elif current_step == 'resume_upload':
-            if session.get('resume_uploaded', False):
-                # Resume already uploaded, complete the interview
-                bot_response = "Amazing! Thank you for taking the time to complete this interview. Your responses and resume provide valuable insights into your background and aspirations. We'll review your information carefully!"
-                next_question = "Would you like to start another interview?"
-                is_options = True
-                options = ["Yes", "No"]
-                session['current_step'] = 'complete'
-                
-                # Record submission time
-                submission_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                
-                # Prepare data for saving
-                data = {
-                    'interview_id': session['interview_id'],
-                    'interview_start_time': session['interview_start_time'],
-                    'submission_time': submission_time,
-                    'resume_filename': session.get('resume_filename', 'Not uploaded')
-                }
-                
-                # Add all responses and questions
-                for key, value in session.get('responses', {}).items():
-                    data[f"answer_{key}"] = value
-                
-                for key, value in session.get('questions', {}).items():
-                    data[f"question_{key}"] = value
-                    
-                # Save to Excel
-                save_interview_data(data)
-            else:
-                # Waiting for resume upload
-                bot_response = "I'm looking forward to seeing your resume! Please use the file upload button to share it with me (PDF, DOC, or DOCX format)."
-                next_question = "Please upload your resume (PDF, DOC, or DOCX format)."
-                is_file_upload = True
-        
-        elif current_step == 'complete':
-            # Handle restart or end
-            if user_message.lower() == 'yes' or user_message == '1':
-                # Restart interview
-                session.clear()
-                session['chat_history'] = []
-                session['current_step'] = 'general'
-                session['question_index'] = 0
-                session['responses'] = {}
-                session['questions'] = {}
-                session['interview_start_time'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                session['interview_id'] = int(generate_unique_id())  # Convert to Python int explicitly
-                session['resume_uploaded'] = False
-                
-                general_questions = get_general_questions()
-                if general_questions:
-                    bot_response = "Great! I'm excited to start a new interview with you. Let's begin with getting to know you better."
-                    next_question = general_questions[0]
-                    session['current_question'] = next_question
-                    session['question_index'] = 1
-                else:
-                    bot_response = "I'm sorry, but I'm having trouble accessing the questions right now. Please try again later or contact support."
-            else:
-                # End the chat
-                bot_response = "Thank you for using our interview chatbot today! It was a pleasure getting to know you. I wish you the best of luck in your career journey! Feel free to return whenever you'd like to start another interview."
-                next_question = ""
+        # Dispatch to the current step of the compiled interview flow
+        turn = interview_flow.handle(session, user_message)
+        bot_response = turn['bot_response']
         
         # Update chat history
-        chat_history = session.get('chat_history', [])
+        messages = []
         
         if user_message:
-            chat_history.append({"sender": "user", "message": user_message})
+            messages.append({"sender": "user", "message": user_message})
         
         if bot_response:
-            chat_history.append({"sender": "bot", "message": bot_response})
+            messages.append({"sender": "bot", "message": bot_response})
         
-        session['chat_history'] = chat_history
+        # Only the new messages are written; a restart has already reset the count
+        if messages and 'interview_id' in session:
+            interview_id = session['interview_id']
+            length = history_length(session)
+            run_or_defer(lambda: chat_history.append(interview_id, length, messages))
+            session['history_length'] = length + len(messages)
         
-        # Return response
-        return jsonify({
-            "bot_response": bot_response,
-            "next_question": next_question,
-            "is_options": is_options,
-            "options": options,
-            "is_file_upload": is_file_upload
-        })
+        return turn
     
     except Exception as e:
         import traceback
         print(f"Error in get_message: {e}")
         print(traceback.format_exc())
         # Return a friendly error message
-        return jsonify({
-            "bot_response": "I'm sorry, I encountered an issue processing your request. Let's try again.",
-            "next_question": "Could you please repeat your last message?",
-            "is_options": False,
-            "options": [],
-            "is_file_upload": False
-        })
+        return dict(ERROR_TURN)
+    finally:
+        deferred_work.reset(token)
+
+# Headers for /get_message/stream; X-Accel-Buffering stops nginx holding events back
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def sse_event(name, data):
+    return f"event: {name}\ndata: {app.json.dumps(data)}\n\n"
+
+def turn_events(turn):
+    """Split a turn into the bot_response and question events of /get_message/stream"""
+    question = {key: value for key, value in turn.items() if key != 'bot_response'}
+    return [sse_event('bot_response', {"bot_response": turn['bot_response']}), sse_event('question', question)]
+
+def resume_too_large():
+    max_bytes = app.config['MAX_RESUME_BYTES']
+    return {"success": False, "message": f"File is too large. Please upload a file under {max_bytes // (1024 * 1024)}MB."}
+
+def resume_declared_too_large(content_length):
+    """Check a declared request size before the upload body is read"""
+    return content_length is not None and content_length > app.config['MAX_RESUME_BYTES'] + UPLOAD_FORM_OVERHEAD
+
+def store_resume(session, original_filename, stream):
+    """Save an uploaded resume, queue its text extraction and return the JSON reply"""
+    # If the user does not select a file, the browser submits an empty file without a filename
+    if original_filename == '':
+        return {"success": False, "message": "No selected file"}
+    
+    if original_filename and allowed_file(original_filename):
+        # Create a unique filename
+        filename = f"{session['interview_id']}_{secure_filename(original_filename)}"
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        try:
+            # Hash while copying in chunks; identical files share one stored blob
+            with timed(FILE_SAVE_SECONDS):
+                digest, _, duplicate = upload_store.save(stream, file_path, app.config['MAX_RESUME_BYTES'])
+            if duplicate:
+                DUPLICATE_UPLOADS.inc()
+        except UploadTooLarge:
+            return resume_too_large()
+        
+        # Extract the text in the background; the chat never waits for it
+        job_id = resume_processor.submit(session['interview_id'], file_path)
+        
+        # Update session
+        session['resume_uploaded'] = True
+        session['resume_filename'] = filename
+        session['resume_job_id'] = job_id
+        
+        # Return success response
+        return {
+            "success": True,
+            "message": "Resume uploaded successfully",
+            "filename": filename,
+            "download_url": f"/download/blob/{digest}{os.path.splitext(filename)[1].lower()}",
+            "job_id": job_id
+        }
+    
+    return {"success": False, "message": "File type not allowed. Please upload PDF, DOC, or DOCX file."}
+
+def send_resume(path, environ, max_age):
+    """Serve a stored resume with its SHA-256 as a strong ETag
+
+    Werkzeug answers If-None-Match, If-Modified-Since and Range/If-Range
+    from it, and under gunicorn full responses go out through sendfile().
+    """
+    response = send_file(
+        path,
+        environ,
+        etag=upload_store.digest(path),
+        max_age=max_age,
+        use_x_sendfile=app.config['USE_X_SENDFILE'],
+        response_class=app.response_class,
+    )
+    # Resumes are personal data; only the recruiter's browser may cache them
+    response.cache_control.public = None
+    response.cache_control.private = True
+    return response
+
+def send_upload(filename, environ):
+    """Return the /download/<filename> response; the name may be re-pointed by a new upload"""
+    # Uploads received by another node are fetched from the shared store
+    if safe_join(app.config['UPLOAD_FOLDER'], filename) is None:
+        raise NotFound()
+    path = upload_store.resolve(filename)
+    if path is None:
+        raise NotFound()
+    return send_resume(path, environ, app.config['DOWNLOAD_MAX_AGE'])
+
+def send_blob(name, environ):
+    """Return the /download/blob/<sha256>.<ext> response, which never changes"""
+    path = upload_store.find_blob(name)
+    if path is None:
+        raise NotFound()
+    response = send_resume(path, environ, IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+def history_length(session):
+    """Number of stored messages, moving a transcript kept in the session into the store"""
+    legacy = session.pop('chat_history', None)
+    if legacy:
+        chat_history.append(session['interview_id'], 0, legacy)
+        session['history_length'] = len(legacy)
+    return session.get('history_length', 0)
+
+def history_args(args):
+    """Parse the since/limit cursor of /get_history; raises ValueError"""
+    since = int(args.get('since', 0))
+    limit = int(args.get('limit', app.config['HISTORY_PAGE_SIZE']))
+    if since < 0 or limit < 1:
+        raise ValueError("since must be >= 0 and limit >= 1")
+    return since, min(limit, app.config['HISTORY_PAGE_SIZE'])
+
+def history_page(session, since, limit, if_none_match=None):
+    """Return (payload, etag) for one /get_history page
+
+    The ETag is derived from the interview and its message count, so an
+    unchanged transcript is answered without reading it; payload is None
+    when ``if_none_match`` already holds the current ETag.
+    """
+    interview_id = session.get('interview_id')
+    try:
+        total = history_length(session) if interview_id is not None else 0
+        etag = f"{interview_id}-{total}-{since}-{limit}"
+        if if_none_match is not None and if_none_match.contains(etag):
+            return None, etag
+        messages = chat_history.read(interview_id, since, limit, end=total) if since < total else []
+        payload = {"chat_history": messages, "since": since, "next": since + len(messages), "total": total}
+        return payload, etag
+    except Exception as e:
+        print(f"Error in get_history: {e}")
+        return {"chat_history": [], "error": "Failed to retrieve chat history"}, None
+
+def history_headers(etag):
+    # The browser revalidates on every load and gets a 304 while nothing changed
+    headers = [('Cache-Control', 'private, no-cache')]
+    if etag is not None:
+        headers.append(('ETag', quote_etag(etag)))
+    return headers
+
+@app.route('/get_message', methods=['POST'])
+def get_message():
+    try:
+        user_message = request.form.get('user_message', '').strip()
+    except Exception as e:
+        print(f"Error in get_message: {e}")
+        return jsonify(ERROR_TURN)
+    return jsonify(process_message(session, user_message))
+
+@app.route('/get_message/stream', methods=['POST'])
+def stream_message():
+    """Answer a chat turn as Server-Sent Events
+
+    The reply and the next question are sent first; the writes of the turn
+    run afterwards and a final ``done`` event reports they have finished.
+    If the client disconnects before that, they run when the response closes.
+    """
+    deferred = []
+    try:
+        user_message = request.form.get('user_message', '').strip()
+        turn = process_message(session, user_message, deferred)
+    except Exception as e:
+        print(f"Error in get_message: {e}")
+        turn = dict(ERROR_TURN)
+    events = turn_events(turn)
+    
+    def stream():
+        yield from events
+        run_deferred(deferred)
+        yield sse_event('done', {})
+    
+    response = Response(stream(), mimetype='text/event-stream', headers=STREAM_HEADERS)
+    response.call_on_close(lambda: run_deferred(deferred))
+    return response
         
 @app.route('/upload_resume', methods=['POST'])
 def upload_resume():
     try:
+        # Reject declared oversized uploads before reading the body
+        if resume_declared_too_large(request.content_length):
+            return jsonify(resume_too_large())
+        
         # Check if the post request has the file part
         if 'resume' not in request.files:
             return jsonify({"success": False, "message": "No file part"})
         
         file = request.files['resume']
-        
-        # If the user does not select a file, the browser submits an empty file without a filename
-        if file.filename == '':
-            return jsonify({"success": False, "message": "No selected file"})
-        
-        if file and allowed_file(file.filename):
-            # Create a unique filename
-            filename = f"{session['interview_id']}_{secure_filename(file.filename)}"
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
-            
-            # Update session
-            session['resume_uploaded'] = True
-            session['resume_filename'] = filename
-            
-            # Return success response
-            return jsonify({
-                "success": True,
-                "message": "Resume uploaded successfully",
-                "filename": filename
-            })
-        
-        return jsonify({"success": False, "message": "File type not allowed. Please upload PDF, DOC, or DOCX file."})
+        return jsonify(store_resume(session, file.filename, file.stream))
     except Exception as e:
         print(f"Error in upload_resume: {e}")
-        return jsonify({"success": False, "message": "An error occurred while uploading your resume. Please try again."})
+        return jsonify(UPLOAD_ERROR)
+
+@app.route('/resume_status/<job_id>')
+def resume_status(job_id):
+    status = resume_processor.status(job_id)
+    if status is None:
+        return jsonify({"success": False, "message": "Unknown job"}), 404
+    return jsonify({"success": True, **status})
+
+@app.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"results": [], "error": "Missing query parameter 'q'"}), 400
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    filters = {field: request.args.get(field) for field in FILTER_FIELDS}
+    try:
+        return jsonify({"results": search_index.search(query, filters, limit)})
+    except Exception as e:
+        print(f"Error in search: {e}")
+        return jsonify({"results": [], "error": "Search failed"}), 500
+
+@app.route('/match_resumes')
+def match_resumes():
+    role = request.args.get('role', '').strip()
+    if role not in resume_matcher.roles():
+        return jsonify({"results": [], "error": f"Unknown role. Choose from {', '.join(resume_matcher.roles())}"}), 400
+    k = min(max(request.args.get('k', 10, type=int), 1), 100)
+    try:
+        with timed(MATCH_SECONDS):
+            matches = resume_matcher.top_k(role, k)
+        return jsonify({
+            "role": role,
+            "results": [{"interview_id": interview_id, "score": score} for interview_id, score in matches],
+        })
+    except Exception as e:
+        print(f"Error in match_resumes: {e}")
+        return jsonify({"results": [], "error": "Resume matching failed"}), 500
+
+@app.route('/analytics')
+def analytics():
+    if not columnar_results.available:
+        return jsonify({"error": "Analytics needs pyarrow to be installed"}), 503
+    requested = request.args.get('metrics', ','.join(METRICS))
+    metric_names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in metric_names if name not in METRICS]
+    if unknown or not metric_names:
+        return jsonify({"error": f"Unknown metrics: {', '.join(unknown)}. Choose from {', '.join(METRICS)}"}), 400
+    start = request.args.get('from')
+    end = request.args.get('to')
+    try:
+        for value in (start, end):
+            if value:
+                datetime.date.fromisoformat(value)
+    except ValueError:
+        return jsonify({"error": "'from' and 'to' must be dates like 2025-04-08"}), 400
+    try:
+        return jsonify(columnar_results.query(metric_names, start, end))
+    except Exception as e:
+        print(f"Error in analytics: {e}")
+        return jsonify({"error": "Analytics query failed"}), 500
 
 @app.route('/get_history')
 def get_history():
     try:
-        chat_history = session.get('chat_history', [])
-        # Ensure all data is JSON serializable
-        chat_history = convert_numpy_types(chat_history)
-        return jsonify({"chat_history": chat_history})
-    except Exception as e:
-        print(f"Error in get_history: {e}")
-        return jsonify({"chat_history": [], "error": "Failed to retrieve chat history"})
+        since, limit = history_args(request.args)
+    except ValueError:
+        return jsonify({"error": "since and limit must be non-negative integers"}), 400
+    payload, etag = history_page(session, since, limit, request.if_none_match)
+    response = jsonify(payload) if payload is not None else Response(status=304)
+    response.headers.extend(history_headers(etag))
+    return response
 
 @app.route('/download/<filename>')
 def download_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return send_upload(filename, request.environ)
+
+@app.route('/download/blob/<name>')
+def download_blob(name):
+    return send_blob(name, request.environ)
+
+@app.cli.command('export-xlsx')
+@click.option('--output', default=RESULTS_FILE, show_default=True, help='Workbook to write.')
+def export_xlsx_command(output):
+    """Build the recruiter Excel workbook from the results store"""
+    rows = export_xlsx(results_store, output)
+    click.echo(f"Exported {rows} interviews to {output}")
+
+@app.cli.command('rebuild-analytics')
+def rebuild_analytics_command():
+    """Rewrite the Parquet analytics partitions from the results store"""
+    if not columnar_results.available:
+        raise click.ClickException("pyarrow is not installed")
+    count = columnar_results.rebuild(results_store.iter_records())
+    click.echo(f"Wrote {count} interviews to {columnar_results.root}")
+
+@app.cli.command('import-xlsx')
+@click.argument('path', default=RESULTS_FILE)
+def import_xlsx_command(path):
+    """Append the rows of an existing results workbook to the results store"""
+    rows = import_xlsx(results_store, path, id_allocator=id_allocator)
+    click.echo(f"Imported {rows} interviews from {path}")
+
+@app.cli.command('migrate-results')
+@click.argument('source')
+def migrate_results_command(source):
+    """Copy interviews into the configured results store
+
+    SOURCE is a results workbook (.xlsx) in the old wide layout, or the name
+    of another results backend ('normalized', 'sqlite', 'jsonl' or 'redis').
+    Interviews already in the target are replaced, so a rerun is safe. The
+    interview ID counter is raised past every copied ID first, so new
+    interviews never reuse one.
+    """
+    if source.endswith('.xlsx'):
+        rows = import_xlsx(results_store, source, id_allocator=id_allocator)
+    else:
+        if source == app.config['RESULTS_BACKEND']:
+            raise click.ClickException("Source and target are the same backend")
+        rows = copy_records(
+            create_results_store(source, DATA_DIR, app.config['REDIS_URL']), results_store, id_allocator=id_allocator
+        )
+    click.echo(f"Migrated {rows} interviews from {source} into the {app.config['RESULTS_BACKEND']} store")
+
+@app.cli.command('gc-uploads')
+@click.option('--dry-run', is_flag=True, help='Only report what would be removed.')
+@click.option('--min-age', type=float, default=300.0, show_default=True, help='Keep blobs younger than this many seconds.')
+def gc_uploads_command(dry_run, min_age):
+    """Remove stored resume blobs that no interview links to
+
+    With REDIS_URL set, blobs in Redis that no upload name points to are
+    removed as well.
+    """
+    removed, freed = upload_store.gc(dry_run=dry_run, min_age=min_age)
+    verb = "Would remove" if dry_run else "Removed"
+    click.echo(f"{verb} {removed} orphaned blobs ({freed} bytes)")
+    if upload_store.mirror is not None:
+        removed, freed = upload_store.mirror.gc(dry_run=dry_run, min_age=min_age)
+        click.echo(f"{verb} {removed} orphaned blobs from Redis ({freed} bytes)")
+
+@app.cli.command('dedupe-uploads')
+def dedupe_uploads_command():
+    """Move resumes saved before content addressing into the blob store"""
+    adopted = 0
+    duplicates = 0
+    folder = app.config['UPLOAD_FOLDER']
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        # Files already linked to a blob have more than one link
+        if name.startswith('.') or name.endswith('.part') or not os.path.isfile(path) or os.stat(path).st_nlink > 1:
+            continue
+        duplicates += upload_store.adopt(path)
+        adopted += 1
+    stats = upload_store.stats()
+    click.echo(f"Adopted {adopted} uploads ({duplicates} duplicates); {stats['blobs']} blobs, {stats['bytes']} bytes stored")
+
+@app.cli.command('nltk-download')
+def nltk_download_command():
+    """Download the NLTK data used for sentiment and tokenization"""
+    download_resources()
+    click.echo("NLTK data downloaded")
+
+@app.cli.command('score-answers')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+@click.option('--chunk-size', type=int, default=2000, show_default=True, help='Answers per worker task.')
+@click.option('--negative-threshold', type=float, default=-0.3, show_default=True)
+def score_answers_command(workers, chunk_size, negative_threshold):
+    """Re-score the sentiment of every stored answer"""
+    init_text_analysis()
+    if not text_analysis_stats()['vader_available']:
+        raise click.ClickException("VADER lexicon is not installed; run `flask nltk-download` first")
+    summary = rescore_results(results_store, workers, chunk_size, negative_threshold)
+    click.echo(f"Scored {summary['answers']} answers across {summary['interviews']} interviews")
+    if summary['negative_candidates']:
+        ids = ', '.join(str(i) for i in summary['negative_candidates'])
+        click.echo(f"Negative-sentiment candidates: {ids}")
+
+@app.cli.command('score-quality')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help='Interviews scored per NumPy batch.')
+@click.option('--top', type=int, default=5, show_default=True, help='Candidates to list per job role.')
+def score_quality_command(batch_size, top):
+    """Score every stored interview's answers and rank candidates per job role"""
+    started = time.perf_counter()
+    ranking = score_results(results_store, quality_scorer, batch_size)
+    scored = sum(len(entries) for entries in ranking.values())
+    click.echo(f"Scored {scored} interviews in {time.perf_counter() - started:.2f}s")
+    for role, entries in sorted(ranking.items()):
+        click.echo(f"{role or '(no role)'}: {len(entries)} candidates")
+        for rank, (score, interview_id) in enumerate(entries[:top], 1):
+            click.echo(f"  {rank}. interview {interview_id}: {score:.2f}")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Re-index every stored interview and its resume text"""
+    search_index.clear()
+    count = 0
+    for record in results_store.iter_records():
+        if record.get('interview_id') is None:
+            continue
+        search_index.index_interview(record, resume_processor.read_text(record['interview_id']))
+        count += 1
+    click.echo(f"Indexed {count} interviews")
+
+@app.cli.command('rebuild-resume-matches')
+def rebuild_resume_matches_command():
+    """Re-index every extracted resume for /match_resumes"""
+    resume_matcher.clear()
+    count = 0
+    for interview_id, text in resume_processor.iter_texts():
+        resume_matcher.add(interview_id, text)
+        count += 1
+    click.echo(f"Indexed {count} resumes")
 
 if __name__ == '__main__':
-    app.run()
+    # Resume extraction workers would import this whole module again
+    sys.exit("Start the development server with `python serve.py`")
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import fcntl
+import queue
+import atexit
+import signal
+import threading
+
+
+class WriteBehindQueue:
+    """Bounded in-process queue that flushes records to a sink in batches
+
+    ``put`` first appends the record to a per-process spill file and then
+    queues it, so the request only pays for one small file write. A
+    background thread hands batches to ``sink`` once ``batch_size`` records
+    are waiting or ``flush_interval`` seconds have passed, and appends an
+    acknowledgement line to the spill file after each successful batch.
+
+    Each process holds an exclusive lock on its spill file while running.
+    ``recover`` replays the unacknowledged records of spill files whose
+    owner has died, so a killed worker loses nothing. The writer thread
+    calls it when it starts and every ``recover_interval`` seconds, so a
+    dead worker's records are replayed without restarting the server.
+    ``close`` drains the queue; it runs at interpreter exit, which gunicorn
+    reaches on SIGTERM.
+    """
+
+    def __init__(self, sink, spill_dir, max_size=1000, batch_size=50, flush_interval=1.0, recover_interval=30.0):
+        self.sink = sink
+        self.spill_dir = spill_dir
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recover_interval = recover_interval
+        os.makedirs(spill_dir, exist_ok=True)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start this process's writer thread and spill file if not yet running"""
+        # Threads and file locks do not survive a fork, so every process
+        # starts its own writer and spill file on first use
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_size)
+            self._seq = 0
+            self._pending = 0
+            self._spill_lock = threading.Lock()
+            self._spill_path = os.path.join(self.spill_dir, f"{os.getpid()}-{int(time.time() * 1000)}.spill")
+            self._spill_fd = os.open(self._spill_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            fcntl.flock(self._spill_fd, fcntl.LOCK_EX)
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+
+    def _spill(self, entry):
+        os.write(self._spill_fd, (json.dumps(entry) + '\n').encode('utf-8'))
+
+    def put(self, record):
+        """Queue a record for persistence; falls back to a direct write when full"""
+        self.start()
+        with self._spill_lock:
+            self._seq += 1
+            seq = self._seq
+            self._spill({'seq': seq, 'record': record})
+            self._pending += 1
+        try:
+            self._queue.put_nowait((seq, record))
+        except queue.Full:
+            # Back-pressure: persist on the request thread rather than drop it
+            self.sink([record])
+            self._ack([seq])
+
+    def _ack(self, seqs):
+        with self._spill_lock:
+            self._pending -= len(seqs)
+            if self._pending == 0:
+                # Everything written so far is persisted; start the file afresh
+                os.ftruncate(self._spill_fd, 0)
+            else:
+                self._spill({'ack': seqs})
+
+    def _run(self):
+        next_recovery = time.monotonic()
+        while True:
+            if time.monotonic() >= next_recovery:
+                self._recover_orphans()
+                next_recovery = time.monotonic() + self.recover_interval
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch:
+                self._flush(batch)
+            elif self._stopping.is_set():
+                return
+
+    def _flush(self, batch):
+        while True:
+            try:
+                self.sink([record for _, record in batch])
+                self._ack([seq for seq, _ in batch])
+                return
+            except Exception as e:
+                # Records stay in the spill file; retry until the store is back
+                print(f"Error flushing {len(batch)} records: {e}")
+                if self._stopping.is_set():
+                    return
+                time.sleep(self.flush_interval)
+
+    def _recover_orphans(self):
+        # Files of live processes are skipped, their owners hold the lock
+        try:
+            recovered = self.recover()
+            if recovered:
+                print(f"Recovered {recovered} unsaved records from a dead process's spill file")
+        except Exception as e:
+            print(f"Error recovering write-behind spill: {e}")
+
+    def close(self, timeout=30.0):
+        """Flush everything still queued and stop the writer thread"""
+        if self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def pending(self):
+        """Records accepted by this process and not yet persisted"""
+        return self._pending if self._pid == os.getpid() else 0
+
+    def recover(self):
+        """Replay unacknowledged records left behind by dead processes"""
+        recovered = 0
+        for name in os.listdir(self.spill_dir):
+            if not name.endswith('.spill'):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                try:
+                    # A live owner still holds the lock
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                if os.fstat(fd).st_nlink == 0:
+                    # Another process already replayed and removed it
+                    continue
+                records = self._unacknowledged(path)
+                if records:
+                    self.sink(records)
+                    recovered += len(records)
+                os.remove(path)
+            finally:
+                os.close(fd)
+        return recovered
+
+    @staticmethod
+    def _unacknowledged(path):
+        entries = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The owner died mid-write; that record never reached the queue
+                    continue
+                if 'ack' in entry:
+                    for seq in entry['ack']:
+                        entries.pop(seq, None)
+                else:
+                    entries[entry['seq']] = entry['record']
+        return [entries[seq] for seq in sorted(entries)]
+
+
+def exit_on_sigterm():
+    """Turn SIGTERM into a normal exit so atexit handlers drain the queue
+
+    Only installed when nothing else handles SIGTERM (the Flask development
+    server); gunicorn workers already exit cleanly on SIGTERM.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) is not signal.SIG_DFL:
+        return
+
+    def handle(signum, frame):
+        raise SystemExit(128 + signum)
+
+    signal.signal(signal.SIGTERM, handle)
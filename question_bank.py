@@ -0,0 +1,136 @@
+import os
+import csv
+import time
+import threading
+
+
+class QuestionBankSnapshot:
+    """Immutable parsed view of the questions CSV"""
+
+    __slots__ = ('columns', 'general', 'signature', 'loaded_at')
+
+    def __init__(self, columns, general, signature, loaded_at):
+        self.columns = columns      # header -> tuple of non-empty cells
+        self.general = general      # leading non-blank cells of the first column
+        self.signature = signature  # (mtime_ns, size) of the parsed file
+        self.loaded_at = loaded_at
+
+
+def parse_questions_file(path, encoding='ISO-8859-1'):
+    """Parse the questions CSV into per-column tuples
+
+    Mirrors how pandas read the file before: blank lines are skipped, empty
+    cells count as missing, and the general questions stop at the first
+    blank cell of the first column.
+    """
+    with open(path, newline='', encoding=encoding) as f:
+        rows = [row for row in csv.reader(f) if row]
+
+    if not rows:
+        return {}, ()
+
+    header, body = rows[0], rows[1:]
+    cells = [[] for _ in header]
+    for row in body:
+        for i in range(len(header)):
+            value = row[i] if i < len(row) else ''
+            if value != '':
+                cells[i].append(value)
+
+    columns = {}
+    for name, values in zip(header, cells):
+        # Keep the first column when a header repeats
+        if name not in columns:
+            columns[name] = tuple(values)
+
+    general = []
+    for row in body:
+        value = row[0] if row else ''
+        if value.strip() == '':
+            break
+        general.append(value)
+
+    return columns, tuple(general)
+
+
+class QuestionBank:
+    """Question CSV loaded once into memory and hot-reloaded on change
+
+    Every lookup does at most one ``os.stat`` (throttled by
+    ``check_interval``); the file is only re-parsed when its mtime or size
+    changes, and the new snapshot replaces the old one in a single reference
+    swap so readers never see a half-loaded bank.
+    """
+
+    def __init__(self, path, encoding='ISO-8859-1', check_interval=1.0):
+        self.path = path
+        self.encoding = encoding
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload_count = 0
+        self.last_load_seconds = 0.0
+        self.last_error = None
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, signature):
+        started = time.perf_counter()
+        try:
+            columns, general = parse_questions_file(self.path, self.encoding)
+        except Exception as e:
+            # Keep serving the previous snapshot if the file is mid-edit
+            self.last_error = str(e)
+            print(f"Error loading question bank: {e}")
+            return
+        self._snapshot = QuestionBankSnapshot(columns, general, signature, time.time())
+        self.reload_count += 1
+        self.last_load_seconds = time.perf_counter() - started
+        self.last_error = None
+
+    def snapshot(self):
+        """Return the current snapshot, reloading first if the file changed"""
+        now = time.monotonic()
+        if now < self._next_check and self._snapshot is not None:
+            return self._snapshot
+
+        with self._lock:
+            if now >= self._next_check or self._snapshot is None:
+                self._next_check = now + self.check_interval
+                signature = self._file_signature()
+                current = self._snapshot
+                if signature is None:
+                    self._snapshot = None
+                elif current is None or current.signature != signature:
+                    self._load(signature)
+        return self._snapshot
+
+    def general_questions(self):
+        """Return the general questions, or an empty tuple if unavailable"""
+        snapshot = self.snapshot()
+        return snapshot.general if snapshot else ()
+
+    def column(self, name):
+        """Return the questions of a column, or None if the column is missing"""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.columns.get(name)
+
+    def stats(self):
+        """Return reload counters and timing for monitoring"""
+        snapshot = self._snapshot
+        return {
+            'path': self.path,
+            'loaded': snapshot is not None,
+            'reload_count': self.reload_count,
+            'last_load_seconds': self.last_load_seconds,
+            'last_loaded_at': snapshot.loaded_at if snapshot else None,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,22 @@
+import threading
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def connect_redis(url):
+    """Shared redis-py client for ``url``, created on first use
+
+    The client's connection pool is thread-safe and reconnects after a
+    gunicorn fork, so one client per URL serves every thread and worker.
+    redis is only imported when REDIS_URL is set.
+    """
+    client = _clients.get(url)
+    if client is None:
+        with _lock:
+            client = _clients.get(url)
+            if client is None:
+                import redis
+
+                client = _clients[url] = redis.Redis.from_url(url)
+    return client
@@ -0,0 +1,280 @@
+import os
+import re
+import json
+import time
+import queue
+import threading
+import http.client
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from urllib.parse import urlsplit
+
+GENERATORS = ('template', 'openai')
+
+PROMPT = (
+    "You are a friendly recruiter interviewing a job candidate. The candidate has just "
+    "answered a question in the {step} part of the interview. Acknowledge the answer "
+    "in one or two short sentences. Do not ask a question; the next one follows.\n\n"
+    "Candidate: {message}\n"
+    "Recruiter:"
+)
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]+')
+
+
+def normalize_message(message):
+    """Cache form of an answer: lowercase words without punctuation"""
+    return ' '.join(_PUNCTUATION_RE.sub(' ', message.lower()).split())
+
+
+class ResponseCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl`` seconds after being stored"""
+
+    def __init__(self, max_entries=1024, ttl=3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TemplateGenerator:
+    """Replies with the template phrases; never calls out"""
+
+    def generate(self, user_message, step, fallback):
+        return fallback
+
+    def close(self):
+        pass
+
+
+class CompletionClient:
+    """Client for the ``/completions`` route of an OpenAI-compatible server
+
+    Each calling thread keeps one keep-alive connection, so a pool of
+    sender threads is also a connection pool. A list of prompts is sent in
+    one request and the choices come back in prompt order.
+    """
+
+    def __init__(self, base_url, model, api_key=None, timeout=10.0, max_tokens=60, temperature=0.7):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path.rstrip('/') + '/completions'
+        self.model = model
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.headers = {'Content-Type': 'application/json'}
+        if api_key:
+            self.headers['Authorization'] = f"Bearer {api_key}"
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = connection_class(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _post(self, body):
+        conn = self._connection()
+        try:
+            conn.request('POST', self.path, body=body, headers=self.headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def complete(self, prompts):
+        body = json.dumps({
+            'model': self.model,
+            'prompt': prompts,
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'stop': ['\n'],
+        })
+        try:
+            status, data = self._post(body)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # The server closed an idle keep-alive connection; retry once on a new one
+            status, data = self._post(body)
+        if status != 200:
+            raise RuntimeError(f"Completion request failed with HTTP {status}: {data[:200]!r}")
+        choices = sorted(json.loads(data)['choices'], key=lambda choice: choice.get('index', 0))
+        if len(choices) != len(prompts):
+            raise RuntimeError(f"Expected {len(prompts)} completions, got {len(choices)}")
+        return [choice.get('text', '') for choice in choices]
+
+
+class ModelGenerator:
+    """Replies written by a language model, with the template phrases as fallback
+
+    Answers shorter than ``min_words`` ("yes", "Java") keep the template
+    reply, and model replies are cached by (step, normalized answer), so
+    neither calls the model. A cache miss is queued; a dispatcher thread
+    sends up to ``batch_size`` queued prompts, collected for at most
+    ``batch_window`` seconds, in one request from a pool of ``pool_size``
+    sender threads. Identical pending answers share one prompt.
+
+    A chat turn waits at most ``timeout`` seconds and then uses the
+    template reply; the late model reply still fills the cache. After a
+    failed request the model is skipped for ``cooldown`` seconds, and when
+    ``max_pending`` prompts are waiting new ones are not queued, so a slow
+    or unreachable server never holds up the interview.
+    """
+
+    def __init__(self, client, cache, timeout=1.5, batch_size=8, batch_window=0.02, pool_size=4,
+                 min_words=3, max_pending=256, cooldown=30.0, observer=None):
+        self.client = client
+        self.cache = cache
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.pool_size = pool_size
+        self.min_words = min_words
+        self.max_pending = max_pending
+        self.cooldown = cooldown
+        self.observer = observer
+        self._lock = threading.Lock()
+        self._pid = None
+        self._retry_at = 0.0
+
+    def _start(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._pid == os.getpid():
+            return
+        self._queue = queue.Queue()
+        self._pending = {}
+        self._senders = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='response-model')
+        self._dispatcher = threading.Thread(target=self._dispatch, name='response-batcher', daemon=True)
+        self._dispatcher.start()
+        self._pid = os.getpid()
+
+    def _observe(self, source, reply):
+        if self.observer is not None:
+            self.observer(source)
+        return reply
+
+    def generate(self, user_message, step, fallback):
+        if len(user_message.split()) < self.min_words:
+            return self._observe('short', fallback)
+        key = (step, normalize_message(user_message))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self._observe('cache', cached)
+        if time.monotonic() < self._retry_at:
+            return self._observe('unavailable', fallback)
+
+        future = self._submit(key, PROMPT.format(step=step.replace('_', ' '), message=user_message.strip()))
+        if future is None:
+            return self._observe('overloaded', fallback)
+        try:
+            reply = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            return self._observe('timeout', fallback)
+        except Exception:
+            return self._observe('error', fallback)
+        return self._observe('model', reply) if reply else self._observe('error', fallback)
+
+    def _submit(self, key, prompt):
+        with self._lock:
+            self._start()
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            if len(self._pending) >= self.max_pending:
+                return None
+            future = Future()
+            self._pending[key] = future
+        self._queue.put((key, prompt, future))
+        return future
+
+    def _dispatch(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._senders.submit(self._send, batch)
+                    return
+                batch.append(item)
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch):
+        try:
+            replies = self.client.complete([prompt for _, prompt, _ in batch])
+        except Exception as e:
+            print(f"Error calling the response model: {e}")
+            self._retry_at = time.monotonic() + self.cooldown
+            for key, _, future in batch:
+                self._finish(key, future, error=e)
+            return
+        for (key, _, future), reply in zip(batch, replies):
+            reply = reply.strip()
+            if reply:
+                self.cache.put(key, reply)
+            self._finish(key, future, reply)
+
+    def _finish(self, key, future, reply=None, error=None):
+        with self._lock:
+            self._pending.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(reply)
+
+    def close(self):
+        if self._pid == os.getpid():
+            self._queue.put(None)
+            self._senders.shutdown(wait=False)
+            self._pid = None
+
+
+def create_response_generator(name, base_url=None, model=None, api_key=None, request_timeout=10.0,
+                              cache_size=1024, cache_ttl=3600.0, observer=None, **options):
+    """Build the reply generator named by RESPONSE_GENERATOR
+
+    Model settings are ignored by the template generator.
+    """
+    if name == 'template':
+        return TemplateGenerator()
+    if name == 'openai':
+        client = CompletionClient(base_url, model, api_key=api_key, timeout=request_timeout)
+        return ModelGenerator(client, ResponseCache(cache_size, cache_ttl), observer=observer, **options)
+    raise ValueError(f"Unknown response generator '{name}'; choose from {', '.join(GENERATORS)}")
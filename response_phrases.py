@@ -0,0 +1,122 @@
+import random
+from types import MappingProxyType
+
+THANK_YOU_PHRASES = (
+    "Thank you for sharing that! I appreciate your insights.",
+    "That's really valuable information, thank you!",
+    "I appreciate your thoughtful response.",
+    "Thanks for letting me know about that!",
+    "That's great to hear, thank you for sharing.",
+)
+
+# Per-step follow-ups. {occupation} and {role} are filled from the session
+# only for the phrases that use them
+FOLLOW_UP_PHRASES = MappingProxyType({
+    'general': (
+        "Let's dive a bit deeper into your background.",
+        "I'd like to understand more about your experiences.",
+        "Now, I'd like to explore another aspect of your profile.",
+        "That's interesting! Let's move on to another important question.",
+    ),
+    'occupation': (
+        "As a {occupation}, I'd like to ask you something specific.",
+        "Based on your professional background, I'm curious about something.",
+        "Your experience is quite interesting! Here's something I'd like to know:",
+        "Given your career path, I'm particularly interested in learning about:",
+    ),
+    'job_role': (
+        "With your interest in {role}, I'd like to know:",
+        "Your expertise in this area brings up an important question:",
+        "Considering your specialization, I'm curious about:",
+        "For someone with your skills, this next question is particularly relevant:",
+    ),
+    'job_type': (
+        "Let's talk about your work preferences in more detail.",
+        "I'd like to understand your ideal work arrangement better.",
+        "Your work style preferences are important. Let me ask you about:",
+        "Now, let's explore what work structure suits you best.",
+    ),
+    'job_mode': (
+        "Work environment matters a lot. Let's discuss that next.",
+        "Your preference for how you work is important to understand.",
+        "Let's explore your ideal working environment further.",
+        "Now, I'd like to know about where you prefer to work.",
+    ),
+    'resume_upload': (
+        "Your resume will help me understand your full professional story.",
+        "I'd love to see your resume to learn more about your journey.",
+        "Your resume will provide valuable context to your answers.",
+        "To complete your profile, I'll need your resume.",
+    ),
+    'complete': (
+        "Thank you for taking the time to complete this interview!",
+        "You've provided some fantastic insights throughout our conversation.",
+        "I've really enjoyed learning about your background and aspirations.",
+        "This has been a productive conversation! I appreciate your detailed responses.",
+    ),
+})
+
+EXPERIENCE_WORDS = frozenset(('experience', 'worked', 'job', 'project'))
+EDUCATION_WORDS = frozenset(('learn', 'education', 'study', 'university', 'college'))
+
+
+class Phrase:
+    """One reply template; plain phrases skip formatting entirely"""
+
+    __slots__ = ('text', 'templated')
+
+    def __init__(self, text):
+        self.text = text
+        self.templated = '{' in text
+
+    def fill(self, context):
+        if not self.templated:
+            return self.text
+        return self.text.format(
+            occupation=context.get('selected_occupation', 'professional'),
+            role=context.get('selected_role', 'this field'),
+        )
+
+
+THANK_YOU = tuple(Phrase(text) for text in THANK_YOU_PHRASES)
+FOLLOW_UP = MappingProxyType({
+    step: tuple(Phrase(text) for text in phrases) for step, phrases in FOLLOW_UP_PHRASES.items()
+})
+
+
+def interview_rng(session):
+    """Random source for one draw, reproducible from the interview ID
+
+    Each call seeds a fresh generator from ``interview_id`` and a draw
+    counter kept in the session, so only one small integer is stored and
+    replaying an interview's messages repeats its question samples and
+    phrase choices on any worker.
+    """
+    draws = session.get('rng_draws', 0)
+    session['rng_draws'] = draws + 1
+    return random.Random(f"{session.get('interview_id', 0)}:{draws}")
+
+
+def compose_response(sentiment_compound, tokens, step, context, rng):
+    """Build the reply to an answer from its sentiment and tokens"""
+    # Select appropriate response templates based on sentiment
+    if sentiment_compound > 0.3:
+        thank_you = "Excellent! " + rng.choice(THANK_YOU).text
+    elif sentiment_compound > 0:
+        thank_you = rng.choice(THANK_YOU).text
+    elif sentiment_compound > -0.3:
+        thank_you = "I understand. Thanks for sharing your perspective."
+    else:
+        thank_you = "I appreciate you sharing that with me, even though it might be challenging."
+
+    # Generate appropriate follow-up based on current step
+    follow_up = rng.choice(FOLLOW_UP.get(step) or FOLLOW_UP['general']).fill(context)
+
+    # Special handling for specific context keywords
+    if not EXPERIENCE_WORDS.isdisjoint(tokens):
+        follow_up = "Your experience is valuable! " + follow_up
+
+    if not EDUCATION_WORDS.isdisjoint(tokens):
+        follow_up = "Your educational background provides great context. " + follow_up
+
+    return f"{thank_you} {follow_up}"
@@ -0,0 +1,611 @@
+import os
+import re
+import json
+import fcntl
+
+from redis_utils import connect_redis
+from sqlite_utils import LocalConnection
+
+
+class ResultsStore:
+    """Append-only storage for completed interview records
+
+    Each record is the flat dict built at the end of an interview
+    (``interview_id``, timestamps, ``answer_*`` and ``question_*`` keys).
+    Backends must make ``append`` safe across processes and constant time
+    regardless of how many interviews are already stored. Appending a
+    record replaces any stored with the same ``interview_id``, so a write
+    replayed after a crash or retried by another node is stored once.
+    """
+
+    def append(self, record):
+        raise NotImplementedError
+
+    def append_many(self, records):
+        """Append several records; backends override this to write them at once"""
+        for record in records:
+            self.append(record)
+
+    def iter_records(self):
+        raise NotImplementedError
+
+    def update_records(self, updates):
+        """Merge extra fields into stored records
+
+        ``updates`` is an iterable of ``(interview_id, fields)`` pairs; every
+        record with that interview ID gets ``fields`` added or overwritten.
+        """
+        raise NotImplementedError
+
+    def get(self, interview_id):
+        """Return the stored record of one interview, or None
+
+        Scans every record; the Redis backend looks it up directly.
+        """
+        found = None
+        for record in self.iter_records():
+            if str(record.get('interview_id')) == str(interview_id):
+                found = record
+        return found
+
+    def max_interview_id(self):
+        """Return the highest stored interview ID, or 0 if empty"""
+        max_id = 0
+        for record in self.iter_records():
+            try:
+                max_id = max(max_id, int(record.get('interview_id') or 0))
+            except (TypeError, ValueError):
+                continue
+        return max_id
+
+    def count(self):
+        return sum(1 for _ in self.iter_records())
+
+
+def latest_by_id(records):
+    """Drop all but the last of several records with the same interview ID"""
+    last = {record.get('interview_id'): i for i, record in enumerate(records)}
+    return [
+        record for i, record in enumerate(records)
+        if record.get('interview_id') is None or last[record.get('interview_id')] == i
+    ]
+
+
+class SQLiteResultsStore(ResultsStore):
+    """Results kept as JSON rows in a WAL-mode SQLite database"""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = LocalConnection(path)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS interviews ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " interview_id INTEGER,"
+            " submission_time TEXT,"
+            " data TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_interviews_id ON interviews (interview_id)")
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        # One transaction per batch instead of one commit per record
+        records = latest_by_id(records)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "DELETE FROM interviews WHERE interview_id = ?",
+                ((r['interview_id'],) for r in records if r.get('interview_id') is not None),
+            )
+            conn.executemany(
+                "INSERT INTO interviews (interview_id, submission_time, data) VALUES (?, ?, ?)",
+                ((r.get('interview_id'), r.get('submission_time'), json.dumps(r)) for r in records),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def iter_records(self, page_size=500):
+        # Page by seq so callers can write to the table while iterating
+        conn = self._connection()
+        last_seq = 0
+        while True:
+            rows = conn.execute(
+                "SELECT seq, data FROM interviews WHERE seq > ? ORDER BY seq LIMIT ?",
+                (last_seq, page_size),
+            ).fetchall()
+            if not rows:
+                return
+            for seq, data in rows:
+                yield json.loads(data)
+            last_seq = rows[-1][0]
+
+    def update_records(self, updates):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE interviews SET data = json_patch(data, ?) WHERE interview_id = ?",
+                ((json.dumps(fields), interview_id) for interview_id, fields in updates),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def max_interview_id(self):
+        row = self._connection().execute("SELECT MAX(interview_id) FROM interviews").fetchone()
+        return int(row[0]) if row and row[0] is not None else 0
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM interviews").fetchone()[0]
+
+
+class JsonlResultsStore(ResultsStore):
+    """Results kept as one JSON object per line in an append-only file"""
+
+    def __init__(self, path):
+        self.path = path
+        # A sidecar lock file survives the data file being replaced by a rewrite
+        self.lock_path = f"{path}.lock"
+
+    def _lock(self):
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def _unlock(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        data = ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+        if not data:
+            return
+        lock_fd = self._lock()
+        try:
+            # O_APPEND keeps the write at the end; the lock stops concurrent
+            # writers from interleaving a partially written line
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        finally:
+            self._unlock(lock_fd)
+
+    def update_records(self, updates):
+        pending = {}
+        for interview_id, fields in updates:
+            pending.setdefault(interview_id, {}).update(fields)
+        if not pending:
+            return
+
+        # Updates are rare and offline, so rewrite the file under the lock
+        lock_fd = self._lock()
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as out:
+                for record in self.iter_records():
+                    fields = pending.get(record.get('interview_id'))
+                    if fields:
+                        record.update(fields)
+                    out.write(json.dumps(record) + '\n')
+            os.replace(tmp_path, self.path)
+        finally:
+            self._unlock(lock_fd)
+
+    def _iter_lines(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A worker killed mid-write can leave a torn last line
+                    print(f"Skipping unreadable line in {self.path}")
+
+    def iter_records(self):
+        # The file is append-only, so a replayed write adds a second line
+        # for its interview; the last line of each interview wins
+        last = {}
+        for line_number, record in enumerate(self._iter_lines()):
+            last[record.get('interview_id')] = line_number
+        for line_number, record in enumerate(self._iter_lines()):
+            interview_id = record.get('interview_id')
+            if interview_id is None or last.get(interview_id) == line_number:
+                yield record
+
+
+# Columns of the interviews table; every other non answer/question field of
+# a record is kept as a key/value row in interview_fields
+INTERVIEW_COLUMNS = ('interview_id', 'interview_start_time', 'submission_time', 'resume_filename')
+
+# Flow step of an answer key: general_0 -> general, job_role_q2 -> job_role
+_STEP_RE = re.compile(r'^(.+?)(?:_q?\d+)?$')
+
+
+def answer_step(answer_key):
+    return _STEP_RE.match(answer_key).group(1)
+
+
+class NormalizedResultsStore(ResultsStore):
+    """Results kept in long format: one row per answered question
+
+    Question texts are interned in a ``questions`` table and referenced by
+    ID, so sampled questions never become columns. The ``interview_answers``
+    view exposes (interview_id, step, question_id, question_text, answer)
+    rows, and ``iter_records`` rebuilds the wide ``answer_*``/``question_*``
+    records for export.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = LocalConnection(path)
+        # Question text -> ID, filled as questions are interned
+        self._question_ids = {}
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS interviews ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " interview_id INTEGER,"
+            " interview_start_time TEXT,"
+            " submission_time TEXT,"
+            " resume_filename TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_interviews_id ON interviews (interview_id)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            " question_id INTEGER PRIMARY KEY,"
+            " text TEXT NOT NULL UNIQUE)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " seq INTEGER NOT NULL REFERENCES interviews (seq),"
+            " answer_key TEXT NOT NULL,"
+            " step TEXT NOT NULL,"
+            " question_id INTEGER REFERENCES questions (question_id),"
+            " answer,"
+            " PRIMARY KEY (seq, answer_key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_question ON answers (question_id)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS interview_fields ("
+            " seq INTEGER NOT NULL REFERENCES interviews (seq),"
+            " key TEXT NOT NULL,"
+            " value,"
+            " PRIMARY KEY (seq, key))"
+        )
+        conn.execute(
+            "CREATE VIEW IF NOT EXISTS interview_answers AS"
+            " SELECT i.interview_id, a.step, a.answer_key, a.question_id, q.text AS question_text, a.answer"
+            " FROM answers a JOIN interviews i ON i.seq = a.seq"
+            " LEFT JOIN questions q ON q.question_id = a.question_id"
+        )
+
+    def _question_id(self, conn, text):
+        if text is None:
+            return None
+        text = str(text)
+        question_id = self._question_ids.get(text)
+        if question_id is None:
+            conn.execute("INSERT OR IGNORE INTO questions (text) VALUES (?)", (text,))
+            question_id = conn.execute("SELECT question_id FROM questions WHERE text = ?", (text,)).fetchone()[0]
+            self._question_ids[text] = question_id
+        return question_id
+
+    @staticmethod
+    def _split(record):
+        """Split a wide record into answer rows {key: (question, answer)} and extra fields"""
+        rows = {}
+        extra = {}
+        for key, value in record.items():
+            if key.startswith('answer_'):
+                answer_key = key[len('answer_'):]
+                rows[answer_key] = (rows.get(answer_key, (None, None))[0], value)
+            elif key.startswith('question_'):
+                answer_key = key[len('question_'):]
+                rows[answer_key] = (value, rows.get(answer_key, (None, None))[1])
+            elif key not in INTERVIEW_COLUMNS:
+                extra[key] = value
+        return rows, extra
+
+    def _delete(self, conn, interview_id):
+        for (seq,) in conn.execute("SELECT seq FROM interviews WHERE interview_id = ?", (interview_id,)).fetchall():
+            conn.execute("DELETE FROM answers WHERE seq = ?", (seq,))
+            conn.execute("DELETE FROM interview_fields WHERE seq = ?", (seq,))
+            conn.execute("DELETE FROM interviews WHERE seq = ?", (seq,))
+
+    def _insert(self, conn, record):
+        if record.get('interview_id') is not None:
+            self._delete(conn, record['interview_id'])
+        seq = conn.execute(
+            "INSERT INTO interviews (interview_id, interview_start_time, submission_time, resume_filename)"
+            " VALUES (?, ?, ?, ?)",
+            tuple(record.get(column) for column in INTERVIEW_COLUMNS),
+        ).lastrowid
+        rows, extra = self._split(record)
+        conn.executemany(
+            "INSERT INTO answers (seq, answer_key, step, question_id, answer) VALUES (?, ?, ?, ?, ?)",
+            [
+                (seq, answer_key, answer_step(answer_key), self._question_id(conn, question), answer)
+                for answer_key, (question, answer) in rows.items()
+            ],
+        )
+        if extra:
+            conn.executemany(
+                "INSERT INTO interview_fields (seq, key, value) VALUES (?, ?, ?)",
+                [(seq, key, value) for key, value in extra.items()],
+            )
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for record in records:
+                self._insert(conn, record)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            # IDs cached inside the rolled back transaction no longer exist
+            self._question_ids.clear()
+            raise
+
+    def iter_records(self, page_size=500):
+        # Page by seq so callers can write to the tables while iterating
+        conn = self._connection()
+        last_seq = 0
+        while True:
+            interviews = conn.execute(
+                "SELECT seq, interview_id, interview_start_time, submission_time, resume_filename"
+                " FROM interviews WHERE seq > ? ORDER BY seq LIMIT ?",
+                (last_seq, page_size),
+            ).fetchall()
+            if not interviews:
+                return
+            first, last = interviews[0][0], interviews[-1][0]
+            answers = {}
+            for seq, answer_key, question_text, answer in conn.execute(
+                "SELECT a.seq, a.answer_key, q.text, a.answer FROM answers a"
+                " LEFT JOIN questions q ON q.question_id = a.question_id"
+                " WHERE a.seq BETWEEN ? AND ? ORDER BY a.seq, a.rowid",
+                (first, last),
+            ):
+                answers.setdefault(seq, []).append((answer_key, question_text, answer))
+            extra = {}
+            for seq, key, value in conn.execute(
+                "SELECT seq, key, value FROM interview_fields WHERE seq BETWEEN ? AND ? ORDER BY seq, rowid",
+                (first, last),
+            ):
+                extra.setdefault(seq, []).append((key, value))
+
+            for seq, *values in interviews:
+                record = {column: value for column, value in zip(INTERVIEW_COLUMNS, values) if value is not None}
+                rows = answers.get(seq, [])
+                for answer_key, _, answer in rows:
+                    if answer is not None:
+                        record[f"answer_{answer_key}"] = answer
+                for answer_key, question_text, _ in rows:
+                    if question_text is not None:
+                        record[f"question_{answer_key}"] = question_text
+                record.update(extra.get(seq, []))
+                yield record
+            last_seq = last
+
+    def update_records(self, updates):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for interview_id, fields in updates:
+                rows, extra = self._split(fields)
+                seqs = [row[0] for row in conn.execute("SELECT seq FROM interviews WHERE interview_id = ?", (interview_id,))]
+                for seq in seqs:
+                    for answer_key, (question, answer) in rows.items():
+                        conn.execute(
+                            "INSERT INTO answers (seq, answer_key, step, question_id, answer) VALUES (?, ?, ?, ?, ?)"
+                            " ON CONFLICT (seq, answer_key) DO UPDATE SET"
+                            " question_id = COALESCE(excluded.question_id, question_id),"
+                            " answer = COALESCE(excluded.answer, answer)",
+                            (seq, answer_key, answer_step(answer_key), self._question_id(conn, question), answer),
+                        )
+                    conn.executemany(
+                        "INSERT INTO interview_fields (seq, key, value) VALUES (?, ?, ?)"
+                        " ON CONFLICT (seq, key) DO UPDATE SET value = excluded.value",
+                        [(seq, key, value) for key, value in extra.items()],
+                    )
+                    columns = [column for column in INTERVIEW_COLUMNS[1:] if column in fields]
+                    if columns:
+                        conn.execute(
+                            f"UPDATE interviews SET {', '.join(f'{column} = ?' for column in columns)} WHERE seq = ?",
+                            [fields[column] for column in columns] + [seq],
+                        )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            self._question_ids.clear()
+            raise
+
+    def max_interview_id(self):
+        row = self._connection().execute("SELECT MAX(interview_id) FROM interviews").fetchone()
+        return int(row[0]) if row and row[0] is not None else 0
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM interviews").fetchone()[0]
+
+
+class RedisResultsStore(ResultsStore):
+    """Results kept in Redis, one hash per interview, shared by every node
+
+    ``{prefix}:{interview_id}`` holds the fields of a record as JSON values
+    and the ``{prefix}:ids`` sorted set orders interview IDs. Writing a
+    record deletes and rewrites its hash in one transaction.
+    """
+
+    def __init__(self, client, prefix='chatbot:results'):
+        self.client = client
+        self.prefix = prefix
+        self.ids_key = f"{prefix}:ids"
+
+    def _key(self, interview_id):
+        return f"{self.prefix}:{interview_id}"
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        if any(record.get('interview_id') is None for record in records):
+            raise ValueError("Records stored in Redis need an interview_id")
+        pipe = self.client.pipeline(transaction=True)
+        for record in latest_by_id(records):
+            interview_id = int(record['interview_id'])
+            key = self._key(interview_id)
+            pipe.delete(key)
+            pipe.hset(key, mapping={field: json.dumps(value) for field, value in record.items()})
+            pipe.zadd(self.ids_key, {interview_id: interview_id})
+        pipe.execute()
+
+    def iter_records(self, page_size=500):
+        # Page by interview ID so callers can write while iterating
+        low = '-inf'
+        while True:
+            ids = self.client.zrangebyscore(self.ids_key, low, '+inf', start=0, num=page_size)
+            if not ids:
+                return
+            pipe = self.client.pipeline(transaction=False)
+            for interview_id in ids:
+                pipe.hgetall(self._key(int(interview_id)))
+            for stored in pipe.execute():
+                if stored:
+                    yield {field.decode('utf-8'): json.loads(value) for field, value in stored.items()}
+            low = f"({int(ids[-1])}"
+
+    def get(self, interview_id):
+        stored = self.client.hgetall(self._key(int(interview_id)))
+        if not stored:
+            return None
+        return {field.decode('utf-8'): json.loads(value) for field, value in stored.items()}
+
+    def update_records(self, updates):
+        updates = [(int(interview_id), fields) for interview_id, fields in updates if fields]
+        if not updates:
+            return
+        # Only merge into stored interviews; a bare hash would look like a record
+        pipe = self.client.pipeline(transaction=False)
+        for interview_id, _ in updates:
+            pipe.zscore(self.ids_key, interview_id)
+        stored = pipe.execute()
+        pipe = self.client.pipeline(transaction=True)
+        for (interview_id, fields), score in zip(updates, stored):
+            if score is not None:
+                pipe.hset(self._key(interview_id), mapping={field: json.dumps(value) for field, value in fields.items()})
+        pipe.execute()
+
+    def max_interview_id(self):
+        top = self.client.zrange(self.ids_key, -1, -1, withscores=True)
+        return int(top[0][1]) if top else 0
+
+    def count(self):
+        return self.client.zcard(self.ids_key)
+
+
+def create_results_store(backend, data_dir, redis_url=None):
+    """Build the configured results backend ('normalized', 'sqlite', 'jsonl' or 'redis')"""
+    if backend == 'normalized':
+        return NormalizedResultsStore(os.path.join(data_dir, 'interview_answers.db'))
+    if backend == 'sqlite':
+        return SQLiteResultsStore(os.path.join(data_dir, 'interview_results.db'))
+    if backend == 'jsonl':
+        return JsonlResultsStore(os.path.join(data_dir, 'interview_results.jsonl'))
+    if backend == 'redis':
+        if not redis_url:
+            raise ValueError("RESULTS_BACKEND=redis needs REDIS_URL")
+        return RedisResultsStore(connect_redis(redis_url))
+    raise ValueError(f"Unknown results backend: {backend}")
+
+
+def export_xlsx(store, path):
+    """Write every stored interview to an Excel workbook, one row each"""
+    import pandas as pd
+
+    df = pd.DataFrame(list(store.iter_records()))
+    tmp_path = f"{path}.tmp.xlsx"
+    df.to_excel(tmp_path, index=False)
+    # Replace in one step so recruiters never open a half-written file
+    os.replace(tmp_path, path)
+    return len(df)
+
+
+def _append_batch(store, batch, id_allocator=None):
+    # Move the ID counter past the batch first, so no interview started
+    # during the import is handed one of its IDs and later replaces it
+    if id_allocator is not None:
+        ids = []
+        for record in batch:
+            try:
+                ids.append(int(record.get('interview_id') or 0))
+            except (TypeError, ValueError):
+                continue
+        if ids:
+            id_allocator.advance_to(max(ids))
+    store.append_many(batch)
+    return len(batch)
+
+
+def import_xlsx(store, path, batch_size=500, id_allocator=None):
+    """Append the rows of an existing results workbook to the store
+
+    Empty cells are dropped, so the sparse wide columns of the workbook
+    become only the answers each interview actually has. With
+    ``id_allocator``, new interviews are numbered after the imported ones.
+    """
+    import pandas as pd
+
+    df = pd.read_excel(path)
+    imported = 0
+    batch = []
+    for row in df.to_dict(orient='records'):
+        record = {}
+        for key, value in row.items():
+            if pd.isna(value):
+                continue
+            if isinstance(value, pd.Timestamp):
+                value = value.strftime('%Y-%m-%d %H:%M:%S')
+            record[key] = value.item() if hasattr(value, 'item') else value
+        batch.append(record)
+        if len(batch) >= batch_size:
+            imported += _append_batch(store, batch, id_allocator)
+            batch = []
+    if batch:
+        imported += _append_batch(store, batch, id_allocator)
+    return imported
+
+
+def copy_records(source, target, batch_size=500, id_allocator=None):
+    """Append every record of one store to another and return the count
+
+    With ``id_allocator``, new interviews are numbered after the copied ones.
+    """
+    copied = 0
+    batch = []
+    for record in source.iter_records():
+        batch.append(record)
+        if len(batch) >= batch_size:
+            copied += _append_batch(target, batch, id_allocator)
+            batch = []
+    if batch:
+        copied += _append_batch(target, batch, id_allocator)
+    return copied
@@ -0,0 +1,211 @@
+import json
+import math
+import threading
+from collections import Counter
+
+from answer_quality import ROLE_COLUMNS, keyword_tokens
+from sqlite_utils import LocalConnection
+
+# What each role's resume is expected to mention, on top of the words of
+# the role's questions in questions.csv
+ROLE_PROFILES = {
+    'UI/UX': '''
+        user experience interface design designer usability accessibility wireframe wireframes
+        prototype prototyping figma sketch adobe xd invision user research personas journey
+        mapping information architecture interaction visual typography layout responsive
+        design systems style guide heuristic evaluation testing stakeholders empathy
+    ''',
+    'Java': '''
+        java jvm spring boot hibernate jpa maven gradle junit mockito microservices rest api
+        servlet tomcat multithreading concurrency collections generics streams lambda oop
+        object oriented design patterns backend sql jdbc kafka docker kubernetes git
+    ''',
+    'AI/ML': '''
+        machine learning deep learning artificial intelligence python numpy pandas scikit learn
+        tensorflow pytorch keras neural networks nlp computer vision regression classification
+        clustering model training evaluation features dataset data science statistics
+        transformers embeddings bias fairness deployment mlops
+    ''',
+}
+
+
+def term_counts(text):
+    """Count the topic words of a text, skipping stopwords and short tokens"""
+    return Counter(keyword_tokens(text))
+
+
+class ResumeMatcher:
+    """TF-IDF index matching extracted resume text against job role profiles
+
+    Term counts of each resume are stored in SQLite as its text is
+    extracted, so every worker process sees them. A process loads new rows
+    into a sparse resume x term matrix (coordinate arrays: row, column,
+    value) the next time it answers a query, instead of rebuilding it.
+
+    IDF weights, row norms and the role vectors are computed once per
+    change of the rows or of questions.csv, so a top-k query is one sparse
+    matrix-vector product: gather the role weight of every stored term,
+    multiply, and sum per row with ``numpy.bincount``. Scores are cosine
+    similarities between 0 and 1.
+    """
+
+    def __init__(self, path, question_bank, profiles=ROLE_PROFILES):
+        self.question_bank = question_bank
+        self.profiles = profiles
+        self._lock = threading.Lock()
+        self._connection = LocalConnection(path)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS resume_terms ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " interview_id INTEGER NOT NULL UNIQUE,"
+            " terms TEXT NOT NULL)"
+        )
+        self._reset()
+
+    def _reset(self):
+        self._vocab = {}
+        self._interview_ids = []
+        self._row_of = {}
+        self._alive = []
+        self._chunks = []
+        self._loaded_seq = 0
+        self._matrix = None
+        self._weights = None
+
+    def roles(self):
+        return list(self.profiles)
+
+    def add(self, interview_id, text):
+        """Store the term counts of one resume, replacing any earlier version"""
+        counts = term_counts(text or '')
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A new seq makes other processes pick the replacement up
+            conn.execute("DELETE FROM resume_terms WHERE interview_id = ?", (int(interview_id),))
+            if counts:
+                conn.execute(
+                    "INSERT INTO resume_terms (interview_id, terms) VALUES (?, ?)",
+                    (int(interview_id), json.dumps(counts)),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._connection().execute("DELETE FROM resume_terms")
+        with self._lock:
+            self._reset()
+
+    def _sync(self):
+        """Load rows stored since the last query; call with the lock held"""
+        import numpy as np
+
+        conn = self._connection()
+        # One read transaction, so the count and the new rows agree
+        conn.execute("BEGIN")
+        try:
+            stored = conn.execute("SELECT COUNT(*) FROM resume_terms").fetchone()[0]
+            rows = conn.execute(
+                "SELECT seq, interview_id, terms FROM resume_terms WHERE seq > ? ORDER BY seq",
+                (self._loaded_seq,),
+            ).fetchall()
+            live = len(self._row_of) + sum(1 for _, interview_id, _ in rows if interview_id not in self._row_of)
+            if live != stored:
+                # Rows were removed (a clear or a re-extraction without text), so start over
+                self._reset()
+                rows = conn.execute("SELECT seq, interview_id, terms FROM resume_terms ORDER BY seq").fetchall()
+        finally:
+            conn.execute("COMMIT")
+        if not rows:
+            return
+
+        for seq, interview_id, terms in rows:
+            row = len(self._interview_ids)
+            previous = self._row_of.get(interview_id)
+            if previous is not None:
+                self._alive[previous] = False
+            self._row_of[interview_id] = row
+            self._interview_ids.append(interview_id)
+            self._alive.append(True)
+            counts = json.loads(terms)
+            columns = np.fromiter(
+                (self._vocab.setdefault(term, len(self._vocab)) for term in counts), dtype=np.int64, count=len(counts)
+            )
+            # Sublinear term frequency, so one repeated word cannot dominate
+            values = 1.0 + np.log(np.fromiter(counts.values(), dtype=float, count=len(counts)))
+            self._chunks.append((np.full(len(counts), row, dtype=np.int64), columns, values))
+            self._loaded_seq = seq
+        self._matrix = None
+
+    def _build(self):
+        """Return the weighted matrix and role vectors; call with the lock held"""
+        import numpy as np
+
+        snapshot = self.question_bank.snapshot() if self.question_bank is not None else None
+        signature = snapshot.signature if snapshot is not None else None
+        if self._matrix is not None and self._weights is not None and self._weights[0] == signature:
+            return self._matrix, self._weights[1]
+
+        if self._matrix is None:
+            if len(self._chunks) > 1:
+                # Merge the rows loaded since the last build into one set of arrays
+                self._chunks = [tuple(np.concatenate(parts) for parts in zip(*self._chunks))]
+            n_rows, n_terms = len(self._interview_ids), len(self._vocab)
+            if self._chunks:
+                rows, columns, values = self._chunks[0]
+            else:
+                rows = columns = np.zeros(0, dtype=np.int64)
+                values = np.zeros(0)
+            alive = np.asarray(self._alive, dtype=bool)
+            live = alive[rows]
+
+            # Smoothed IDF over the current resumes
+            documents = int(alive.sum())
+            df = np.bincount(columns[live], minlength=n_terms)
+            idf = np.log((1.0 + documents) / (1.0 + df)) + 1.0
+
+            weighted = values * idf[columns] * live
+            norms = np.sqrt(np.bincount(rows, weights=weighted * weighted, minlength=n_rows))
+            weighted = np.divide(weighted, norms[rows], out=np.zeros_like(weighted), where=norms[rows] > 0)
+            self._matrix = (rows, columns, weighted, alive, idf)
+            self._weights = None
+
+        idf = self._matrix[-1]
+        columns_by_role = snapshot.columns if snapshot is not None else {}
+        role_vectors = {}
+        for role, profile in self.profiles.items():
+            questions = ' '.join(columns_by_role.get(ROLE_COLUMNS.get(role, role), ()))
+            counts = term_counts(f"{profile} {questions}")
+            vector = np.zeros(len(idf))
+            # Like any fitted vectorizer, words no resume uses are left out
+            for term, count in counts.items():
+                column = self._vocab.get(term)
+                if column is not None:
+                    vector[column] = (1.0 + math.log(count)) * idf[column]
+            norm = np.linalg.norm(vector)
+            role_vectors[role] = vector / norm if norm else vector
+        self._weights = (signature, role_vectors)
+        return self._matrix, role_vectors
+
+    def top_k(self, role, k=10):
+        """Return up to ``k`` ``(interview_id, score)`` pairs for ``role``, best first"""
+        import numpy as np
+
+        with self._lock:
+            self._sync()
+            matrix, role_vectors = self._build()
+            interview_ids = self._interview_ids
+        if role not in role_vectors:
+            raise KeyError(role)
+        rows, columns, weighted, alive, _ = matrix
+        if not len(alive) or k <= 0:
+            return []
+
+        scores = np.bincount(rows, weights=weighted * role_vectors[role][columns], minlength=len(alive))
+        scores[~alive] = -1.0
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(interview_ids[i], round(float(scores[i]), 4)) for i in best if scores[i] > 0]
@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import uuid
+import zipfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.etree import ElementTree
+
+from sqlite_utils import LocalConnection
+
+# Size of the chunks an upload is copied to disk in
+CHUNK_SIZE = 64 * 1024
+
+# Fields of a job as returned by status()
+JOB_FIELDS = ('job_id', 'interview_id', 'status', 'error', 'chars', 'created', 'finished')
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload stream exceeds the configured size limit"""
+
+
+class UnsupportedResumeFormat(Exception):
+    """Raised when no local text extractor handles the file type"""
+
+
+def extract_pdf_text(path):
+    """Extract the text layer of a PDF with pypdf"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+
+def extract_docx_text(path):
+    """Extract paragraph text from a DOCX using only the standard library"""
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read('word/document.xml'))
+    paragraphs = []
+    for paragraph in root.iter(f'{WORD_NAMESPACE}p'):
+        text = ''.join(node.text or '' for node in paragraph.iter(f'{WORD_NAMESPACE}t'))
+        if text:
+            paragraphs.append(text)
+    return '\n'.join(paragraphs)
+
+
+EXTRACTORS = {
+    'pdf': extract_pdf_text,
+    'docx': extract_docx_text,
+}
+
+
+def extract_text(path):
+    """Extract plain text from a resume file based on its extension"""
+    extension = path.rsplit('.', 1)[-1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise UnsupportedResumeFormat(f"No text extractor for .{extension} files")
+    return extractor(path)
+
+
+class ResumeJobStore:
+    """Resume job state in SQLite and extracted text in ``{text_dir}/{interview_id}.txt``
+
+    Both live on this node's disk, so any worker process of the node can
+    answer a status poll or read the text.
+    """
+
+    def __init__(self, db_path, text_dir):
+        self.text_dir = text_dir
+        os.makedirs(text_dir, exist_ok=True)
+        self._connection = LocalConnection(db_path)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS resume_jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " interview_id INTEGER,"
+            " file_path TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " error TEXT,"
+            " chars INTEGER,"
+            " created REAL NOT NULL,"
+            " finished REAL)"
+        )
+
+    def create(self, job_id, interview_id, file_path):
+        self._connection().execute(
+            "INSERT INTO resume_jobs (job_id, interview_id, file_path, status, created) VALUES (?, ?, ?, 'queued', ?)",
+            (job_id, interview_id, file_path, time.time()),
+        )
+
+    def finish(self, job_id, status, error=None, chars=None):
+        self._connection().execute(
+            "UPDATE resume_jobs SET status = ?, error = ?, chars = ?, finished = ? WHERE job_id = ?",
+            (status, error, chars, time.time(), job_id),
+        )
+
+    def status(self, job_id):
+        """Return the state of a job as a dict, or None if it is unknown"""
+        row = self._connection().execute(
+            "SELECT job_id, interview_id, status, error, chars, created, finished FROM resume_jobs WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(JOB_FIELDS, row))
+
+    def text_path(self, interview_id):
+        return os.path.join(self.text_dir, f"{interview_id}.txt")
+
+    def write_text(self, interview_id, text):
+        path = self.text_path(interview_id)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(f"{path}.tmp", path)
+
+    def read_text(self, interview_id):
+        """Return the extracted resume text of an interview, or None"""
+        try:
+            with open(self.text_path(interview_id), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def iter_texts(self):
+        """Yield ``(interview_id, text)`` for every extracted resume"""
+        for name in sorted(os.listdir(self.text_dir)):
+            stem, _, extension = name.partition('.')
+            if extension == 'txt' and stem.isdigit():
+                text = self.read_text(int(stem))
+                if text is not None:
+                    yield int(stem), text
+
+
+class RedisResumeJobStore:
+    """Resume job state and extracted text in Redis, shared by every node
+
+    A job is a hash under ``{prefix}:job:{job_id}`` that expires
+    ``job_ttl`` seconds after its last update, so a status poll can land on
+    any node. Text is kept under ``{prefix}:text:{interview_id}`` for the
+    node that saves the interview, which may not be the one that extracted
+    it.
+    """
+
+    def __init__(self, client, job_ttl, prefix='chatbot:resume'):
+        self.client = client
+        self.job_ttl = job_ttl
+        self.prefix = prefix
+
+    def _set_job(self, job_id, fields):
+        key = f"{self.prefix}:job:{job_id}"
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(key, mapping={field: json.dumps(value) for field, value in fields.items()})
+        pipe.expire(key, int(self.job_ttl))
+        pipe.execute()
+
+    def create(self, job_id, interview_id, file_path):
+        self._set_job(job_id, {
+            'job_id': job_id, 'interview_id': interview_id, 'status': 'queued',
+            'error': None, 'chars': None, 'created': time.time(), 'finished': None,
+        })
+
+    def finish(self, job_id, status, error=None, chars=None):
+        self._set_job(job_id, {'status': status, 'error': error, 'chars': chars, 'finished': time.time()})
+
+    def status(self, job_id):
+        """Return the state of a job as a dict, or None if it is unknown"""
+        stored = self.client.hgetall(f"{self.prefix}:job:{job_id}")
+        if not stored:
+            return None
+        fields = {field.decode('utf-8'): json.loads(value) for field, value in stored.items()}
+        return {field: fields.get(field) for field in JOB_FIELDS}
+
+    def write_text(self, interview_id, text):
+        self.client.set(f"{self.prefix}:text:{interview_id}", text.encode('utf-8'))
+
+    def read_text(self, interview_id):
+        """Return the extracted resume text of an interview, or None"""
+        value = self.client.get(f"{self.prefix}:text:{interview_id}")
+        return value.decode('utf-8') if value is not None else None
+
+    def iter_texts(self):
+        """Yield ``(interview_id, text)`` for every extracted resume"""
+        prefix = f"{self.prefix}:text:"
+        interview_ids = []
+        for key in self.client.scan_iter(match=f"{prefix}*", count=1000):
+            stem = key.decode('utf-8')[len(prefix):]
+            if stem.isdigit():
+                interview_ids.append(int(stem))
+        for interview_id in sorted(interview_ids):
+            text = self.read_text(interview_id)
+            if text is not None:
+                yield interview_id, text
+
+
+class ResumeProcessor:
+    """Background text extraction for uploaded resumes
+
+    ``submit`` records a job and hands the file to a process pool, so the
+    upload request returns immediately and PDF parsing never competes with
+    request threads for the GIL. Job state and extracted text are kept in
+    ``store``, a ResumeJobStore or RedisResumeJobStore.
+
+    Spawned workers import the script the app was started from, so that
+    script must keep its work under a ``__main__`` guard (see serve.py).
+    """
+
+    def __init__(self, store, workers=2):
+        self.store = store
+        self.workers = workers
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def _pool(self):
+        # Pools do not survive a fork, so each app worker process gets its own;
+        # children are spawned because forking a threaded server is unsafe
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    # Lower priority so extraction yields the CPU to chat requests
+                    initializer=os.nice,
+                    initargs=(10,),
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _drop_pool(self, broken):
+        # Another request thread may already have replaced the broken pool
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+
+    def add_listener(self, callback):
+        """Call ``callback(interview_id, text)`` after each successful extraction"""
+        self._listeners.append(callback)
+
+    def read_text(self, interview_id):
+        """Return the extracted resume text of an interview, or None"""
+        return self.store.read_text(interview_id)
+
+    def iter_texts(self):
+        """Yield ``(interview_id, text)`` for every extracted resume"""
+        return self.store.iter_texts()
+
+    def submit(self, interview_id, file_path):
+        """Queue a file for extraction and return its job ID"""
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, interview_id, file_path)
+        executor = self._pool()
+        try:
+            future = executor.submit(extract_text, file_path)
+        except BrokenProcessPool:
+            # A worker process died (an OOM kill, say), which breaks the whole
+            # pool; start a new one and try once more
+            self._drop_pool(executor)
+            try:
+                future = self._pool().submit(extract_text, file_path)
+            except BrokenProcessPool as e:
+                print(f"Error starting resume extraction for job {job_id}: {e}")
+                self.store.finish(job_id, 'failed', error=str(e))
+                return job_id
+        future.add_done_callback(lambda done: self._finish_job(job_id, interview_id, done))
+        return job_id
+
+    def _finish_job(self, job_id, interview_id, future):
+        # Runs in the parent once the worker process has returned the text
+        try:
+            text = future.result()
+            self.store.write_text(interview_id, text)
+            self.store.finish(job_id, 'done', chars=len(text))
+        except UnsupportedResumeFormat as e:
+            self.store.finish(job_id, 'unsupported', error=str(e))
+            return
+        except Exception as e:
+            print(f"Error extracting resume text for job {job_id}: {e}")
+            self.store.finish(job_id, 'failed', error=str(e))
+            return
+
+        for callback in self._listeners:
+            try:
+                callback(interview_id, text)
+            except Exception as e:
+                print(f"Error in resume text listener: {e}")
+
+    def status(self, job_id):
+        """Return the state of a job as a dict, or None if it is unknown"""
+        return self.store.status(job_id)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,174 @@
+import re
+
+from sqlite_utils import LocalConnection
+
+# Interview fields that /search can filter on, mapped to the stored answer key
+FILTER_FIELDS = {
+    'job_role': 'answer_job_role',
+    'occupation': 'answer_occupation',
+    'job_type': 'answer_job_type',
+    'job_mode': 'answer_job_mode',
+}
+
+# Above this many matches BM25 scoring costs more than the latency budget,
+# so results fall back to newest-first order
+RANK_LIMIT = 2000
+# bm25() reads every match of a phrase once more to weigh it, so phrase
+# queries are only scored up to a lower count
+PHRASE_RANK_LIMIT = 200
+
+_TERM_RE = re.compile(r'"([^"]+)"|(\S+)')
+# Tokens as split by the unicode61 tokenizer; a term of several is a phrase
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def is_phrase_query(match):
+    """True when any term of an FTS5 query built here spans several tokens"""
+    return any(len(_TOKEN_RE.findall(term)) > 1 for term, _ in _TERM_RE.findall(match))
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 query; "quoted text" is kept as a phrase
+
+    Every term is quoted so characters like ``/`` or ``-`` in user input are
+    never parsed as FTS5 operators; terms are ANDed together.
+    """
+    terms = []
+    for phrase, word in _TERM_RE.findall(query):
+        term = (phrase or word).replace('"', '').strip()
+        if term:
+            terms.append(f'"{term}"')
+    return ' '.join(terms)
+
+
+class SearchIndex:
+    """SQLite FTS5 full-text index over interview answers and resume text
+
+    Documents are keyed by interview ID and added one at a time as
+    interviews are saved, so the index never needs a scan of the results.
+    Filters live in a separate indexed table joined on the document rowid.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = LocalConnection(path)
+        conn = self._connection()
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5("
+            " answers, resume, tokenize = 'porter unicode61')"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS document_meta ("
+            " interview_id INTEGER PRIMARY KEY,"
+            " job_role TEXT, occupation TEXT, job_type TEXT, job_mode TEXT)"
+        )
+        for field in FILTER_FIELDS:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_meta_{field} ON document_meta ({field})")
+
+    def index_interview(self, record, resume_text=None):
+        """Add or replace the document of one saved interview"""
+        interview_id = int(record['interview_id'])
+        answers = '\n'.join(
+            str(value) for key, value in record.items()
+            if key.startswith('answer_') and value
+        )
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM documents WHERE rowid = ?", (interview_id,))
+            conn.execute(
+                "INSERT INTO documents (rowid, answers, resume) VALUES (?, ?, ?)",
+                (interview_id, answers, resume_text or ''),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO document_meta (interview_id, job_role, occupation, job_type, job_mode)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (interview_id, *(record.get(key) for key in FILTER_FIELDS.values())),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def update_resume(self, interview_id, resume_text):
+        """Attach resume text that finished extracting after the interview was indexed
+
+        Returns False when this index has no document for the interview.
+        """
+        return self._connection().execute(
+            "UPDATE documents SET resume = ? WHERE rowid = ?", (resume_text, int(interview_id))
+        ).rowcount > 0
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM documents")
+        conn.execute("DELETE FROM document_meta")
+
+    def search(self, query, filters=None, limit=20):
+        """Return matching interviews ranked by BM25, best first
+
+        Terms that match more than ``RANK_LIMIT`` interviews carry almost no
+        ranking signal, so those queries skip scoring and return the newest
+        matches with a ``score`` of None. Phrase queries, such as "Spring
+        Boot" or UI/UX, cost more to score and are cut off at
+        ``PHRASE_RANK_LIMIT`` matches instead.
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        conn = self._connection()
+        rank_limit = PHRASE_RANK_LIMIT if is_phrase_query(match) else RANK_LIMIT
+        # Counting stops at rank_limit + 1 rows, so this stays cheap
+        matches = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT rowid FROM documents WHERE documents MATCH ? LIMIT ?)",
+            (match, rank_limit + 1),
+        ).fetchone()[0]
+        ranked = matches <= rank_limit
+        # Ranked rows are sorted after every match is scored, so their
+        # snippets are built afterwards for the returned rows only. Newest
+        # rows come straight off the index, so snippets are built inline.
+        score_column = "bm25(documents)" if ranked else "NULL"
+        snippet_column = "NULL" if ranked else "snippet(documents, -1, '[', ']', '...', 12)"
+        order = "rank" if ranked else "documents.rowid DESC"
+
+        sql = [
+            f"SELECT documents.rowid, {score_column} AS rank, {snippet_column},"
+            " m.job_role, m.occupation, m.job_type, m.job_mode"
+            " FROM documents JOIN document_meta m ON m.interview_id = documents.rowid"
+            " WHERE documents MATCH ?"
+        ]
+        params = [match]
+        for field, value in (filters or {}).items():
+            if field in FILTER_FIELDS and value:
+                sql.append(f" AND m.{field} = ?")
+                params.append(value)
+        sql.append(f" ORDER BY {order} LIMIT ?")
+        params.append(limit)
+        rows = conn.execute(''.join(sql), params).fetchall()
+        if not rows:
+            return []
+
+        snippets = {}
+        if ranked:
+            # Snippets are costly, so only build them for the rows being returned
+            placeholders = ', '.join('?' * len(rows))
+            snippets = dict(conn.execute(
+                "SELECT rowid, snippet(documents, -1, '[', ']', '...', 12) FROM documents"
+                f" WHERE documents MATCH ? AND rowid IN ({placeholders})",
+                [match, *(row[0] for row in rows)],
+            ).fetchall())
+
+        results = []
+        for interview_id, rank, snippet, job_role, occupation, job_type, job_mode in rows:
+            results.append({
+                'interview_id': interview_id,
+                # bm25() is lower-is-better; flip it so higher scores rank first
+                'score': round(-rank, 4) if ranked else None,
+                'snippet': snippets.get(interview_id, '') if ranked else snippet,
+                'job_role': job_role,
+                'occupation': occupation,
+                'job_type': job_type,
+                'job_mode': job_mode,
+            })
+        return results
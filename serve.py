@@ -0,0 +1,12 @@
+"""Development server: ``python serve.py``
+
+Resume text is extracted in spawned worker processes, and each one first
+imports the script its parent was started from. Everything here is under
+the ``__main__`` guard, so a worker imports this file without building a
+second copy of the app, as it would from ``python main.py``.
+"""
+
+if __name__ == '__main__':
+    from main import app
+
+    app.run()
@@ -0,0 +1,236 @@
+import time
+import secrets
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from sqlite_utils import LocalConnection, ThrottledEviction
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session whose data lives on the server; the cookie only holds its ID"""
+
+    def __init__(self, initial=None, sid=None, new=False, snapshot=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.accessed = False
+        # Serialized value of every key as loaded, used to find changed keys
+        self.snapshot = snapshot or {}
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+
+class SQLiteSessionStore:
+    """Session data stored one row per key in a WAL-mode SQLite database
+
+    Keeping keys in separate rows means a chat turn only rewrites the keys it
+    changed instead of the whole session.
+    """
+
+    def __init__(self, path, ttl, evict_interval=60.0):
+        self.path = path
+        self.ttl = ttl
+        self._maybe_evict = ThrottledEviction(self.evict_expired, evict_interval, 'session')
+        self._connection = LocalConnection(path)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " sid TEXT PRIMARY KEY,"
+            " expires REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_data ("
+            " sid TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (sid, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires)")
+
+    def load(self, sid):
+        """Return {key: serialized value} for a live session, or None"""
+        conn = self._connection()
+        row = conn.execute("SELECT expires FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        rows = conn.execute("SELECT key, value FROM session_data WHERE sid = ?", (sid,)).fetchall()
+        return dict(rows)
+
+    def save(self, sid, changed, deleted):
+        """Write changed keys, drop deleted ones and extend the TTL"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO sessions (sid, expires) VALUES (?, ?)"
+                " ON CONFLICT (sid) DO UPDATE SET expires = excluded.expires",
+                (sid, now + self.ttl),
+            )
+            if changed:
+                conn.executemany(
+                    "INSERT INTO session_data (sid, key, value) VALUES (?, ?, ?)"
+                    " ON CONFLICT (sid, key) DO UPDATE SET value = excluded.value",
+                    ((sid, key, value) for key, value in changed.items()),
+                )
+            if deleted:
+                conn.executemany(
+                    "DELETE FROM session_data WHERE sid = ? AND key = ?",
+                    ((sid, key) for key in deleted),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._maybe_evict(now)
+
+    def delete(self, sid):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM session_data WHERE sid = ?", (sid,))
+        conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+        conn.execute("COMMIT")
+
+    def evict_expired(self, now=None):
+        """Remove every expired session and return how many were dropped"""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "DELETE FROM session_data WHERE sid IN (SELECT sid FROM sessions WHERE expires < ?)",
+            (now,),
+        )
+        removed = conn.execute("DELETE FROM sessions WHERE expires < ?", (now,)).rowcount
+        conn.execute("COMMIT")
+        return removed
+
+
+class RedisSessionStore:
+    """Session data in one Redis hash per session, shared by every node
+
+    Like the SQLite store, a save only writes the keys that changed. Redis
+    expires idle sessions itself, so there is nothing to evict.
+    """
+
+    def __init__(self, client, ttl, prefix='chatbot:session:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def load(self, sid):
+        """Return {key: serialized value} for a live session, or None"""
+        stored = self.client.hgetall(self.prefix + sid)
+        if not stored:
+            return None
+        return {key.decode('utf-8'): value.decode('utf-8') for key, value in stored.items()}
+
+    def save(self, sid, changed, deleted):
+        """Write changed keys, drop deleted ones and extend the TTL"""
+        key = self.prefix + sid
+        pipe = self.client.pipeline(transaction=True)
+        if changed:
+            pipe.hset(key, mapping=changed)
+        if deleted:
+            pipe.hdel(key, *deleted)
+        pipe.expire(key, int(self.ttl))
+        pipe.execute()
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def evict_expired(self, now=None):
+        return 0
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by a server-side session store"""
+
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSession
+
+    def __init__(self, store, size_observer=None):
+        self.store = store
+        # Called with (session bytes, bytes written) after each save
+        self.size_observer = size_observer
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('ascii')
+            except BadSignature:
+                sid = None
+            if sid:
+                stored = self.store.load(sid)
+                if stored is not None:
+                    data = {key: self.serializer.loads(value) for key, value in stored.items()}
+                    return self.session_class(data, sid=sid, snapshot=stored)
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly
+                )
+                response.vary.add("Cookie")
+            return
+
+        # Nested values (e.g. session['responses'][key] = ...) are mutated in
+        # place, so compare serialized values instead of trusting `modified`
+        changed = {}
+        session_bytes = 0
+        for key, value in session.items():
+            serialized = self.serializer.dumps(value)
+            session_bytes += len(serialized)
+            if session.snapshot.get(key) != serialized:
+                changed[key] = serialized
+        deleted = [key for key in session.snapshot if key not in session]
+
+        if changed or deleted or session.new:
+            self.store.save(session.sid, changed, deleted)
+        if self.size_observer is not None:
+            self.size_observer(session_bytes, sum(len(value) for value in changed.values()))
+
+        # The cookie only carries the session ID, so it is only resent when
+        # the ID is new or a permanent session needs its expiry refreshed
+        if session.new or (session.permanent and app.config['SESSION_REFRESH_EACH_REQUEST']):
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode('ascii'),
+                expires=self.get_expiration_time(app, session),
+                httponly=httponly,
+                domain=domain,
+                path=path,
+                secure=secure,
+                samesite=samesite,
+            )
+            response.vary.add("Cookie")
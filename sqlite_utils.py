@@ -0,0 +1,51 @@
+import os
+import sqlite3
+import threading
+
+
+class LocalConnection:
+    """Lazily opened WAL-mode SQLite connection, one per thread and process
+
+    Connections are never shared across threads or carried over a gunicorn
+    fork; call the instance to get the connection for the current thread.
+    Statements run in autocommit mode unless wrapped in an explicit
+    ``BEGIN``/``COMMIT``.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class ThrottledEviction:
+    """Calls ``evict(now)`` at most once every ``interval`` seconds
+
+    Stores call the instance after each write. When another worker holds
+    the write lock the run is skipped; that worker will evict instead.
+    """
+
+    def __init__(self, evict, interval, name):
+        self.evict = evict
+        self.interval = interval
+        self.name = name
+        self._next_run = 0.0
+
+    def __call__(self, now):
+        if now < self._next_run:
+            return
+        self._next_run = now + self.interval
+        try:
+            self.evict(now)
+        except sqlite3.OperationalError as e:
+            print(f"Skipping {self.name} eviction: {e}")
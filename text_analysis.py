@@ -0,0 +1,121 @@
+import re
+import time
+import threading
+
+# NLTK resources the chatbot can use when they are installed locally
+VADER_RESOURCE = 'sentiment/vader_lexicon.zip'
+PUNKT_RESOURCES = ('tokenizers/punkt_tab', 'tokenizers/punkt')
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+_lock = threading.Lock()
+_initialized = False
+_analyzer = None
+_word_tokenize = None
+
+# Per-call latency of the sentiment + tokenization step
+_latency = {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'last_seconds': 0.0}
+
+
+def _find_resource(nltk, name):
+    try:
+        nltk.data.find(name)
+        return True
+    except LookupError:
+        return False
+
+
+def init_text_analysis():
+    """Build the VADER analyzer and tokenizer once per process
+
+    Never downloads anything: if NLTK or its data is missing the service
+    falls back to neutral sentiment and the regex tokenizer. Run
+    ``flask nltk-download`` at deploy time to install the data.
+    """
+    global _initialized, _analyzer, _word_tokenize
+    if _initialized:
+        return
+    with _lock:
+        if _initialized:
+            return
+        try:
+            import nltk
+
+            if _find_resource(nltk, VADER_RESOURCE):
+                from nltk.sentiment import SentimentIntensityAnalyzer
+                _analyzer = SentimentIntensityAnalyzer()
+            else:
+                print("VADER lexicon not installed; sentiment will be neutral")
+
+            if any(_find_resource(nltk, name) for name in PUNKT_RESOURCES):
+                from nltk.tokenize import word_tokenize
+                _word_tokenize = word_tokenize
+        except Exception as e:
+            print(f"Error initializing NLTK: {e}")
+        _initialized = True
+
+
+def download_resources():
+    """Fetch the NLTK data used by the chatbot (deploy time only)"""
+    import nltk
+
+    nltk.download('vader_lexicon', quiet=True)
+    nltk.download('punkt_tab', quiet=True)
+
+
+def regex_tokenize(text):
+    """Lowercase alphanumeric tokens, without NLTK"""
+    return _WORD_RE.findall(text.lower())
+
+
+def sentiment_compound(text):
+    """Return the VADER compound score, or 0 when VADER is unavailable"""
+    init_text_analysis()
+    if _analyzer is None:
+        return 0
+    try:
+        return _analyzer.polarity_scores(text)['compound']
+    except Exception as e:
+        print(f"Error scoring sentiment: {e}")
+        return 0
+
+
+def tokenize(text):
+    """Return lowercase alphanumeric tokens of ``text``"""
+    init_text_analysis()
+    if _word_tokenize is not None:
+        try:
+            return [token for token in _word_tokenize(text.lower()) if token.isalnum()]
+        except Exception as e:
+            print(f"Error tokenizing with NLTK: {e}")
+    return regex_tokenize(text)
+
+
+def analyze_message(text):
+    """Score sentiment and tokenize a chat message, recording latency"""
+    init_text_analysis()
+    started = time.perf_counter()
+    compound = sentiment_compound(text)
+    tokens = tokenize(text)
+    elapsed = time.perf_counter() - started
+
+    _latency['calls'] += 1
+    _latency['total_seconds'] += elapsed
+    _latency['last_seconds'] = elapsed
+    if elapsed > _latency['max_seconds']:
+        _latency['max_seconds'] = elapsed
+    return compound, tokens
+
+
+def text_analysis_stats():
+    """Return initialization state and latency counters"""
+    calls = _latency['calls']
+    return {
+        'initialized': _initialized,
+        'vader_available': _analyzer is not None,
+        'nltk_tokenizer': _word_tokenize is not None,
+        'calls': calls,
+        'mean_seconds': _latency['total_seconds'] / calls if calls else 0.0,
+        'max_seconds': _latency['max_seconds'],
+        'last_seconds': _latency['last_seconds'],
+    }
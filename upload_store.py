@@ -0,0 +1,339 @@
+import os
+import re
+import time
+import uuid
+import hashlib
+import threading
+
+from resume_processing import CHUNK_SIZE, UploadTooLarge
+
+# Unfinished uploads older than this are removed by gc()
+STALE_TMP_SECONDS = 60 * 60
+
+# Digests remembered per process, keyed by file identity
+DIGEST_CACHE_SIZE = 4096
+
+BLOB_NAME_RE = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]+)?$')
+
+
+def _hash_file(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStore:
+    """Uploads stored once per unique content, named by their SHA-256
+
+    Blobs live at ``{root}/blobs/{hh}/{sha256}{.ext}``. Every upload name
+    (``{interview_id}_{name}``) is a hard link to its blob, so a candidate
+    who uploads the same resume again adds a directory entry instead of a
+    copy, and existing paths and downloads keep working. A blob whose only
+    link is its own entry under ``blobs/`` is an orphan and is removed by
+    ``gc``.
+
+    With a ``mirror`` (see RedisBlobMirror) every saved blob and upload
+    name is also published to shared storage, and a node asked for a file
+    it does not have fetches it once into its own store.
+    """
+
+    def __init__(self, root, mirror=None):
+        self.root = root
+        self.mirror = mirror
+        self.blob_dir = os.path.join(root, 'blobs')
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._digests = {}
+        self._digest_lock = threading.Lock()
+
+    def blob_path(self, digest, extension=''):
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}{extension}")
+
+    def find_blob(self, name):
+        """Resolve a ``{sha256}{.ext}`` blob name to its path, or None"""
+        match = BLOB_NAME_RE.match(name)
+        if not match:
+            return None
+        path = self.blob_path(match.group(1), match.group(2) or '')
+        if os.path.isfile(path):
+            return path
+        return self._fetch(name, match.group(1), path)
+
+    def _fetch(self, name, digest, path):
+        """Copy a blob this node does not have from the mirror; returns its path or None"""
+        if self.mirror is None:
+            return None
+        data = self.mirror.fetch(name)
+        if data is None:
+            return None
+        if hashlib.sha256(data).hexdigest() != digest:
+            print(f"Error fetching blob {name}: content does not match its name")
+            return None
+        tmp_path = self._tmp_path()
+        with open(tmp_path, 'wb') as out:
+            out.write(data)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return path
+
+    def resolve(self, filename):
+        """Path of an upload name under the root, linked from the mirror if only another node has it"""
+        path = os.path.join(self.root, filename)
+        if os.path.isfile(path):
+            return path
+        if self.mirror is None:
+            return None
+        blob_name = self.mirror.blob_name(filename)
+        blob = self.find_blob(blob_name) if blob_name else None
+        if blob is None or not self._link(blob, path):
+            return None
+        return path
+
+    def digest(self, path, chunk_size=CHUNK_SIZE):
+        """SHA-256 of a stored upload, read from disk at most once per file
+
+        Every name linked to a blob shares its inode, so one cache entry
+        covers them all. Size and mtime are part of the key in case a file
+        outside the store is rewritten in place.
+        """
+        st = os.stat(path)
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        digest = self._digests.get(key)
+        if digest is not None:
+            return digest
+        match = BLOB_NAME_RE.match(os.path.basename(path))
+        if match and os.path.dirname(os.path.dirname(path)) == self.blob_dir:
+            digest = match.group(1)
+        else:
+            digest = _hash_file(path, chunk_size)
+        with self._digest_lock:
+            if len(self._digests) >= DIGEST_CACHE_SIZE:
+                self._digests.clear()
+            self._digests[key] = digest
+        return digest
+
+    @staticmethod
+    def _extension(filename):
+        # Kept on the blob so text extraction can still pick a parser by type
+        return f".{filename.rsplit('.', 1)[1].lower()}" if '.' in filename else ''
+
+    def _tmp_path(self):
+        return os.path.join(self.blob_dir, f".tmp-{uuid.uuid4().hex}")
+
+    def _link(self, blob, link_path):
+        """Point ``link_path`` at ``blob``; False if the blob vanished under a gc"""
+        try:
+            # rename() between two links to one file does nothing, so skip it
+            if os.path.samefile(blob, link_path):
+                return True
+        except FileNotFoundError:
+            pass
+        folder, name = os.path.split(link_path)
+        staged = os.path.join(folder, f".{name}.link-{uuid.uuid4().hex}")
+        try:
+            os.link(blob, staged)
+        except FileNotFoundError:
+            return False
+        os.replace(staged, link_path)
+        return True
+
+    def _store(self, tmp_path, digest, extension, link_path):
+        """Move a fully written temp file into the store and link it; True if it was a duplicate"""
+        blob = self.blob_path(digest, extension)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        if os.path.exists(blob) and self._link(blob, link_path):
+            os.remove(tmp_path)
+            return True
+        os.replace(tmp_path, blob)
+        if not self._link(blob, link_path):
+            raise FileNotFoundError(f"Blob {blob} removed while linking")
+        return False
+
+    def save(self, stream, link_path, max_bytes, chunk_size=CHUNK_SIZE):
+        """Copy an upload stream into the store and link it at ``link_path``
+
+        The SHA-256 is computed while the chunks are written, so the file is
+        read only once. Returns ``(digest, size, duplicate)``. Raises
+        UploadTooLarge as soon as more than ``max_bytes`` have been read.
+        """
+        tmp_path = self._tmp_path()
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(tmp_path, 'wb') as out:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                    digest.update(chunk)
+                    out.write(chunk)
+            extension = self._extension(link_path)
+            duplicate = self._store(tmp_path, digest.hexdigest(), extension, link_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.mirror is not None:
+            self.mirror.publish(
+                os.path.basename(link_path), f"{digest.hexdigest()}{extension}",
+                self.blob_path(digest.hexdigest(), extension),
+            )
+        return digest.hexdigest(), written, duplicate
+
+    def adopt(self, path, chunk_size=CHUNK_SIZE):
+        """Replace a plain file under the upload folder with a link to its blob
+
+        Returns True when the content was already stored.
+        """
+        digest = _hash_file(path, chunk_size)
+        tmp_path = self._tmp_path()
+        # Link rather than copy; the original name is re-pointed at the blob
+        os.link(path, tmp_path)
+        try:
+            return self._store(tmp_path, digest, self._extension(path), path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def iter_blobs(self):
+        for prefix in os.listdir(self.blob_dir):
+            folder = os.path.join(self.blob_dir, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                yield os.path.join(folder, name)
+
+    def gc(self, dry_run=False, min_age=60.0):
+        """Remove orphaned blobs and stale temp files; returns (files, bytes)
+
+        Blobs younger than ``min_age`` seconds are kept so an upload that is
+        about to be linked is never collected.
+        """
+        now = time.time()
+        removed = 0
+        freed = 0
+        candidates = [(path, min_age) for path in self.iter_blobs()]
+        candidates += [
+            (os.path.join(self.blob_dir, name), STALE_TMP_SECONDS)
+            for name in os.listdir(self.blob_dir) if name.startswith('.tmp-')
+        ]
+        for path, age in candidates:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            orphan = st.st_nlink == 1 or os.path.basename(path).startswith('.tmp-')
+            if not orphan or now - st.st_mtime < age:
+                continue
+            if not dry_run:
+                os.remove(path)
+            removed += 1
+            freed += st.st_size
+        return removed, freed
+
+    def stats(self):
+        blobs = 0
+        size = 0
+        for path in self.iter_blobs():
+            blobs += 1
+            size += os.stat(path).st_size
+        return {'blobs': blobs, 'bytes': size}
+
+
+class RedisBlobMirror:
+    """Blobs and upload names published to Redis for nodes without a shared disk
+
+    Each blob is stored once under ``{prefix}:blob:{sha256}{.ext}``, and
+    each upload name maps to its blob under ``{prefix}:name:{filename}``.
+    Blobs are bounded by MAX_RESUME_BYTES, so they fit in one value. The
+    ``{prefix}:published`` sorted set records when each blob was last
+    published, which ``gc`` uses to spare new uploads. With a ``ttl``, blobs
+    and names expire that many seconds after their last upload; nodes keep
+    the copies they already fetched.
+    """
+
+    def __init__(self, client, prefix='chatbot:uploads', ttl=0):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.published_key = f"{prefix}:published"
+
+    def publish(self, filename, blob_name, blob_path):
+        blob_key = f"{self.prefix}:blob:{blob_name}"
+        # Recorded before the blob is checked: gc either sees the new time
+        # and keeps the blob, or has removed it already and it is sent again
+        self.client.zadd(self.published_key, {blob_name: time.time()})
+        if not self.client.exists(blob_key):
+            with open(blob_path, 'rb') as f:
+                self.client.set(blob_key, f.read(), nx=True, ex=self.ttl or None)
+        elif self.ttl:
+            # A duplicate upload only adds its name, and keeps the blob alive
+            self.client.expire(blob_key, self.ttl)
+        self.client.set(f"{self.prefix}:name:{filename}", blob_name, ex=self.ttl or None)
+
+    def blob_name(self, filename):
+        value = self.client.get(f"{self.prefix}:name:{filename}")
+        return value.decode('utf-8') if value is not None else None
+
+    def fetch(self, blob_name):
+        return self.client.get(f"{self.prefix}:blob:{blob_name}")
+
+    def gc(self, dry_run=False, min_age=60.0):
+        """Remove published blobs that no upload name points to; returns (blobs, bytes)
+
+        Blobs published within ``min_age`` seconds are kept, as in
+        ContentAddressedStore.gc. A blob re-published while gc runs is kept
+        as well.
+        """
+        import redis
+
+        now = time.time()
+        name_keys = list(self.client.scan_iter(match=f"{self.prefix}:name:*", count=1000))
+        referenced = set()
+        for start in range(0, len(name_keys), 500):
+            referenced.update(
+                value.decode('utf-8') for value in self.client.mget(name_keys[start:start + 500]) if value is not None
+            )
+        # Blobs published before publish times were recorded start their age now
+        blob_prefix = f"{self.prefix}:blob:"
+        unrecorded = {
+            key.decode('utf-8')[len(blob_prefix):]: now
+            for key in self.client.scan_iter(match=f"{blob_prefix}*", count=1000)
+        }
+        if unrecorded and not dry_run:
+            self.client.zadd(self.published_key, unrecorded, nx=True)
+
+        removed = 0
+        freed = 0
+        cutoff = now - min_age
+        for value in self.client.zrangebyscore(self.published_key, '-inf', cutoff):
+            blob_name = value.decode('utf-8')
+            if blob_name in referenced:
+                continue
+            blob_key = f"{blob_prefix}{blob_name}"
+            with self.client.pipeline() as pipe:
+                try:
+                    # Any publish in between aborts the removal
+                    pipe.watch(self.published_key)
+                    published = pipe.zscore(self.published_key, blob_name)
+                    if published is None or published > cutoff:
+                        continue
+                    size = pipe.strlen(blob_key)
+                    exists = pipe.exists(blob_key)
+                    if not dry_run:
+                        pipe.multi()
+                        pipe.delete(blob_key)
+                        pipe.zrem(self.published_key, blob_name)
+                        pipe.execute()
+                except redis.WatchError:
+                    continue
+            # An expired blob only leaves its publish time behind
+            if exists:
+                removed += 1
+                freed += size
+        return removed, freed